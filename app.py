@@ -1,6 +1,13 @@
-import dash
-from components.layout import create_layout
-from utils.callbacks import register_callbacks
+from utils import startup
+startup.enable()
+
+with startup.phase("imports"):
+    import dash
+    from components.layout import create_layout
+    from utils.callbacks import register_callbacks
+    from utils.client_cube import CLIENTSIDE
+    from utils.data_loader import dataset
+    from utils import metrics
 
 app = dash.Dash(
     __name__, external_stylesheets=[
@@ -9,9 +16,18 @@ app = dash.Dash(
     ], 
     suppress_callback_exceptions=True
 )
+server = app.server  # WSGI entry point (serve.py, gunicorn app:server)
 
-register_callbacks(app)
-app.layout = create_layout()
+with startup.phase("callbacks"):
+    register_callbacks(app)
+with startup.phase("data load"):
+    dataset.get()
+with startup.phase("layout"):
+    # Client-side mode builds the layout per page load, so each session
+    # gets the cube of the data as it is then
+    app.layout = create_layout if CLIENTSIDE else create_layout()
+startup.watch_first_request(app.server)
+metrics.install(app.server)
 
 if __name__ == '__main__':
     app.run(debug=True)
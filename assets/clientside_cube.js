@@ -0,0 +1,221 @@
+// Cube-backed charts re-aggregated in the browser (SALES_CLIENTSIDE=1).
+//
+// The server ships the monthly cube and the unfiltered figures once per
+// page load (utils/client_cube.py). Each function below filters the cube,
+// re-aggregates it the way its generator in utils/charts.py does and
+// fills a copy of that chart's figure, so no request reaches the server.
+(function () {
+    function clone(value) {
+        return JSON.parse(JSON.stringify(value));
+    }
+
+    function monthIndex(month) {
+        // "YYYY-MM" -> months since year 0
+        return Number(month.slice(0, 4)) * 12 + Number(month.slice(5, 7)) - 1;
+    }
+
+    function selectCells(cube, store, category, startDate, endDate, price) {
+        var dims = cube.dimensions;
+        var cells = cube.cells;
+        var storeCode = store ? dims.store.indexOf(store) : -1;
+        var categoryCode = category ? dims.category.indexOf(category) : -1;
+        if ((store && storeCode < 0) || (category && categoryCode < 0)) {
+            return [];
+        }
+        // Whole months: a month is in when the range covers any day of it
+        var first = startDate && endDate ? String(startDate).slice(0, 7) : null;
+        var last = first ? String(endDate).slice(0, 7) : null;
+
+        var selected = [];
+        for (var i = 0; i < cells.month.length; i++) {
+            if (store && cells.store[i] !== storeCode) continue;
+            if (category && cells.category[i] !== categoryCode) continue;
+            if (price && (cells.price[i] === null || cells.price[i] > price)) continue;
+            if (first) {
+                var month = dims.month[cells.month[i]];
+                if (month < first || month > last) continue;
+            }
+            selected.push(i);
+        }
+        return selected;
+    }
+
+    // Sums of the given measures per key(i), keys in ascending order
+    function sumBy(cube, rows, key, measures) {
+        var sums = new Map();
+        rows.forEach(function (i) {
+            var k = key(i);
+            var totals = sums.get(k);
+            if (!totals) {
+                totals = measures.map(function () { return 0; });
+                sums.set(k, totals);
+            }
+            measures.forEach(function (measure, m) {
+                totals[m] += cube.cells[measure][i];
+            });
+        });
+        var keys = Array.from(sums.keys()).sort(function (a, b) {
+            return a < b ? -1 : a > b ? 1 : 0;
+        });
+        return keys.map(function (k) { return [k].concat(sums.get(k)); });
+    }
+
+    // Clone of a chart's template, or the empty figure when nothing matches
+    function figureFor(cube, chartId, rows) {
+        var template = cube.templates[chartId];
+        if (!rows.length || !template.data || !template.data.length) {
+            return clone(cube.templates.empty);
+        }
+        return clone(template);
+    }
+
+    function monthlySums(cube, rows, measures) {
+        return sumBy(cube, rows, function (i) { return cube.cells.month[i]; }, measures)
+            .map(function (row) {
+                return [cube.dimensions.month[row[0]] + '-01'].concat(row.slice(1));
+            });
+    }
+
+    function filtered(args) {
+        return selectCells(args[5], args[0], args[1], args[2], args[3], args[4]);
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        salesCube: {
+            // generate_monthly_chart: units sold per month, last 12 months
+            monthly: function () {
+                var cube = arguments[5];
+                if (!cube) return window.dash_clientside.no_update;
+                var rows = filtered(arguments);
+                var fig = figureFor(cube, 'graph-id', rows);
+                if (!rows.length) return fig;
+
+                var months = monthlySums(cube, rows, ['units']);
+                var newest = monthIndex(months[months.length - 1][0]);
+                months = months.filter(function (row) {
+                    return monthIndex(row[0]) >= newest - 11;
+                });
+                fig.data[0].x = months.map(function (row) { return row[0]; });
+                fig.data[0].y = months.map(function (row) { return row[1]; });
+                return fig;
+            },
+
+            // generate_inventory_sales_chart: monthly units and inventory,
+            // low-inventory months marked
+            inventory: function () {
+                var cube = arguments[5];
+                if (!cube) return window.dash_clientside.no_update;
+                var rows = filtered(arguments);
+                var fig = figureFor(cube, 'inventory-sales-chart', rows);
+                if (!rows.length) return fig;
+
+                var months = monthlySums(cube, rows, ['units', 'inventory']);
+                var x = months.map(function (row) { return row[0]; });
+                fig.data[0].x = x;
+                fig.data[0].y = months.map(function (row) { return row[1]; });
+                fig.data[1].x = x;
+                fig.data[1].y = months.map(function (row) { return row[2]; });
+
+                var low = months.filter(function (row) { return row[2] <= cube.threshold; });
+                fig.data = fig.data.slice(0, 2);
+                if (low.length) {
+                    fig.data.push({
+                        type: 'scatter',
+                        x: low.map(function (row) { return row[0]; }),
+                        y: low.map(function (row) { return row[2]; }),
+                        mode: 'markers',
+                        marker: {color: 'red', size: 8, symbol: 'x'},
+                        name: 'Inventory ≤ ' + cube.threshold
+                    });
+                }
+                return fig;
+            },
+
+            // generate_category_treemap: units sold per region and category
+            treemap: function () {
+                var cube = arguments[5];
+                if (!cube) return window.dash_clientside.no_update;
+                var rows = filtered(arguments);
+                var fig = figureFor(cube, 'category-region-treemap', rows);
+                if (!rows.length) return fig;
+
+                var trace = fig.data[0];
+                var colors = {};
+                var palette = [];
+                trace.ids.forEach(function (id, k) {
+                    if (id.indexOf('/') < 0) {
+                        colors[id] = trace.marker.colors[k];
+                        palette.push(trace.marker.colors[k]);
+                    }
+                });
+
+                var dims = cube.dimensions;
+                var sums = sumBy(cube, rows, function (i) {
+                    return dims.region[cube.cells.region[i]] + '\u0000' + dims.category[cube.cells.category[i]];
+                }, ['units']);
+
+                var ids = [], labels = [], parents = [], values = [], customdata = [], marker = [];
+                var regionCount = 0;
+                var k = 0;
+                while (k < sums.length) {
+                    var region = sums[k][0].split('\u0000')[0];
+                    var color = colors[region] || palette[regionCount % palette.length];
+                    var total = 0;
+                    for (; k < sums.length && sums[k][0].split('\u0000')[0] === region; k++) {
+                        var category = sums[k][0].split('\u0000')[1];
+                        ids.push(region + '/' + category);
+                        labels.push(category);
+                        parents.push(region);
+                        values.push(sums[k][1]);
+                        customdata.push([region]);
+                        marker.push(color);
+                        total += sums[k][1];
+                    }
+                    ids.push(region);
+                    labels.push(region);
+                    parents.push('');
+                    values.push(total);
+                    customdata.push([region]);
+                    marker.push(color);
+                    regionCount++;
+                }
+                trace.ids = ids;
+                trace.labels = labels;
+                trace.parents = parents;
+                trace.values = values;
+                trace.customdata = customdata;
+                trace.marker.colors = marker;
+                return fig;
+            },
+
+            // generate_promo_impact: mean units sold per category, with and
+            // without promotion
+            promo: function () {
+                var cube = arguments[5];
+                if (!cube) return window.dash_clientside.no_update;
+                var rows = filtered(arguments);
+                var fig = figureFor(cube, 'promo-impact-delta-chart', rows);
+                if (!rows.length) return fig;
+
+                var dims = cube.dimensions;
+                var names = {0: 'No Promo', 1: 'Promo'};
+                var traces = [];
+                fig.data.forEach(function (trace) {
+                    var promotion = trace.name === names[1] ? 1 : 0;
+                    var subset = rows.filter(function (i) {
+                        return cube.cells.promotion[i] === promotion;
+                    });
+                    var sums = sumBy(cube, subset, function (i) {
+                        return dims.category[cube.cells.category[i]];
+                    }, ['units', 'units_count']).filter(function (row) { return row[2] > 0; });
+                    if (!sums.length) return;
+                    trace.x = sums.map(function (row) { return row[0]; });
+                    trace.y = sums.map(function (row) { return row[1] / row[2]; });
+                    traces.push(trace);
+                });
+                fig.data = traces;
+                return fig;
+            }
+        }
+    });
+})();
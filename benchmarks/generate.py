@@ -0,0 +1,129 @@
+"""
+Synthetic sales data with the schema the dashboard and trainer read.
+
+    python -m benchmarks.generate --rows 1m --output benchmarks/data/sales_1m.csv
+
+Rows are one per store x product x day, written in date order in chunks,
+so 10M rows never need to fit in memory at once. The same seed always
+produces the same file.
+"""
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    'Date', 'Store ID', 'Product ID', 'Category', 'Region', 'Units Sold',
+    'Inventory Level', 'Price', 'Discount', 'Promotion', 'Competitor Pricing',
+    'Demand', 'Units Ordered', 'Epidemic',
+]
+CATEGORIES = ['Groceries', 'Toys', 'Electronics', 'Furniture', 'Clothing']
+REGIONS = ['North', 'South', 'East', 'West']
+DISCOUNTS = np.array([0, 5, 10, 15, 20])
+START_DATE = '2022-01-01'
+DAYS_PER_CHUNK = 30
+
+
+def parse_rows(text):
+    """'100k', '1m', '10M' or a plain number."""
+    text = str(text).strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def layout(rows, stores, days):
+    """Products per store so stores x products x days is close to ``rows``."""
+    products = max(1, math.ceil(rows / (stores * days)))
+    return stores, products, days
+
+
+def series_table(rng, stores, products):
+    """Fixed attributes of every store x product series."""
+    base_price = rng.uniform(5, 150, products).round(2)
+    base_units = rng.uniform(20, 300, products)
+    category = np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), products)]
+    region = np.array(REGIONS)[rng.integers(0, len(REGIONS), stores)]
+    return {
+        'Store ID': np.repeat([f'S{i:03d}' for i in range(1, stores + 1)], products),
+        'Product ID': np.tile([f'P{i:04d}' for i in range(1, products + 1)], stores),
+        'Category': np.tile(category, stores),
+        'Region': np.repeat(region, products),
+        'base_price': np.tile(base_price, stores),
+        'base_units': np.tile(base_units, stores),
+    }
+
+
+def generate_chunk(rng, dates, series):
+    """One row per series for each of a run of consecutive dates."""
+    days = len(dates)
+    n = days * len(series['Store ID'])
+    repeat = {key: np.tile(values, days) for key, values in series.items()}
+    day_of_year = np.repeat(dates.dayofyear.to_numpy(), len(series['Store ID']))
+    season = 1 + 0.25 * np.sin(2 * np.pi * (day_of_year - 80) / 365.25)
+
+    promotion = rng.random(n) < 0.2
+    discount = np.where(promotion, rng.choice(DISCOUNTS[1:], n), 0)
+    price = np.round(repeat['base_price'] * rng.uniform(0.95, 1.05, n), 2)
+    epidemic = rng.random(n) < 0.05
+    expected = repeat['base_units'] * season * (1 + discount / 50) * np.where(epidemic, 0.7, 1)
+    demand = np.round(expected * rng.lognormal(0, 0.2, n), 2)
+    inventory = rng.integers(50, 600, n)
+
+    return pd.DataFrame({
+        'Date': np.repeat(dates.strftime('%Y-%m-%d').to_numpy(), len(series['Store ID'])),
+        'Store ID': repeat['Store ID'],
+        'Product ID': repeat['Product ID'],
+        'Category': repeat['Category'],
+        'Region': repeat['Region'],
+        'Units Sold': np.minimum(rng.poisson(demand), inventory),
+        'Inventory Level': inventory,
+        'Price': price,
+        'Discount': discount,
+        'Promotion': promotion.astype('int8'),
+        'Competitor Pricing': np.round(price * rng.uniform(0.9, 1.1, n), 2),
+        'Demand': demand,
+        'Units Ordered': rng.integers(0, 200, n),
+        'Epidemic': epidemic.astype('int8'),
+    }, columns=COLUMNS)
+
+
+def generate(output, rows, stores=10, days=730, seed=0):
+    """Write the CSV and return the number of rows written."""
+    rng = np.random.default_rng(seed)
+    stores, products, days = layout(rows, stores, days)
+    series = series_table(rng, stores, products)
+
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_output = f"{output}.tmp"
+    dates = pd.date_range(START_DATE, periods=days, freq='D')
+    written = 0
+    with open(tmp_output, 'w', newline='') as fh:
+        for start in range(0, days, DAYS_PER_CHUNK):
+            chunk = generate_chunk(rng, dates[start:start + DAYS_PER_CHUNK], series)
+            chunk.to_csv(fh, index=False, header=start == 0)
+            written += len(chunk)
+    os.replace(tmp_output, output)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic sales_data.csv.")
+    parser.add_argument("--rows", default="100k", help="approximate row count, e.g. 100k, 1m, 10m")
+    parser.add_argument("--output", default="benchmarks/data/sales_data.csv")
+    parser.add_argument("--stores", type=int, default=10)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    written = generate(args.output, parse_rows(args.rows), args.stores, args.days, args.seed)
+    print(f"Wrote {written} rows to {args.output} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
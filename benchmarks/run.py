@@ -0,0 +1,322 @@
+"""
+Timing and memory benchmarks for the data, chart and forecast paths.
+
+    python -m benchmarks.generate --rows 1m --output benchmarks/data/sales_1m.csv
+    python -m benchmarks.run --data benchmarks/data/sales_1m.csv
+    python -m benchmarks.run --data benchmarks/data/sales_1m.csv --compare benchmarks/results/<earlier>.json
+
+Every benchmark is timed ``--repeat`` times with perf_counter, then run
+once more under tracemalloc for its peak Python/NumPy allocation. Results
+go to a JSON file named after the commit and row count, so runs on
+different commits can be compared with ``--compare``.
+
+The sales data path and the model/feature caches are pointed at the
+benchmark's own locations before anything from the app is imported, so a
+run never reads or writes the dashboard's data.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timezone
+
+RESULTS_DIR = "benchmarks/results"
+FORECAST_HORIZON = 8
+INVENTORY_THRESHOLD = 10  # the dashboard's inventory chart threshold
+
+# ``setup`` runs before every measured call, untimed; ``run`` is measured
+Benchmark = namedtuple("Benchmark", ["name", "params", "run", "setup"])
+
+
+def configure(data_path, cache_dir):
+    """Environment the app modules read at import time."""
+    os.environ["SALES_DATA_PATH"] = data_path
+    os.environ["SALES_RELOAD_INTERVAL"] = "0"
+    os.environ["SALES_MODEL_CACHE_DIR"] = os.path.join(cache_dir, "models")
+    os.environ["SALES_FEATURE_STORE_DIR"] = os.path.join(cache_dir, "features")
+    # Default model parameters, whatever a tuning run left in the tree
+    os.environ["SALES_TUNED_PARAMS_PATH"] = os.path.join(cache_dir, "tuned_params.json")
+    os.environ["SALES_FIGURE_CACHE_DIR"] = ""
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def filter_sets(df):
+    """Representative dashboard filter combinations for the data at hand."""
+    import pandas as pd
+
+    from utils.cube import price_slider_values
+
+    end = df['Date'].max()
+    prices = price_slider_values(df['Price'])
+    mid_price = prices[len(prices) // 2]
+    # A store and category that still have rows under the price cap
+    sample = df.loc[(df['Price'] <= mid_price).to_numpy()].iloc[-1]
+    store, category = str(sample['Store ID']), str(sample['Category'])
+    return {
+        "all": (None, None, None, None, None),
+        "store": (store, None, None, None, None),
+        "store_category": (store, category, None, None, None),
+        "last_90_days": (None, None, end - pd.Timedelta(days=89), end, None),
+        "price_cap": (None, None, None, None, mid_price),
+        "combined": (store, category, end - pd.Timedelta(days=179), end, mid_price),
+    }
+
+
+def data_benchmarks(data_path, filters):
+    from utils import columnar
+    from utils.cube import build_cube, load_filtered_cube
+    from utils.data_index import SalesIndex
+    from utils.data_loader import (
+        build_columnar_cache, compute_kpis, dataset, filter_cache, load_data,
+        load_filtered_data, load_index, read_sales_csv, read_sales_data,
+    )
+    from utils.demand_grid import build_demand_grid, load_demand_grid
+    from utils.kpis import build_daily_totals, load_kpis
+
+    frame = load_data()
+    load_index()
+
+    yield Benchmark("read_sales_csv", {}, lambda: read_sales_csv(data_path), None)
+    if columnar.available():
+        yield Benchmark("build_columnar_cache", {}, lambda: build_columnar_cache(data_path), None)
+        yield Benchmark("read_sales_data", {"memory_map": True}, lambda: read_sales_data(data_path), None)
+    yield Benchmark("load_data", {"reload": True}, lambda: (dataset.refresh(force=True), load_data()), None)
+    for name, builder in [("SalesIndex", SalesIndex), ("build_cube", build_cube),
+                          ("build_daily_totals", build_daily_totals),
+                          ("build_demand_grid", build_demand_grid)]:
+        yield Benchmark(name, {}, lambda builder=builder: builder(frame), None)
+
+    for label, values in filters.items():
+        for name, loader in [("load_filtered_data", load_filtered_data),
+                             ("load_filtered_cube", load_filtered_cube),
+                             ("load_demand_grid", load_demand_grid),
+                             ("load_kpis", load_kpis)]:
+            yield Benchmark(name, {"filters": label}, lambda loader=loader, values=values: loader(*values),
+                            filter_cache.clear)
+
+    yield Benchmark("compute_kpis", {"filters": "all"}, lambda: compute_kpis(frame), None)
+
+
+def chart_benchmarks(filters):
+    from plotly.io.json import to_json_plotly
+
+    from utils import charts
+    from utils.cube import load_filtered_cube
+    from utils.data_loader import load_filtered_data
+    from utils.demand_grid import load_demand_grid
+    from utils.discount_grid import load_discount_grid
+
+    # Each generator on the raw filtered rows, and on the input the
+    # dashboard callback actually hands it
+    generators = [
+        ("generate_monthly_chart", (), load_filtered_cube),
+        ("generate_inventory_sales_chart", (INVENTORY_THRESHOLD,), load_filtered_cube),
+        ("generate_category_treemap", (), load_filtered_cube),
+        ("generate_promo_impact", (), load_filtered_cube),
+        ("generate_discount_distribution", (), load_discount_grid),
+        ("generate_avg_demand", (), load_demand_grid),
+    ]
+    for label in ("all", "combined"):
+        rows = load_filtered_data(*filters[label])
+        for name, args, loader in generators:
+            generate = getattr(charts, name)
+            inputs = {"rows": rows}
+            if loader is not load_filtered_data:
+                inputs["dashboard"] = loader(*filters[label])
+            for source, df in inputs.items():
+                params = {"filters": label, "input": source,
+                          "payload_bytes": len(to_json_plotly(generate(df, *args)))}
+                yield Benchmark(name, params, lambda generate=generate, df=df, args=args: generate(df, *args), None)
+
+    yield Benchmark("generate_empty_graph", {}, charts.generate_empty_graph, None)
+
+
+def forecast_benchmarks(frame, cache_dir):
+    from model import forecast
+    from model.engines import DEFAULT_ENGINE, ENGINE_LABELS
+    from model.feature_store import WeeklyFeatureStore
+    from utils.charts import make_forecast_chart
+
+    store_id, product_id = (str(value) for value in frame[['Store ID', 'Product ID']].iloc[0])
+    registry = forecast.forecast_registry
+
+    def call(engine=DEFAULT_ENGINE):
+        return forecast.get_forecast(store_id, product_id, FORECAST_HORIZON, engine=engine)
+
+    def untrained():
+        registry.memory.clear()
+        registry.directory = tempfile.mkdtemp(dir=cache_dir)
+
+    def no_features():
+        untrained()
+        forecast.feature_store = WeeklyFeatureStore(tempfile.mkdtemp(dir=cache_dir))
+
+    params = {"horizon": FORECAST_HORIZON, "engine": DEFAULT_ENGINE}
+    # Cold start also builds the weekly feature store; "train" finds it current
+    yield Benchmark("get_forecast", dict(params, state="cold"), call, no_features)
+    yield Benchmark("get_forecast", dict(params, state="train"), call, untrained)
+    for engine in ENGINE_LABELS:
+        if engine != DEFAULT_ENGINE:
+            yield Benchmark("get_forecast", dict(params, engine=engine, state="train"),
+                            lambda engine=engine: call(engine), untrained)
+    yield Benchmark("get_forecast", dict(params, state="disk"), call, registry.memory.clear)
+    yield Benchmark("get_forecast", dict(params, state="memory"), call, None)
+
+    weekly, (y_test, preds), _ = call()
+    yield Benchmark("make_forecast_chart", params,
+                    lambda: make_forecast_chart(weekly, y_test, preds, FORECAST_HORIZON, store_id, product_id),
+                    None)
+
+
+def measure(benchmark, repeat):
+    """Wall times of ``repeat`` calls, then one call's tracemalloc peak."""
+    times = []
+    for _ in range(repeat):
+        if benchmark.setup:
+            benchmark.setup()
+        gc.collect()
+        started = time.perf_counter()
+        benchmark.run()
+        times.append(time.perf_counter() - started)
+
+    if benchmark.setup:
+        benchmark.setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        benchmark.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": benchmark.name,
+        "params": benchmark.params,
+        "times_s": [round(value, 6) for value in times],
+        "median_s": round(statistics.median(times), 6),
+        "min_s": round(min(times), 6),
+        "peak_mb": round(peak / 1024 ** 2, 3),
+    }
+
+
+def result_key(result):
+    params = {key: value for key, value in result["params"].items() if key != "payload_bytes"}
+    return result["name"], json.dumps(params, sort_keys=True)
+
+
+def compare(results, baseline_path):
+    """Print the median time and peak memory of each benchmark against a baseline run."""
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = {result_key(result): result for result in json.load(fh)["results"]}
+
+    print(f"\n{'benchmark':<60} {'time':>10} {'vs base':>8} {'peak MB':>9} {'vs base':>8}")
+    for result in results:
+        name = result["name"] + " " + " ".join(
+            f"{key}={value}" for key, value in result["params"].items() if key != "payload_bytes"
+        )
+        before = baseline.get(result_key(result))
+        time_ratio = peak_ratio = ""
+        if before:
+            time_ratio = f"{result['median_s'] / max(before['median_s'], 1e-9):.2f}x"
+            peak_ratio = f"{result['peak_mb'] / max(before['peak_mb'], 1e-9):.2f}x"
+        print(f"{name[:60]:<60} {result['median_s']:>9.4f}s {time_ratio:>8} "
+              f"{result['peak_mb']:>9.1f} {peak_ratio:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard and forecast code paths.")
+    parser.add_argument("--data", required=True, help="sales CSV, e.g. from benchmarks.generate")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help=f"results JSON (default: {RESULTS_DIR}/<commit>-<rows>.json)")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--skip-forecast", action="store_true", help="leave out model training")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    cache_dir = tempfile.mkdtemp(prefix="sales-bench-")
+    configure(os.path.abspath(args.data), cache_dir)
+
+    import numpy as np
+    import pandas as pd
+    import sklearn
+
+    from utils.data_loader import load_data
+
+    started = time.perf_counter()
+    frame = load_data()
+    print(f"Loaded {len(frame)} rows in {time.perf_counter() - started:.1f}s")
+    filters = filter_sets(frame)
+
+    suites = [data_benchmarks(os.path.abspath(args.data), filters), chart_benchmarks(filters)]
+    if not args.skip_forecast:
+        suites.append(forecast_benchmarks(frame, cache_dir))
+
+    results = []
+    for suite in suites:
+        for benchmark in suite:
+            if args.only and args.only not in benchmark.name:
+                continue
+            result = measure(benchmark, args.repeat)
+            results.append(result)
+            params = " ".join(f"{key}={value}" for key, value in benchmark.params.items())
+            print(f"{benchmark.name} {params}: {result['median_s']:.4f}s, peak {result['peak_mb']:.1f} MB")
+
+    commit, dirty = git_commit()
+    try:
+        import resource
+        max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        max_rss_mb = None
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "data": os.path.abspath(args.data),
+            "rows": len(frame),
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "versions": {"numpy": np.__version__, "pandas": pd.__version__,
+                         "scikit-learn": sklearn.__version__},
+            "max_rss_mb": max_rss_mb,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'unknown'}-{len(frame)}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, default=str)
+    print(f"Wrote {len(results)} results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
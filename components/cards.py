@@ -18,8 +18,8 @@ def initialize_card(title, value, delta, is_positive):
         html.P(f"Δ {delta}", style={"color": color})
     ], className="kpi-card")
 
-def initialize_fc_card(title, value):
+def initialize_fc_card(title, value, is_error=False):
     return html.Div([
         html.H4(title, ),
-        html.H2(f"{value}"),
+        html.H2(f"{value}", style={"color": "red"} if is_error else None),
     ], className="kpi-card")
\ No newline at end of file
@@ -1,5 +1,17 @@
+import os
+
 from dash import html, dcc
 
+from model.engines import DEFAULT_ENGINE, ENGINE_LABELS, SAVED_MODEL, SAVED_MODEL_PATH
+
+def engine_options():
+    """Forecast engines, plus the saved model once one has been trained."""
+    options = [{"label": label, "value": engine} for engine, label in ENGINE_LABELS.items()]
+    if os.path.exists(SAVED_MODEL_PATH):
+        options.append({"label": "Saved model (no training)", "value": SAVED_MODEL})
+    return options
+
+
 def initialize_filter(options):
     date_range, store_options, category_options, price_slider = options
     start, end = date_range
@@ -122,6 +134,20 @@ def initialize_fc_filter(store_options, product_options):
                         className="styled-slider",
                     )
                 ], className="filter-item "),
+
+                html.Div([
+                    html.Div([
+                        html.Span("model_training", className="material-icons icon-label"),
+                        html.Label("Model", className="filter-label"),
+                    ], className="filter-title"),
+                    dcc.Dropdown(
+                        id='fc-engine',
+                        options=engine_options(),
+                        value=DEFAULT_ENGINE,
+                        clearable=False,
+                        className='styled-dropdown'
+                    )
+                ], className="filter-item "),
                 
                 html.Div([
                     html.Button(
@@ -129,6 +155,12 @@ def initialize_fc_filter(store_options, product_options):
                         id="fc-button", 
                         n_clicks=0,
                         className="run-button"
+                    ),
+                    html.Button(
+                        "Cancel", 
+                        id="fc-cancel", 
+                        n_clicks=0,
+                        className="run-button cancel-button"
                     )
                 ], className="filter-item"),
             ], className="filter-column dropdowns-col"),
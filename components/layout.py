@@ -1,23 +1,44 @@
 from components.filters import initialize_filter, initialize_fc_filter
 from components.cards import initialize_cards, initialize_fc_card
 from components.charts import initialize_chart, initialize_inventory_sales_chart, initialize_discount_disctribution, initialize_category_region_treemap, initialize_promo_vs_no_promo, initialize_price_demand_correlation_chart
-from utils.data_loader import load_data, compute_kpis, compute_filter_args
-from utils.charts import generate_empty_graph
+from utils.data_loader import load_data, compute_filter_args
+from utils.cube import load_filtered_cube
+from utils.demand_grid import load_demand_grid
+from utils.discount_grid import load_discount_grid
+from utils.kpis import load_kpis
+from utils.charts import generate_empty_graph, generate_discount_distribution
+from utils.figure_cache import chart_figure
+from utils.client_cube import CLIENTSIDE, CLIENT_CHARTS, load_client_cube
+from utils.figure_patch import rendered_store
 from dash import html
 from dash import dcc
 
 def create_layout():
-    return html.Div([
+    children = [
         dcc.Tabs(id="main-tabs", value="historical", children=[
             dcc.Tab(label="Dashboard", value="historical"),
             dcc.Tab(label="Forecast ",  value="forecast"),
         ]),
         html.Div(id="tabs-content")
-    ], className="dashboard-container")
+    ]
+    if CLIENTSIDE:
+        # Cube for the clientside chart callbacks, sent once per page load
+        children.append(dcc.Store(id="sales-cube", data=load_client_cube()))
+    return html.Div(children, className="dashboard-container")
     
 def historical_layout(data):
     filter_args = compute_filter_args(data)
-    kpi_values = compute_kpis(data)
+    kpi_values = load_kpis(None, None, None, None, None)
+    # Unfiltered monthly rollup backing the cube-based charts
+    cube = load_filtered_cube(None, None, None, None, None)
+    demand_grid = load_demand_grid(None, None, None, None, None)
+    # Filters as the controls start out (price slider at its top), so the
+    # chart's first callback is served this same cached figure
+    initial_filters = (None, None, None, None, filter_args[3][0])
+    discount_figure = chart_figure('discount-vs-sales-chart', initial_filters, load_discount_grid, generate_discount_distribution)
+    server_charts = ['discount-vs-sales-chart', 'price-demand-heatmap']
+    if not CLIENTSIDE:
+        server_charts += list(CLIENT_CHARTS)
     return html.Div([
         html.Div(initialize_filter(filter_args), className="filter-section"),
 
@@ -28,19 +49,21 @@ def historical_layout(data):
                     className="kpi-row", 
                     children=initialize_cards(kpi_values)
                 ),
-                html.Div(initialize_chart(data), className="chart-box"),
+                html.Div(initialize_chart(cube), className="chart-box"),
             ], className="left-panel"),
 
-            html.Div(initialize_inventory_sales_chart(data), className="chart-box full-height"),
+            html.Div(initialize_inventory_sales_chart(cube), className="chart-box full-height"),
         ], className="dashboard-row"),
         
         html.Div([
-            html.Div(initialize_category_region_treemap(data), className="chart-box"),
-            html.Div(initialize_promo_vs_no_promo(data), className="chart-box"),
-            html.Div(initialize_discount_disctribution(data), className="chart-box"),
-            html.Div(initialize_price_demand_correlation_chart(data), className="chart-box"),
-        ], className="chart-grid")
+            html.Div(initialize_category_region_treemap(cube), className="chart-box"),
+            html.Div(initialize_promo_vs_no_promo(cube), className="chart-box"),
+            html.Div(initialize_discount_disctribution(discount_figure), className="chart-box"),
+            html.Div(initialize_price_demand_correlation_chart(demand_grid), className="chart-box"),
+        ], className="chart-grid"),
 
+        # What each server-updated chart shows, so later updates can be patches
+        *[rendered_store(chart_id) for chart_id in server_charts],
     ], className="dashboard-container")
 
 def forecast_layout():
@@ -69,7 +92,8 @@ def forecast_layout():
             html.Div([
                 html.Div([
                     html.H4("Forecast Performance", className="kpi-section-title"),
-                    default_kpis  
+                    default_kpis,
+                    html.Div(id="fc-status", className="fc-status")
                 ], className="kpi-container")
             ], className="kpi-column"),
             
@@ -82,4 +106,8 @@ def forecast_layout():
                 ], className="chart-box")
             ], className="graph-column"),
         ], className="row main-content-row"),
+
+        # Background forecast job being polled, if any
+        dcc.Store(id="fc-job"),
+        dcc.Interval(id="fc-poll", interval=500, disabled=True),
     ], className="dashboard-container")
\ No newline at end of file
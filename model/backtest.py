@@ -0,0 +1,217 @@
+"""
+Rolling-origin backtests of the forecast model over every store x product
+series.
+
+    python -m model.backtest --folds 12 --step 4 --horizons 4 8 12 --workers 8
+
+For each series the model is refitted at ``--folds`` forecast origins,
+``--step`` weeks apart and ending ``max(--horizons)`` weeks before the
+last week. Each refit is scored on the first h weeks after its origin for
+every h in ``--horizons``. The fit (preprocessing included) only depends
+on the training window, so one fit per origin serves all horizons.
+
+Folds run in a process pool, one task per series and origin. Their
+features are slices of the weekly feature store's series: every feature
+only looks back in time, so computing them once per series, not per fold,
+leaks nothing. Finished series are kept as Parquet parts under
+``<output>.parts/``, keyed by engine, fold layout and data version, so a
+rerun only fits what changed. The output is a compact table of the
+MAE/RMSE/R² distribution over folds per store, product and horizon.
+"""
+import argparse
+import hashlib
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from model.batch import limit_threads
+from model.engines import DEFAULT_ENGINE, ENGINE_LABELS
+from model.feature_store import WeeklyFeatureStore
+from model.features import SERIES_KEYS
+from utils.data_loader import DATA_PATH, dataset_digest, read_sales_data
+
+DEFAULT_OUTPUT = "model/backtest.parquet"
+MIN_TRAIN_WEEKS = 26
+QUANTILES = (0.1, 0.5, 0.9)
+
+# Per-worker state, filled by _init_worker (inherited as-is under fork)
+_features = None
+_threads = 1
+
+
+def _init_worker(data_path, threads):
+    global _features, _threads
+    _threads = threads
+    limit_threads(threads)
+    if _features is None:
+        data = read_sales_data(data_path)
+        _features = WeeklyFeatureStore()
+        _features.sync(data, dataset_digest(data_path))
+
+
+def fold_origins(weeks, folds, step, horizon):
+    """
+    Row positions of the forecast origins of a ``weeks``-long series, oldest
+    first: the last ``horizon`` weeks are the newest fold's test weeks, and
+    every fold keeps at least MIN_TRAIN_WEEKS weeks to train on.
+    """
+    newest = weeks - horizon
+    return [origin for origin in range(newest - step * (folds - 1), newest + 1, step)
+            if origin >= MIN_TRAIN_WEEKS]
+
+
+def score(y_true, y_pred):
+    mae = mean_absolute_error(y_true, y_pred)
+    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
+    # R² needs some spread in the actuals
+    r2 = r2_score(y_true, y_pred) if len(y_true) > 1 and np.ptp(y_true) > 0 else np.nan
+    return mae, rmse, r2
+
+
+def backtest_fold(store_id, product_id, origin, horizons, engine=DEFAULT_ENGINE):
+    """Fit one series on the weeks before ``origin`` and score each horizon. Runs inside a worker."""
+    from model.forecast import feature_matrix
+    from model.pipeline import build_model, fit_model
+
+    weekly = _features.series(store_id, product_id)
+    X, y = feature_matrix(weekly)
+    test_end = origin + max(horizons)
+
+    started = time.perf_counter()
+    model = build_model(_threads, engine)
+    fit_model(model, engine, X.iloc[:origin], y.iloc[:origin], weekly["Week_Start"].iloc[:origin])
+    fit_seconds = time.perf_counter() - started
+    preds = model.predict(X.iloc[origin:test_end])
+    actual = y.iloc[origin:test_end].to_numpy(dtype="float64")
+
+    rows = []
+    for horizon in horizons:
+        mae, rmse, r2 = score(actual[:horizon], preds[:horizon])
+        rows.append({
+            "Store ID": store_id,
+            "Product ID": product_id,
+            "Engine": engine,
+            "Origin": weekly["Week_Start"].iloc[origin],
+            "Horizon": horizon,
+            "MAE": mae,
+            "RMSE": rmse,
+            "R2": r2,
+            "Fit_Seconds": fit_seconds,
+        })
+    return store_id, product_id, rows
+
+
+def part_path(parts_dir, store_id, product_id, layout):
+    digest = hashlib.blake2b(f"{store_id}|{product_id}|{layout}".encode(), digest_size=8).hexdigest()
+    return os.path.join(parts_dir, f"part-{digest}.parquet")
+
+
+def write_part(path, rows):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pd.DataFrame(rows).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def summarize(folds):
+    """Fold count and the mean and quantiles of MAE, RMSE and R² per series, horizon and engine."""
+    keys = SERIES_KEYS + ["Horizon", "Engine"]
+    grouped = folds.groupby(keys, observed=True, sort=True)
+    columns = {"Folds": grouped["MAE"].size()}
+    for metric in ("MAE", "RMSE", "R2"):
+        columns[f"{metric}_Mean"] = grouped[metric].mean()
+        for quantile in QUANTILES:
+            columns[f"{metric}_P{quantile * 100:.0f}"] = grouped[metric].quantile(quantile)
+    columns["Fit_Seconds"] = grouped["Fit_Seconds"].mean()
+    return pd.DataFrame(columns).reset_index()
+
+
+def run_backtest(data_path=DATA_PATH, output=DEFAULT_OUTPUT, horizons=(4, 8, 12), folds=12, step=4,
+                 engine=DEFAULT_ENGINE, workers=None, threads=1, limit=None):
+    """Backtest every series not already done; returns (fold results, summary)."""
+    horizons = sorted(set(horizons))
+    parts_dir = f"{output}.parts"
+    os.makedirs(parts_dir, exist_ok=True)
+    layout = f"{engine}|{folds}|{step}|{','.join(map(str, horizons))}|{dataset_digest(data_path)}"
+
+    # Load once in the parent so forked workers inherit data and features
+    _init_worker(data_path, threads)
+    pairs = list(_features.weeks.groupby(SERIES_KEYS, observed=True, sort=True).groups)
+    if limit:
+        pairs = pairs[:limit]
+
+    tasks = defaultdict(list)
+    for pair in pairs:
+        if not os.path.exists(part_path(parts_dir, *pair, layout)):
+            weeks = len(_features.series(*pair))
+            tasks[pair] = fold_origins(weeks, folds, step, horizons[-1])
+    print(f"{len(pairs)} series, {len(pairs) - len(tasks)} already done, "
+          f"{sum(map(len, tasks.values()))} folds to fit")
+
+    started = time.perf_counter()
+    pending = {pair: len(origins) for pair, origins in tasks.items()}
+    results = defaultdict(list)
+    for pair, origins in tasks.items():
+        if not origins:
+            # Too short to backtest: an empty part so reruns skip it
+            write_part(part_path(parts_dir, *pair, layout), [])
+    if any(pending.values()):
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(data_path, threads),
+        ) as pool:
+            futures = [pool.submit(backtest_fold, *pair, origin, horizons, engine)
+                       for pair, origins in tasks.items() for origin in origins]
+            for done, future in enumerate(as_completed(futures), 1):
+                store_id, product_id, rows = future.result()
+                pair = (store_id, product_id)
+                results[pair].extend(rows)
+                pending[pair] -= 1
+                if not pending[pair]:
+                    write_part(part_path(parts_dir, *pair, layout), results.pop(pair))
+                if done % 100 == 0 or done == len(futures):
+                    elapsed = time.perf_counter() - started
+                    print(f"  {done}/{len(futures)} folds in {elapsed:.1f}s")
+
+    fold_results = pd.concat(
+        [pd.read_parquet(part_path(parts_dir, *pair, layout)) for pair in pairs],
+        ignore_index=True
+    )
+    if fold_results.empty:
+        print("No series with enough history to backtest")
+        return fold_results, fold_results
+    summary = summarize(fold_results)
+    tmp_output = f"{output}.tmp"
+    summary.to_parquet(tmp_output, index=False)
+    os.replace(tmp_output, output)
+    print(f"Wrote {len(summary)} rows ({len(fold_results)} folds) to {output}")
+    return fold_results, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of every store/product series.")
+    parser.add_argument("--data", default=DATA_PATH, help="sales CSV (default: %(default)s)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Parquet summary (default: %(default)s)")
+    parser.add_argument("--horizons", type=int, nargs="+", default=[4, 8, 12], help="weeks ahead scored")
+    parser.add_argument("--folds", type=int, default=12, help="forecast origins per series")
+    parser.add_argument("--step", type=int, default=4, help="weeks between origins")
+    parser.add_argument("--engine", choices=list(ENGINE_LABELS), default=DEFAULT_ENGINE, help="forecast model")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--threads", type=int, default=1, help="threads per worker")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N series")
+    args = parser.parse_args(argv)
+
+    fold_results, summary = run_backtest(args.data, args.output, args.horizons, args.folds, args.step,
+                                         args.engine, args.workers, args.threads, args.limit)
+    if not summary.empty:
+        overall = fold_results.groupby("Horizon")[["MAE", "RMSE", "R2"]].describe(percentiles=list(QUANTILES))
+        print(overall.loc[:, (slice(None), ["mean", "10%", "50%", "90%"])].round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
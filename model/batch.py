@@ -0,0 +1,174 @@
+"""
+Headless batch forecasting over every store x product series.
+
+    python -m model.batch --workers 8 --threads 1 --horizon 8 --engine hgb
+
+Each series is trained and scored in a process pool worker. Finished
+series are written as small Parquet parts under ``<output>.parts/``,
+keyed by horizon, engine and data version; a rerun skips series that
+already have a part for the same data, so an interrupted run resumes
+where it stopped and a run on changed data forecasts everything again. Once every series is done the parts are
+combined into the single ``--output`` Parquet file.
+"""
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from model.engines import DEFAULT_ENGINE, ENGINE_LABELS
+from model.feature_store import WeeklyFeatureStore
+from model.features import SERIES_KEYS
+from utils.data_loader import DATA_PATH, dataset_digest, read_sales_data
+from utils.ingest import ingest_sales
+
+DEFAULT_OUTPUT = "model/forecasts.parquet"
+
+# Per-worker state, filled by _init_worker (inherited as-is under fork)
+_pairs = None
+_features = None
+_threads = 1
+
+
+def part_path(parts_dir, store_id, product_id, layout):
+    digest = hashlib.blake2b(f"{store_id}|{product_id}|{layout}".encode(), digest_size=8).hexdigest()
+    return os.path.join(parts_dir, f"part-{digest}.parquet")
+
+
+def limit_threads(threads):
+    """Cap BLAS/OpenMP pools so N workers x threads stays within the machine."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+
+
+def _init_worker(data_path, threads, stream=False):
+    global _pairs, _features, _threads
+    _threads = threads
+    limit_threads(threads)
+    if _features is None:
+        _features = WeeklyFeatureStore()
+        version = dataset_digest(data_path)
+        if stream:
+            # Weekly aggregates from bounded chunks; raw rows are never resident
+            if not _features.is_current(version):
+                aggregates = ingest_sales(data_path)
+                _features.load_weeks(aggregates.weeks, version, aggregates.watermark, aggregates.rows)
+            _pairs = list(_features.weeks.groupby(SERIES_KEYS, observed=True, sort=True).groups)
+        else:
+            # Features for every series, only recomputed where the data changed
+            data = read_sales_data(data_path)
+            _pairs = list(data.groupby(SERIES_KEYS, observed=True, sort=True).groups)
+            _features.sync(data, version)
+
+
+def forecast_series(store_id, product_id, horizon, parts_dir, layout, engine=DEFAULT_ENGINE):
+    """Train, score and persist one series. Runs inside a worker."""
+    from model.forecast import fit_forecast
+
+    weekly = _features.series(store_id, product_id)
+    started = time.perf_counter()
+    entry = fit_forecast(weekly, horizon, n_jobs=_threads, engine=engine)
+    fit_seconds = time.perf_counter() - started
+
+    if entry["error"]:
+        part = pd.DataFrame({
+            "Store ID": [store_id], "Product ID": [product_id], "Horizon": [horizon], "Engine": [engine],
+            "Week_Start": [pd.NaT], "Actual": [np.nan], "Forecast": [np.nan],
+            "MAE": [np.nan], "RMSE": [np.nan], "R2": [np.nan],
+            "Fit_Seconds": [fit_seconds], "Error": [entry["error"]],
+        })
+    else:
+        y_test, preds = entry["y_test"], entry["preds"]
+        part = pd.DataFrame({
+            "Store ID": store_id,
+            "Product ID": product_id,
+            "Horizon": horizon,
+            "Engine": engine,
+            "Week_Start": entry["weekly"]["Week_Start"].iloc[-horizon:].to_numpy(),
+            "Actual": y_test.to_numpy(dtype="float64"),
+            "Forecast": preds,
+            "MAE": mean_absolute_error(y_test, preds),
+            "RMSE": np.sqrt(mean_squared_error(y_test, preds)),
+            "R2": r2_score(y_test, preds),
+            "Fit_Seconds": fit_seconds,
+            "Error": None,
+        })
+
+    path = part_path(parts_dir, store_id, product_id, layout)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    part.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return store_id, product_id, entry["error"]
+
+
+def run_batch(data_path=DATA_PATH, output=DEFAULT_OUTPUT, horizon=8, workers=None, threads=1, limit=None,
+              stream=False, engine=DEFAULT_ENGINE):
+    """Forecast every series not already done; returns the combined frame."""
+    parts_dir = f"{output}.parts"
+    os.makedirs(parts_dir, exist_ok=True)
+    layout = f"{horizon}|{engine}|{dataset_digest(data_path)}"
+
+    # Load once in the parent so forked workers inherit data and features
+    _init_worker(data_path, threads, stream)
+    pairs = _pairs
+    if limit:
+        pairs = pairs[:limit]
+    todo = [pair for pair in pairs if not os.path.exists(part_path(parts_dir, *pair, layout))]
+    print(f"{len(pairs)} series, {len(pairs) - len(todo)} already done, {len(todo)} to run")
+
+    started = time.perf_counter()
+    if todo:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(data_path, threads, stream),
+        ) as pool:
+            futures = [pool.submit(forecast_series, store_id, product_id, horizon, parts_dir, layout, engine)
+                       for store_id, product_id in todo]
+            for done, future in enumerate(as_completed(futures), 1):
+                store_id, product_id, error = future.result()
+                if error:
+                    print(f"  {store_id}/{product_id}: {error}")
+                if done % 50 == 0 or done == len(todo):
+                    elapsed = time.perf_counter() - started
+                    print(f"  {done}/{len(todo)} series in {elapsed:.1f}s")
+
+    result = pd.concat(
+        [pd.read_parquet(part_path(parts_dir, *pair, layout)) for pair in pairs],
+        ignore_index=True
+    )
+    tmp_output = f"{output}.tmp"
+    result.to_parquet(tmp_output, index=False)
+    os.replace(tmp_output, output)
+    print(f"Wrote {len(result)} rows to {output}")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast every store/product series.")
+    parser.add_argument("--data", default=DATA_PATH, help="sales CSV (default: %(default)s)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Parquet output (default: %(default)s)")
+    parser.add_argument("--horizon", type=int, default=8, help="weeks held out and forecast")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--threads", type=int, default=1, help="threads per worker")
+    parser.add_argument("--engine", choices=list(ENGINE_LABELS), default=DEFAULT_ENGINE, help="forecast model")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N series")
+    parser.add_argument("--stream", action="store_true",
+                        help="build features by streaming the CSV in chunks (SALES_INGEST_MEMORY_MB)")
+    args = parser.parse_args(argv)
+
+    run_batch(args.data, args.output, args.horizon, args.workers, args.threads, args.limit, args.stream,
+              args.engine)
+
+
+if __name__ == "__main__":
+    main()
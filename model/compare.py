@@ -0,0 +1,115 @@
+"""
+Fit time vs accuracy of every forecast engine on the same series.
+
+    python -m model.compare --series 30 --horizon 8 --budget 5
+
+Each engine fits and scores the held-out ``--horizon`` weeks of the same
+sample of store/product series (evenly spread over all of them), one
+series at a time on ``--threads`` threads so the timings compare. The
+report gives each engine's fit time and mean errors. It then names the
+cheapest engine whose mean MAE is within ``--budget`` percent of the most
+accurate engine's, or under ``--max-mae`` units when that is given.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+from model.batch import limit_threads
+from model.engines import ENGINE_LABELS
+from model.feature_store import WeeklyFeatureStore
+from model.features import SERIES_KEYS
+from utils.data_loader import DATA_PATH, dataset_digest, read_sales_data
+
+
+def sample_series(data, count):
+    """``count`` store/product pairs spread evenly over all of them."""
+    pairs = list(data.groupby(SERIES_KEYS, observed=True, sort=True).groups)
+    if count >= len(pairs):
+        return pairs
+    return [pairs[i] for i in np.linspace(0, len(pairs) - 1, count).round().astype(int)]
+
+
+def compare_engines(data_path=DATA_PATH, engines=tuple(ENGINE_LABELS), series=30, horizon=8, threads=1):
+    """One row per engine and series: fit seconds, MAE and RMSE."""
+    from model.forecast import fit_forecast
+
+    limit_threads(threads)
+    data = read_sales_data(data_path)
+    features = WeeklyFeatureStore()
+    features.sync(data, dataset_digest(data_path))
+
+    rows = []
+    for store_id, product_id in sample_series(data, series):
+        weekly = features.series(store_id, product_id)
+        for engine in engines:
+            started = time.perf_counter()
+            entry = fit_forecast(weekly, horizon, n_jobs=threads, engine=engine)
+            fit_seconds = time.perf_counter() - started
+            if entry["error"]:
+                continue
+            y_test, preds = entry["y_test"], entry["preds"]
+            rows.append({
+                "Engine": engine,
+                "Store ID": store_id,
+                "Product ID": product_id,
+                "Fit_Seconds": fit_seconds,
+                "MAE": mean_absolute_error(y_test, preds),
+                "RMSE": np.sqrt(mean_squared_error(y_test, preds)),
+            })
+    return pd.DataFrame(rows)
+
+
+def summarize(results, budget=5.0, max_mae=None):
+    """
+    Per-engine totals, cheapest first, and the engine to pick: the
+    cheapest one whose mean MAE is at most ``max_mae`` or, without it,
+    within ``budget`` percent of the best mean MAE (None if none is).
+    """
+    summary = results.groupby("Engine").agg(
+        Series=("MAE", "size"),
+        Fit_Seconds=("Fit_Seconds", "sum"),
+        Median_Fit_Ms=("Fit_Seconds", lambda seconds: seconds.median() * 1000),
+        MAE=("MAE", "mean"),
+        RMSE=("RMSE", "mean"),
+    ).sort_values("Fit_Seconds")
+    summary["MAE_vs_Best_Pct"] = (summary["MAE"] / summary["MAE"].min() - 1) * 100
+
+    limit = max_mae if max_mae is not None else summary["MAE"].min() * (1 + budget / 100)
+    within = summary.index[summary["MAE"] <= limit]
+    return summary, (within[0] if len(within) else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare forecast engines on fit time and accuracy.")
+    parser.add_argument("--data", default=DATA_PATH, help="sales CSV (default: %(default)s)")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINE_LABELS), default=list(ENGINE_LABELS))
+    parser.add_argument("--series", type=int, default=30, help="store/product series to fit per engine")
+    parser.add_argument("--horizon", type=int, default=8, help="weeks held out and forecast")
+    parser.add_argument("--threads", type=int, default=1, help="threads per fit")
+    parser.add_argument("--budget", type=float, default=5.0,
+                        help="allowed mean MAE above the most accurate engine, in percent")
+    parser.add_argument("--max-mae", type=float, default=None, help="absolute mean MAE budget instead")
+    parser.add_argument("--output", default=None, help="also write the per-series results to this CSV")
+    args = parser.parse_args(argv)
+
+    results = compare_engines(args.data, args.engines, args.series, args.horizon, args.threads)
+    if results.empty:
+        print("No series with enough history to compare on")
+        return
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+    summary, pick = summarize(results, args.budget, args.max_mae)
+    summary.index = [f"{engine} ({ENGINE_LABELS[engine]})" for engine in summary.index]
+    print(summary.to_string(float_format=lambda value: f"{value:.3f}"))
+    if pick is None:
+        print("No engine meets the error budget")
+    else:
+        print(f"Cheapest engine within the error budget: {pick} ({ENGINE_LABELS[pick]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Forecast model engines. Kept free of the training stack so the dashboard
+layout can list them without importing scikit-learn.
+
+    rf       RandomForestRegressor, 300 trees (the original model)
+    hgb      scikit-learn HistGradientBoostingRegressor
+    xgboost  XGBRegressor with ``hist`` trees
+
+Both boosting engines split categoricals natively instead of one-hot
+encoding them, and stop adding trees once the newest weeks of the
+training data (a time-ordered validation split) stop improving.
+"""
+import os
+
+ENGINE_LABELS = {
+    'rf': 'Random forest',
+    'hgb': 'Histogram boosting',
+    'xgboost': 'XGBoost (hist)',
+}
+DEFAULT_ENGINE = os.environ.get("SALES_FORECAST_ENGINE", "rf")
+if DEFAULT_ENGINE not in ENGINE_LABELS:
+    raise ValueError(f"SALES_FORECAST_ENGINE must be one of {', '.join(ENGINE_LABELS)}, not {DEFAULT_ENGINE!r}")
+
+# Forecast tab option that scores with the pipeline saved by
+# ``model.train --per-series`` (model/inference.py) instead of training;
+# offered only once that file exists
+SAVED_MODEL = 'saved'
+SAVED_MODEL_PATH = os.environ.get("SALES_MODEL_PATH", f"model/sales_{DEFAULT_ENGINE}_series_model.pkl")
@@ -0,0 +1,252 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from model.features import (
+    FEATURE_COLUMNS, LAG_WEEKS, SERIES_KEYS,
+    aggregate_weeks, features_from_weeks, series_positions, week_marker,
+)
+from model.registry import FEATURE_SCHEMA_VERSION
+from utils.data_store import file_lock
+
+FEATURE_STORE_DIR = os.environ.get("SALES_FEATURE_STORE_DIR", "model/cache/features")
+
+
+def rows_from(data, start, inclusive=True):
+    """Rows dated from ``start`` on (a tail slice when the frame is date-sorted)."""
+    dates = data['Date']
+    if dates.is_monotonic_increasing:
+        return data.iloc[dates.searchsorted(start, side='left' if inclusive else 'right'):]
+    return data[dates >= start] if inclusive else data[dates > start]
+
+
+def count_through(data, watermark):
+    dates = data['Date']
+    if dates.is_monotonic_increasing:
+        return int(dates.searchsorted(watermark, side='right'))
+    return int((dates <= watermark).sum())
+
+
+# Source columns the weekly aggregates read
+SOURCE_COLUMNS = SERIES_KEYS + [
+    'Date', 'Units Sold', 'Units Ordered', 'Inventory Level', 'Price', 'Discount',
+    'Promotion', 'Competitor Pricing', 'Demand', 'Epidemic', 'Category', 'Region',
+]
+
+
+def history_digest(data, watermark):
+    """
+    Digest of the source columns of the rows dated up to ``watermark``.
+    Order-independent (a wrapping sum of row hashes), so re-sorting the
+    same rows keeps it, while editing any of them changes it.
+    """
+    dates = data['Date']
+    if dates.is_monotonic_increasing:
+        rows = data.iloc[:dates.searchsorted(watermark, side='right')]
+    else:
+        rows = data[dates <= watermark]
+    hashes = pd.util.hash_pandas_object(rows[SOURCE_COLUMNS], index=False).to_numpy()
+    return f"{int(hashes.sum(dtype=np.uint64)):016x}"
+
+
+class WeeklyFeatureStore:
+    """
+    Persisted weekly aggregates and model features for every store/product
+    series, kept in sync with the sales data incrementally.
+
+    ``sync`` compares the data with the stored watermark (latest ingested
+    date). When rows were only appended after it, just the trailing weeks
+    of the series that received rows are re-aggregated, and their features
+    are recomputed over those weeks plus the lag window before them. The
+    previously incomplete last week is re-aggregated too, and each touched
+    series' previous last week (dropped as incomplete) gets its features,
+    so the "drop the first/last incomplete week" rule stays exact. Rows at
+    or before the watermark are checked by count and content digest; any
+    change to them triggers a full rebuild.
+    """
+
+    def __init__(self, directory=FEATURE_STORE_DIR):
+        self.directory = directory
+        self.weeks = None
+        self.features = None
+        self.state = None
+        self._groups = None
+        self._lock = threading.Lock()
+
+    def sync(self, data, version):
+        """Bring the store up to date with ``data`` (content ``version``)."""
+        with self._lock:
+            if self.is_current(version):
+                return
+
+            # Processes sharing the directory sync one at a time; a waiter
+            # picks up what the previous one wrote instead of redoing it
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError:
+                pass
+            with file_lock(os.path.join(self.directory, "sync.lock")):
+                self._read()
+                if self.is_current(version):
+                    return
+
+                usable = (
+                    self.state is not None
+                    and self.state["schema"] == FEATURE_SCHEMA_VERSION
+                    and self.state.get("history") is not None
+                    and count_through(data, pd.Timestamp(self.state["watermark"])) == self.state["rows"]
+                    and history_digest(data, pd.Timestamp(self.state["watermark"])) == self.state["history"]
+                )
+                if usable:
+                    self._append(data)
+                else:
+                    self._rebuild(data)
+
+                watermark = data['Date'].max()
+                self._commit(version, watermark, count_through(data, watermark),
+                             history_digest(data, watermark))
+
+    def load_weeks(self, weeks, version, watermark, rows):
+        """
+        Rebuild from weekly aggregates computed elsewhere (e.g. by streaming
+        ingestion) unless the persisted store already matches ``version``.
+        ``rows`` is the number of source rows dated up to ``watermark``.
+        Without the rows there is no history digest, so the next ``sync``
+        on changed data rebuilds in full.
+        """
+        with self._lock:
+            if self.is_current(version):
+                return
+            self.weeks = weeks
+            self.features = features_from_weeks(weeks).reset_index(drop=True)
+            self._commit(version, watermark, rows)
+
+    def is_current(self, version):
+        """Whether the store (in memory or on disk) reflects data ``version``."""
+        if self.state is None:
+            self._read()
+        return self.state is not None and self.state["version"] == version
+
+    def series(self, store_id, product_id):
+        """Feature rows of one series, in week order."""
+        with self._lock:
+            features = self.features
+            if self._groups is None:
+                self._groups = features.groupby(SERIES_KEYS, observed=True, sort=False).indices
+            positions = self._groups.get((store_id, product_id), np.empty(0, dtype=np.intp))
+        return features.iloc[positions][FEATURE_COLUMNS].reset_index(drop=True)
+
+    def _rebuild(self, data):
+        self.weeks = aggregate_weeks(data)
+        self.features = features_from_weeks(self.weeks).reset_index(drop=True)
+
+    def _append(self, data):
+        watermark = pd.Timestamp(self.state["watermark"])
+        new_rows = rows_from(data, watermark, inclusive=False)
+        if new_rows.empty:
+            return
+
+        # The watermark's week may have been incomplete: redo it from its start
+        cutoff = week_marker(pd.Series([watermark]))[0]
+        touched = new_rows[SERIES_KEYS].drop_duplicates().astype(object)
+        touched_index = pd.MultiIndex.from_frame(touched)
+
+        # A touched series' previous last week had its features dropped as
+        # incomplete; once the series resumes (possibly after a gap) it is
+        # an interior week, so features are redone from there
+        last_weeks = self.weeks.groupby(
+            [self.weeks[key].astype(object) for key in SERIES_KEYS], sort=False
+        )['Week_Marker'].max()
+        feature_start = last_weeks.reindex(touched_index).fillna(cutoff).clip(upper=cutoff)
+
+        recent = rows_from(data, cutoff)
+        recent_keys = pd.MultiIndex.from_frame(recent[SERIES_KEYS].astype(object))
+        fresh_weeks = aggregate_weeks(recent[recent_keys.isin(touched_index)])
+
+        weeks = self.weeks
+        week_keys = pd.MultiIndex.from_frame(weeks[SERIES_KEYS].astype(object))
+        stale = week_keys.isin(touched_index) & (weeks['Week_Marker'] >= cutoff).to_numpy()
+        weeks = pd.concat([weeks[~stale], fresh_weeks], ignore_index=True)
+        weeks = weeks.sort_values(SERIES_KEYS + ['Week_Marker'], kind='stable', ignore_index=True)
+
+        # Recompute features from LAG_WEEKS + 1 weeks before the first changed
+        # week: the earliest of those is dropped as a "first week", the rest
+        # feed the lags and price change of the changed weeks
+        week_keys = pd.MultiIndex.from_frame(weeks[SERIES_KEYS].astype(object))
+        in_touched = week_keys.isin(touched_index)
+        position, _ = series_positions(weeks)
+        start = feature_start.reindex(week_keys).to_numpy()
+        changed = in_touched & (weeks['Week_Marker'].to_numpy() >= start)
+        first_changed = pd.Series(np.where(changed, position, np.iinfo(np.int64).max)) \
+            .groupby([weeks[key].astype(object) for key in SERIES_KEYS]).transform('min').to_numpy()
+        window = in_touched & (position >= first_changed - LAG_WEEKS - 1)
+        recomputed = features_from_weeks(weeks[window])
+        recomputed_keys = pd.MultiIndex.from_frame(recomputed[SERIES_KEYS].astype(object))
+        recomputed = recomputed[
+            recomputed['Week_Marker'].to_numpy() >= feature_start.reindex(recomputed_keys).to_numpy()
+        ]
+
+        features = self.features
+        feature_keys = pd.MultiIndex.from_frame(features[SERIES_KEYS].astype(object))
+        stale = feature_keys.isin(touched_index) & (
+            features['Week_Marker'].to_numpy() >= feature_start.reindex(feature_keys).to_numpy()
+        )
+        features = pd.concat([features[~stale], recomputed], ignore_index=True)
+
+        self.weeks = weeks
+        self.features = features.sort_values(
+            SERIES_KEYS + ['Week_Marker'], kind='stable', ignore_index=True
+        )
+
+    def _commit(self, version, watermark, rows, history=None):
+        self.state = {
+            "schema": FEATURE_SCHEMA_VERSION,
+            "version": version,
+            "watermark": watermark.isoformat(),
+            "rows": int(rows),
+            "history": history,
+        }
+        self._groups = None
+        self._write()
+
+    def _paths(self):
+        return (
+            os.path.join(self.directory, "weeks.parquet"),
+            os.path.join(self.directory, "features.parquet"),
+            os.path.join(self.directory, "state.json"),
+        )
+
+    def _read(self):
+        weeks_path, features_path, state_path = self._paths()
+        if not os.path.exists(state_path):
+            return
+        try:
+            with open(state_path) as fh:
+                state = json.load(fh)
+            if state == self.state:
+                return
+            self.weeks = pd.read_parquet(weeks_path)
+            self.features = pd.read_parquet(features_path)
+            self.state = state
+            self._groups = None
+        except (OSError, ValueError) as exc:
+            print(f"Ignoring unreadable feature store in {self.directory}: {exc}")
+
+    def _write(self):
+        weeks_path, features_path, state_path = self._paths()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for frame, path in ((self.weeks, weeks_path), (self.features, features_path)):
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                frame.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, path)
+            # State last: it only points at data files that are complete
+            tmp_path = f"{state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as fh:
+                json.dump(self.state, fh)
+            os.replace(tmp_path, state_path)
+        except OSError as exc:
+            print(f"Could not persist feature store in {self.directory}: {exc}")
@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+
+LAG_WEEKS = 8
+SERIES_KEYS = ['Store ID', 'Product ID']
+
+# Column order produced by create_features, which build_model relies on
+WEEKLY_COLUMNS = [
+    'Week_Marker', 'Units_Sold', 'Inventory_Level', 'Price',
+    'Discount', 'Promotion', 'Competitor_Pricing', 'Demand',
+    'Units_Ordered', 'Epidemic', 'Store_ID', 'Product_ID',
+    'Category', 'Region', 'Week_Start', 'Week_End', 'Days_in_Week'
+]
+FEATURE_COLUMNS = WEEKLY_COLUMNS + [
+    'Week_Num', 'Month', 'Quarter', 'Year',
+    'Price_Change', 'Discount_Intensity', 'Competitive_Advantage',
+] + [
+    f'{name}_Lag_{i}' for i in range(1, LAG_WEEKS + 1) for name in ('Sales', 'Demand')
+]
+
+
+def week_marker(dates):
+    """Monday of each date's week."""
+    return dates - pd.to_timedelta(dates.dt.dayofweek, unit='D')
+
+
+# Weekly aggregation rules, as (output column, source column)
+WEEK_SUMS = [('Units_Sold', 'Units Sold'), ('Units_Ordered', 'Units Ordered')]
+WEEK_MEANS = [
+    ('Inventory_Level', 'Inventory Level'), ('Price', 'Price'), ('Discount', 'Discount'),
+    ('Promotion', 'Promotion'), ('Competitor_Pricing', 'Competitor Pricing'), ('Demand', 'Demand'),
+]
+WEEK_MODES = ['Category', 'Region']
+
+
+def most_frequent(counts, keys, column):
+    """
+    Most frequent ``column`` value per ``keys`` group from a Series of
+    counts indexed by keys + [column], ties going to the smallest value,
+    the same pick as ``Series.mode()[0]``.
+    """
+    counts = counts.rename('_count').reset_index()
+    counts = counts.sort_values(
+        keys + ['_count', column],
+        ascending=[True] * len(keys) + [False, True],
+        kind='stable'
+    )
+    return counts.drop_duplicates(keys).set_index(keys)[column]
+
+
+def partial_weeks(df):
+    """
+    Mergeable weekly aggregates of a set of rows: per series and week the
+    sums, non-null counts, extremes and per-value Category/Region counts
+    that aggregate_weeks needs. Partials of disjoint row chunks combine
+    with merge_partial_weeks.
+    """
+    frame = pd.DataFrame({
+        'Store ID': df['Store ID'].values,
+        'Product ID': df['Product ID'].values,
+        'Week_Marker': week_marker(df['Date']).values,
+        'Date': df['Date'].values,
+    })
+    for _, column in WEEK_SUMS + WEEK_MEANS:
+        frame[column] = df[column].values
+    frame['Epidemic'] = df['Epidemic'].values
+
+    keys = SERIES_KEYS + ['Week_Marker']
+    grouped = frame.groupby(keys, observed=True, sort=False)
+    stats = grouped.agg(**{
+        **{name: (column, 'sum') for name, column in WEEK_SUMS},
+        **{f'{name} Sum': (column, 'sum') for name, column in WEEK_MEANS},
+        **{f'{name} Count': (column, 'count') for name, column in WEEK_MEANS},
+        'Epidemic': ('Epidemic', 'max'),
+        'Week_Start': ('Date', 'min'),
+        'Week_End': ('Date', 'max'),
+        'Days_in_Week': ('Date', 'count'),
+    })
+
+    modes = {}
+    for column in WEEK_MODES:
+        values = pd.DataFrame({key: frame[key] for key in keys}).assign(**{column: df[column].values})
+        modes[column] = values.groupby(keys + [column], observed=True, sort=False).size()
+    return stats, modes
+
+
+def merge_partial_weeks(partials):
+    """Combine partial_weeks results of disjoint row chunks into one."""
+    keys = SERIES_KEYS + ['Week_Marker']
+    stats = pd.concat([stats for stats, _ in partials])
+    rules = {column: 'sum' for column in stats.columns}
+    rules.update({'Epidemic': 'max', 'Week_Start': 'min', 'Week_End': 'max'})
+    stats = stats.groupby(level=keys, observed=True, sort=False).agg(rules)
+
+    modes = {}
+    for column in WEEK_MODES:
+        counts = pd.concat([parts[column] for _, parts in partials])
+        modes[column] = counts.groupby(level=keys + [column], observed=True, sort=False).sum()
+    return stats, modes
+
+
+def finish_weeks(partial):
+    """Turn (merged) partial weekly aggregates into aggregate_weeks' frame."""
+    stats, modes = partial
+    keys = SERIES_KEYS + ['Week_Marker']
+    weekly = pd.DataFrame(index=stats.index)
+    for name, _ in WEEK_SUMS:
+        weekly[name] = stats[name]
+    for name, _ in WEEK_MEANS:
+        total, count = stats[f'{name} Sum'], stats[f'{name} Count']
+        mean = (total / count).where(count > 0)
+        # Keep float32 sources in float32, as a grouped mean would
+        weekly[name] = mean.astype(total.dtype) if total.dtype.kind == 'f' else mean
+    for name in ('Epidemic', 'Week_Start', 'Week_End', 'Days_in_Week'):
+        weekly[name] = stats[name]
+    for column in WEEK_MODES:
+        weekly[column] = most_frequent(modes[column], keys, column)
+
+    weekly = weekly.sort_index().reset_index()
+    weekly['Store_ID'] = weekly['Store ID'].astype(object)
+    weekly['Product_ID'] = weekly['Product ID'].astype(object)
+    weekly['Category'] = weekly['Category'].astype(object)
+    weekly['Region'] = weekly['Region'].astype(object)
+    return weekly[SERIES_KEYS + WEEKLY_COLUMNS]
+
+
+def aggregate_weeks(df):
+    """
+    Weekly aggregates for every (Store ID, Product ID) series in one
+    grouped pass. One row per series and week, sorted by series then week;
+    includes the possibly incomplete first and last weeks.
+    """
+    return finish_weeks(partial_weeks(df))
+
+
+def series_positions(weekly):
+    """(position within series, series length) for rows sorted by series."""
+    grouped = weekly.groupby(SERIES_KEYS, observed=True, sort=False)
+    return grouped.cumcount().to_numpy(), grouped['Week_Marker'].transform('size').to_numpy()
+
+
+def shift_within(values, position, periods):
+    """Shift ``values`` down by ``periods`` rows without crossing series."""
+    dtype = values.dtype if values.dtype.kind == 'f' else np.float64
+    shifted = np.full(len(values), np.nan, dtype=dtype)
+    if periods < len(values):
+        shifted[periods:] = values[:-periods] if periods else values
+    shifted[position < periods] = np.nan
+    return shifted
+
+
+def features_from_weeks(weekly):
+    """
+    Turn weekly aggregates into model features exactly like
+    create_features does per series: drop each series' first and last
+    (incomplete) week, add calendar, price and lag features, drop rows
+    with missing values.
+    """
+    position, size = series_positions(weekly)
+    weekly = weekly[(position > 0) & (position < size - 1)].copy()
+    position = position[(position > 0) & (position < size - 1)] - 1
+
+    # Temporal features
+    weekly['Week_Num'] = weekly['Week_Start'].dt.isocalendar().week
+    weekly['Month'] = weekly['Week_Start'].dt.month
+    weekly['Quarter'] = weekly['Week_Start'].dt.quarter
+    weekly['Year'] = weekly['Week_Start'].dt.year
+
+    # Advanced features (pct_change pads missing prices, so pad within series)
+    price = weekly.groupby(SERIES_KEYS, observed=True, sort=False)['Price'].ffill().to_numpy()
+    weekly['Price_Change'] = price / shift_within(price, position, 1) - 1
+    weekly['Discount_Intensity'] = weekly['Discount'] * weekly['Promotion']
+    weekly['Competitive_Advantage'] = weekly['Competitor_Pricing'] - weekly['Price']
+
+    # Lag features for past weeks, never reaching into another series
+    sales = weekly['Units_Sold'].to_numpy(dtype='float64')
+    demand = weekly['Demand'].to_numpy(dtype='float64')
+    lags = {}
+    for i in range(1, LAG_WEEKS + 1):
+        lags[f'Sales_Lag_{i}'] = shift_within(sales, position, i)
+        lags[f'Demand_Lag_{i}'] = shift_within(demand, position, i)
+    weekly = pd.concat([weekly, pd.DataFrame(lags, index=weekly.index)], axis=1)
+
+    return weekly.dropna(subset=FEATURE_COLUMNS)
+
+
+def create_weekly_features(df):
+    """
+    Weekly model features for every store/product series in ``df``.
+
+    Produces the same rows and columns as running create_features on each
+    series separately, plus the 'Store ID'/'Product ID' series keys.
+    """
+    weekly = features_from_weeks(aggregate_weeks(df))
+    return weekly[SERIES_KEYS + FEATURE_COLUMNS].reset_index(drop=True)
+
+
+def create_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate daily sales data into weekly features and generate
+    additional engineered features for forecasting.
+    """
+    # Week start marker
+    df['Week_Marker'] = df['Date'] - pd.to_timedelta(
+        df['Date'].dt.dayofweek, unit='D'
+    )
+
+    # Aggregation rules
+    agg_dict = {
+        'Units Sold': 'sum',
+        'Inventory Level': 'mean',
+        'Price': 'mean',
+        'Discount': 'mean',
+        'Promotion': 'mean',
+        'Competitor Pricing': 'mean',
+        'Demand': 'mean',
+        'Units Ordered': 'sum',
+        'Epidemic': 'max',
+        'Store ID': lambda x: x.mode()[0],
+        'Product ID': lambda x: x.mode()[0],
+        'Category': lambda x: x.mode()[0],
+        'Region': lambda x: x.mode()[0],
+        'Date': ['min', 'max', 'count']
+    }
+    weekly = df.groupby('Week_Marker').agg(agg_dict).reset_index()
+
+    # Flatten columns
+    weekly.columns = [
+        'Week_Marker', 'Units_Sold', 'Inventory_Level', 'Price',
+        'Discount', 'Promotion', 'Competitor_Pricing', 'Demand',
+        'Units_Ordered', 'Epidemic', 'Store_ID', 'Product_ID',
+        'Category', 'Region', 'Week_Start', 'Week_End', 'Days_in_Week'
+    ]
+
+    # Drop first and last incomplete weeks
+    weekly = weekly.iloc[1:-1].copy()
+
+    # Temporal features
+    weekly['Week_Num'] = weekly['Week_Start'].dt.isocalendar().week
+    weekly['Month'] = weekly['Week_Start'].dt.month
+    weekly['Quarter'] = weekly['Week_Start'].dt.quarter
+    weekly['Year'] = weekly['Week_Start'].dt.year
+
+    # Advanced features
+    weekly['Price_Change'] = weekly['Price'].pct_change()
+    weekly['Discount_Intensity'] = weekly['Discount'] * weekly['Promotion']
+    weekly['Competitive_Advantage'] = weekly['Competitor_Pricing'] - weekly['Price']
+
+    # Lag features for past 8 weeks
+    lag_weeks = 8
+    for i in range(1, lag_weeks + 1):
+        weekly[f'Sales_Lag_{i}'] = weekly['Units_Sold'].shift(i)
+        weekly[f'Demand_Lag_{i}'] = weekly['Demand'].shift(i)
+
+    # Drop any rows with missing values introduced by lags
+    return weekly.dropna()
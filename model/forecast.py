@@ -0,0 +1,91 @@
+import time
+
+from model.feature_store import WeeklyFeatureStore
+from model.engines import DEFAULT_ENGINE
+from model.pipeline import build_model, fit_model
+from model.registry import ModelRegistry, TunedParams
+from utils import metrics
+from utils.data_loader import dataset, make_forecast_kpis
+
+# Trained forecasts reused across clicks, users and restarts
+forecast_registry = ModelRegistry()
+feature_store = WeeklyFeatureStore()
+tuned_params = TunedParams()
+metrics.register_cache("model", forecast_registry.stats)
+
+def get_forecast(store_id, product_id, horizon, progress=None, engine=DEFAULT_ENGINE):
+    """
+    Fit an ``engine`` model (model/engines.py) on all but the last
+    ``horizon`` weeks of one store/product series and predict those weeks.
+    Results are served from ``forecast_registry`` when the same series,
+    horizon, engine, tuned parameters (model.tuning) and data were trained
+    before. ``progress(fraction, message)`` is called as training advances
+    and may raise to abort it.
+    """
+    snapshot = dataset.snapshot()
+    key = forecast_registry.key(
+        store_id, product_id, horizon, snapshot.version, engine, tuned_params.version(engine)
+    )
+    entry = forecast_registry.get_or_train(
+        key, lambda: train_forecast(snapshot, store_id, product_id, horizon, progress, engine=engine)
+    )
+    if entry["error"]:
+        return None, None, entry["error"]
+    return entry["weekly"], (entry["y_test"], entry["preds"]), None
+
+def train_forecast(snapshot, store_id, product_id, horizon, progress=None, n_jobs=-1, engine=DEFAULT_ENGINE):
+    """Train and evaluate one forecast; returns a registry entry."""
+    report = progress or (lambda fraction, message: None)
+    begin = time.perf_counter()
+
+    # Weekly features, only recomputed for weeks the data has appended
+    report(0.05, "Updating weekly features")
+    feature_store.sync(snapshot.frame, snapshot.version)
+    weekly = feature_store.series(store_id, product_id)
+    params = tuned_params.lookup(engine, weekly)
+    entry = fit_forecast(weekly, horizon, progress, n_jobs, engine, params)
+    metrics.forecast_seconds.observe(time.perf_counter() - begin)
+    return entry
+
+def feature_matrix(weekly):
+    """Model inputs and target (units sold) of a weekly feature frame."""
+    X = weekly.drop(columns=[
+        'Units_Sold',
+        'Week_Marker',
+        'Week_Start',
+        'Week_End',
+        'Days_in_Week'
+    ])
+    return X, weekly["Units_Sold"]
+
+def fit_forecast(weekly, horizon, progress=None, n_jobs=-1, engine=DEFAULT_ENGINE, params=None):
+    """
+    Fit on all but the last ``horizon`` weeks of one series' features and
+    score them; ``params`` override the engine's estimator defaults.
+    """
+    report = progress or (lambda fraction, message: None)
+    if len(weekly) < horizon + 1:
+        return {"error": "Insufficient history"}
+
+    # Split
+    X, y = feature_matrix(weekly)
+    X_train, X_test = X.iloc[:-horizon], X.iloc[-horizon:]
+    y_train, y_test = y.iloc[:-horizon], y.iloc[-horizon:]
+
+    # Fit & predict
+    model = build_model(n_jobs, engine, params)
+    fit_model(model, engine, X_train, y_train, weekly["Week_Start"].iloc[:-horizon], progress)
+    report(0.95, "Scoring")
+    preds = model.predict(X_test)
+
+    # Return everything needed
+    return {
+        "error": None,
+        "weekly": weekly,
+        "y_test": y_test,
+        "preds": preds,
+        "metrics": make_forecast_kpis(y_test, preds),
+        "model": model,
+        "engine": engine,
+        "params": params,
+    }
@@ -0,0 +1,171 @@
+"""
+Batch inference with the persisted forecast pipeline, without training.
+
+    python -m model.inference --weeks 8            # last 8 weeks of every series
+    python -m model.inference --requests req.csv   # Store ID, Product ID, Week columns
+
+``inference_service`` loads the pipeline saved by ``python -m model.train
+--per-series`` (SALES_MODEL_PATH, by default the one for
+SALES_FORECAST_ENGINE) once per process and keeps it resident, reloading
+only when the file changes. A batch of (store, product, week) requests
+is matched against the weekly feature store in one indexed lookup, and
+every matched row is scored in a single ``predict`` call, however many
+series the batch spans.
+
+Feature rows only exist for weeks the data covers (lags and exogenous
+inputs are actuals), so later weeks come back without a prediction. The
+saved model was fitted on all but the last few weeks of the data: its
+scores on the weeks it saw are optimistic.
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from model.engines import SAVED_MODEL_PATH
+from model.features import FEATURE_COLUMNS, SERIES_KEYS, week_marker
+from model.pipeline import load_model, predict_sales
+
+MODEL_PATH = SAVED_MODEL_PATH
+
+
+class InferenceService:
+    """
+    Resident persisted pipeline plus an index of the weekly feature rows
+    by (Store ID, Product ID, Week_Marker), both loaded on first use.
+    """
+
+    def __init__(self, path=MODEL_PATH, feature_store=None):
+        self.path = path
+        self._feature_store = feature_store
+        self._model = None
+        self._model_mtime = None
+        self._rows = None  # (feature version, indexed feature rows)
+        self._lock = threading.Lock()
+
+    @property
+    def feature_store(self):
+        if self._feature_store is None:
+            # The forecast tab's store, so the dashboard keeps one copy
+            from model.forecast import feature_store
+            self._feature_store = feature_store
+        return self._feature_store
+
+    def model(self):
+        """The persisted pipeline, loaded once and again only when the file changes."""
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if mtime != self._model_mtime:
+                self._model = load_model(self.path)
+                self._model_mtime = mtime
+            return self._model
+
+    def feature_rows(self, snapshot=None):
+        """Weekly feature rows of every series for the current data, indexed for lookup."""
+        if snapshot is None:
+            from utils.data_loader import dataset
+            snapshot = dataset.snapshot()
+        store = self.feature_store
+        store.sync(snapshot.frame, snapshot.version)
+        with self._lock:
+            if self._rows is None or self._rows[0] != snapshot.version:
+                features = store.features
+                index = pd.MultiIndex.from_arrays(
+                    [features['Store ID'], features['Product ID'], features['Week_Marker']],
+                    names=SERIES_KEYS + ['Week_Marker']
+                )
+                self._rows = (snapshot.version, features[FEATURE_COLUMNS].set_axis(index))
+            return self._rows[1]
+
+    def predict(self, requests, snapshot=None):
+        """
+        Predicted units sold for a frame of ``Store ID``, ``Product ID`` and
+        ``Week`` (any date in the week) requests. Returns them with the
+        week's ``Week_Start``, ``Actual`` units and ``Prediction``, NaN
+        where the data has no such series or week.
+        """
+        from model.forecast import feature_matrix
+
+        rows = self.feature_rows(snapshot)
+        weeks = week_marker(pd.to_datetime(pd.Series(requests['Week'], copy=False)).dt.normalize())
+        keys = pd.MultiIndex.from_arrays(
+            [pd.Series(requests['Store ID']).astype(str).to_numpy(),
+             pd.Series(requests['Product ID']).astype(str).to_numpy(),
+             weeks.to_numpy()]
+        )
+        positions = rows.index.get_indexer(keys)
+        found = positions >= 0
+
+        result = pd.DataFrame({
+            'Store ID': keys.get_level_values(0),
+            'Product ID': keys.get_level_values(1),
+            'Week_Start': pd.NaT,
+            'Actual': np.nan,
+            'Prediction': np.nan,
+        })
+        if found.any():
+            matched = rows.iloc[positions[found]]
+            X, y = feature_matrix(matched)
+            result.loc[found, 'Week_Start'] = matched['Week_Start'].to_numpy()
+            result.loc[found, 'Actual'] = y.to_numpy(dtype='float64')
+            result.loc[found, 'Prediction'] = predict_sales(self.model(), X)
+        return result
+
+    def forecast(self, store_id, product_id, horizon):
+        """
+        The saved model's predictions for the last ``horizon`` weeks of one
+        series, shaped like ``get_forecast``'s result.
+        """
+        if not os.path.exists(self.path):
+            return None, None, f"No saved model at {self.path}; train one with python -m model.train --per-series"
+        self.feature_rows()
+        weekly = self.feature_store.series(store_id, product_id)
+        if len(weekly) < horizon + 1:
+            return None, None, "Insufficient history"
+        tail = weekly.iloc[-horizon:]
+        scored = self.predict(pd.DataFrame({
+            'Store ID': store_id, 'Product ID': product_id, 'Week': tail['Week_Marker'].to_numpy()
+        }))
+        return weekly, (tail['Units_Sold'], scored['Prediction'].to_numpy()), None
+
+
+# Shared by the forecast tab and anything else scoring in this process
+inference_service = InferenceService()
+
+
+def latest_weeks(rows, weeks):
+    """Requests for the last ``weeks`` weeks of every series in ``rows``."""
+    frame = rows.index.to_frame(index=False)
+    latest = frame.groupby(SERIES_KEYS, observed=True, sort=False).tail(weeks)
+    return latest.rename(columns={'Week_Marker': 'Week'})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score (store, product, week) requests with the saved model.")
+    parser.add_argument("--model", default=MODEL_PATH, help="persisted pipeline (default: %(default)s)")
+    parser.add_argument("--requests", help="CSV with Store ID, Product ID and Week columns")
+    parser.add_argument("--weeks", type=int, default=8, help="without --requests: last N weeks of every series")
+    parser.add_argument("--output", help="write the predictions to this Parquet file")
+    args = parser.parse_args(argv)
+
+    service = InferenceService(args.model)
+    rows = service.feature_rows()
+    service.model()
+    requests = pd.read_csv(args.requests) if args.requests else latest_weeks(rows, args.weeks)
+
+    started = time.perf_counter()
+    result = service.predict(requests)
+    elapsed = time.perf_counter() - started
+    series = result.drop_duplicates(SERIES_KEYS)
+    print(f"Scored {result['Prediction'].notna().sum()}/{len(result)} requests over {len(series)} series "
+          f"in {elapsed:.3f}s ({len(result) / elapsed:,.0f} requests/s)")
+    if args.output:
+        result.to_parquet(args.output, index=False)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from utils.data_store import file_lock, pid_alive
+
+FORECAST_WORKERS = int(os.environ.get("SALES_FORECAST_WORKERS", "2"))
+FINISHED_JOB_TTL = 600  # seconds a finished job stays queryable
+JOB_DIR = os.environ.get("SALES_JOB_DIR", "model/cache/jobs")
+ACTIVE_STATES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's progress callback once the job is cancelled."""
+
+
+class Job:
+    """A job running in this process; its shared state is the manager's record."""
+
+    def __init__(self, manager, job_id, key):
+        self.id = job_id
+        self.key = key
+        self.cancelled = threading.Event()
+        self._manager = manager
+
+    def report(self, fraction, message):
+        """Progress callback handed to the job function."""
+        if self._manager._update(self, progress=fraction, message=message) is None:
+            raise JobCancelled()
+
+
+class JobManager:
+    """
+    Background executor for slow work such as model training.
+
+    Jobs run on a small thread pool inside the web process that submitted
+    them, so request threads only submit and poll. Job state (progress,
+    subscribers, cancel requests and the result) is kept as files under
+    ``directory``, which every worker process of the dashboard shares, so
+    a poll or cancel may land on any of them. Submitting a key that is
+    already queued or running in any process joins that job instead of
+    starting a second one; a shared job is only cancelled once every
+    submitter has cancelled it. A job whose process has exited reads as
+    unknown, so the caller can submit it again.
+    """
+
+    def __init__(self, run, max_workers=FORECAST_WORKERS, directory=JOB_DIR):
+        self._run = run
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forecast")
+        self.directory = directory
+        self._active = set()  # ids of the jobs this process runs
+        self._lock = threading.Lock()
+
+    def submit(self, *args):
+        key = tuple(args)
+        with self._locked():
+            self._prune()
+            record = self._read(self._in_flight(key))
+            if record is not None and record["state"] in ACTIVE_STATES and self._alive(record):
+                record["subscribers"] += 1
+                self._write(record)
+                return record["id"]
+            job = Job(self, f"{os.getpid()}-{uuid.uuid4().hex[:12]}", key)
+            self._write({
+                "id": job.id,
+                "key": repr(key),
+                "owner": os.getpid(),
+                "state": "queued",
+                "progress": 0.0,
+                "message": "Queued",
+                "error": None,
+                "subscribers": 1,
+                "cancelled": False,
+                "finished_at": None,
+            })
+            self._write_text(self._key_path(repr(key)), job.id)
+            self._active.add(job.id)
+        self._executor.submit(self._execute, job)
+        return job.id
+
+    def status(self, job_id):
+        record = self._read(job_id)
+        if record is None or (record["state"] in ACTIVE_STATES and not self._alive(record)):
+            return None
+        result = None
+        if record["state"] == "done":
+            try:
+                with open(self._path(job_id, "pkl"), "rb") as fh:
+                    result = pickle.load(fh)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                return None
+        return {
+            "id": record["id"],
+            "state": record["state"],
+            "progress": record["progress"],
+            "message": record["message"],
+            "result": result,
+            "error": record["error"],
+        }
+
+    def cancel(self, job_id):
+        with self._locked():
+            record = self._read(job_id)
+            if record is None or record["state"] not in ACTIVE_STATES:
+                return False
+            record["subscribers"] -= 1
+            if record["subscribers"] > 0:
+                self._write(record)
+                return False
+            # Free the key at once: a new submit starts a fresh job rather
+            # than joining this one while its worker winds down
+            record["cancelled"] = True
+            self._release(record)
+            if record["state"] == "queued":
+                self._mark_finished(record, "cancelled")
+            else:
+                record["message"] = "Cancelling"
+            self._write(record)
+        return True
+
+    def _execute(self, job):
+        if self._update(job, state="running", message="Starting") is None:
+            self._active.discard(job.id)
+            return
+        while True:
+            try:
+                result = self._run(*job.key, progress=job.report)
+                break
+            except JobCancelled:
+                if self._cancelled(job):
+                    self._finish(job, "cancelled")
+                    return
+                # Raised by another job's cancelled computation this one
+                # joined (e.g. a coalesced registry entry): compute again
+            except Exception as exc:
+                self._finish(job, "failed", error=str(exc))
+                return
+        try:
+            path = self._path(job.id, "pkl")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as fh:
+                pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError) as exc:
+            self._finish(job, "failed", error=f"Could not store the result: {exc}")
+            return
+        self._finish(job, "done")
+
+    def _update(self, job, **changes):
+        """Apply ``changes`` to a live job's record; None once it is cancelled."""
+        with self._locked():
+            record = self._read(job.id)
+            if record is None or record["cancelled"] or job.cancelled.is_set():
+                job.cancelled.set()
+                if record is not None and record["state"] in ACTIVE_STATES:
+                    self._mark_finished(record, "cancelled")
+                    self._write(record)
+                return None
+            record.update(changes)
+            self._write(record)
+            return record
+
+    def _cancelled(self, job):
+        """Whether this job itself was cancelled, here or by another process."""
+        if not job.cancelled.is_set():
+            record = self._read(job.id)
+            if record is None or record["cancelled"]:
+                job.cancelled.set()
+        return job.cancelled.is_set()
+
+    def _finish(self, job, state, error=None):
+        with self._locked():
+            self._active.discard(job.id)
+            record = self._read(job.id)
+            if record is None:
+                return
+            if record["cancelled"]:
+                # Finished before noticing the cancel: discard the result
+                state, error = "cancelled", None
+            if state == "done":
+                record["progress"] = 1.0
+            record["error"] = error
+            self._mark_finished(record, state)
+            self._release(record)
+            self._write(record)
+
+    @staticmethod
+    def _mark_finished(record, state):
+        record["state"] = state
+        record["message"] = state.capitalize()
+        record["finished_at"] = time.time()
+
+    def _alive(self, record):
+        """Whether the process running an active job is still there to finish it."""
+        if record["owner"] == os.getpid():
+            # Not one of ours: left over from an earlier process with this pid
+            return record["id"] in self._active
+        return pid_alive(record["owner"])
+
+    def _in_flight(self, key):
+        try:
+            with open(self._key_path(repr(key))) as fh:
+                return fh.read().strip() or None
+        except OSError:
+            return None
+
+    def _release(self, record):
+        """Drop the key's in-flight pointer if it still points at ``record``."""
+        path = self._key_path(record["key"])
+        try:
+            with open(path) as fh:
+                current = fh.read().strip()
+            if current == record["id"]:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _prune(self):
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            record = self._read(name[:-len(".json")])
+            if record is None:
+                continue
+            finished = record["finished_at"] is not None and now - record["finished_at"] > FINISHED_JOB_TTL
+            lost = record["state"] in ACTIVE_STATES and not self._alive(record)
+            if finished or lost:
+                self._release(record)
+                for suffix in ("json", "pkl"):
+                    try:
+                        os.remove(self._path(record["id"], suffix))
+                    except OSError:
+                        pass
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive access to the job files, across threads and processes."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, file_lock(os.path.join(self.directory, "jobs.lock")):
+            yield
+
+    def _key_path(self, key_repr):
+        """File naming the in-flight job of a key, by the key's repr."""
+        digest = hashlib.blake2b(key_repr.encode(), digest_size=12).hexdigest()
+        return os.path.join(self.directory, f"key-{digest}")
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.directory, f"{job_id}.{suffix}")
+
+    def _read(self, job_id):
+        if not job_id:
+            return None
+        try:
+            with open(self._path(job_id, "json")) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, record):
+        self._write_text(self._path(record["id"], "json"), json.dumps(record))
+
+    @staticmethod
+    def _write_text(path, text):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as fh:
+            fh.write(text)
+        os.replace(tmp_path, path)
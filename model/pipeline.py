@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import make_pipeline
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+import joblib
+
+from model.engines import DEFAULT_ENGINE, ENGINE_LABELS
+
+# Categorical and numerical feature lists
+CATEGORICAL_FEATURES = ['Store_ID', 'Product_ID', 'Category', 'Region']
+NUMERICAL_FEATURES = [
+    'Inventory_Level', 'Price', 'Discount', 'Promotion',
+    'Competitor_Pricing', 'Demand', 'Week_Num', 'Month',
+    'Quarter', 'Year', 'Price_Change', 'Discount_Intensity',
+    'Competitive_Advantage'
+] + [f'{name}_Lag_{i}' for i in range(1, 9) for name in ('Sales', 'Demand')]
+
+# Boosting: the newest share of the training rows used to stop early, the
+# rounds without improvement tolerated, and the bounds on the rounds fitted
+VALIDATION_FRACTION = 0.15
+MIN_VALIDATION_ROWS = 4
+EARLY_STOPPING_ROUNDS = 20
+MAX_BOOSTING_ROUNDS = 500
+DEFAULT_BOOSTING_ROUNDS = 100  # when the series is too short to validate on
+
+def build_model(n_jobs: int = -1, engine: str = DEFAULT_ENGINE, params: dict = None):
+    """
+    Create and return a scikit-learn pipeline for ``engine`` (see
+    model/engines.py) fitting on ``n_jobs`` threads, with ``params``
+    (e.g. from model.tuning) overriding the estimator's defaults below:
+    - rf: standardized numerical and one-hot categorical features into a
+      RandomForestRegressor
+    - hgb / xgboost: raw numerical and ordinal-coded categorical features
+      into gradient-boosted trees splitting the categoricals natively; fit
+      these with ``fit_model`` for early stopping
+    """
+    if engine not in ENGINE_LABELS:
+        raise ValueError(f"Unknown forecast engine {engine!r}")
+
+    if engine == 'rf':
+        preprocessor = ColumnTransformer([
+            ('num', StandardScaler(), NUMERICAL_FEATURES),
+            ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), CATEGORICAL_FEATURES)
+        ])
+        forest = RandomForestRegressor(
+            n_estimators=300,
+            max_depth=10,
+            min_samples_split=5,
+            random_state=42,
+            n_jobs=n_jobs
+        )
+        return make_pipeline(preprocessor, forest.set_params(**(params or {})))
+
+    # Unseen categories become missing values, which both engines route natively
+    preprocessor = ColumnTransformer([
+        ('num', 'passthrough', NUMERICAL_FEATURES),
+        ('cat', OrdinalEncoder(
+            handle_unknown='use_encoded_value', unknown_value=np.nan,
+            encoded_missing_value=np.nan, max_categories=255, dtype=np.float64
+        ), CATEGORICAL_FEATURES)
+    ])
+    categorical = [False] * len(NUMERICAL_FEATURES) + [True] * len(CATEGORICAL_FEATURES)
+
+    if engine == 'hgb':
+        # Threads come from OpenMP (OMP_NUM_THREADS / threadpoolctl), not n_jobs
+        booster = HistGradientBoostingRegressor(
+            max_iter=MAX_BOOSTING_ROUNDS,
+            learning_rate=0.1,
+            min_samples_leaf=5,  # per-series fits only have a hundred or so weeks
+            categorical_features=categorical,
+            early_stopping=True,
+            n_iter_no_change=EARLY_STOPPING_ROUNDS,
+            random_state=42
+        )
+    else:
+        # Imported here: only needed when the engine is picked
+        from xgboost import XGBRegressor
+        booster = XGBRegressor(
+            tree_method='hist',
+            n_estimators=MAX_BOOSTING_ROUNDS,
+            learning_rate=0.1,
+            max_depth=6,
+            enable_categorical=True,
+            feature_types=['c' if flag else 'q' for flag in categorical],
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            random_state=42,
+            n_jobs=None if n_jobs < 0 else n_jobs
+        )
+    return make_pipeline(preprocessor, booster.set_params(**(params or {})))
+
+def save_model(model, path: str = 'model/sales_rf_model.pkl') -> None:
+    """Save the trained model pipeline to disk using joblib."""
+    joblib.dump(model, path)
+    print(f"Model saved to {path}")
+
+
+def load_model(path: str = 'model/sales_rf_model.pkl'):
+    """Load and return a model pipeline from disk."""
+    return joblib.load(path)
+
+
+def predict_sales(model, input_df: pd.DataFrame) -> np.ndarray:
+    """Given a feature-engineered DataFrame, predict units sold."""
+    return model.predict(input_df)
+
+def fit_in_stages(model, X_train, y_train, progress, stages=10):
+    """
+    Fit the forest a slice of trees at a time (warm start) so progress can
+    be reported and a cancelled job stops between slices. The fitted model
+    is the same as a single fit with the same random_state.
+    """
+    forest = model.steps[-1][1]
+    total = forest.n_estimators
+    forest.set_params(warm_start=True)
+    for stage in range(1, stages + 1):
+        forest.set_params(n_estimators=max(1, total * stage // stages))
+        model.fit(X_train, y_train)
+        progress(0.1 + 0.8 * stage / stages, f"Training model ({forest.n_estimators}/{total} trees)")
+    forest.set_params(warm_start=False)
+    return model
+
+def time_split(n_rows, times=None, fraction=VALIDATION_FRACTION):
+    """
+    Positions of the fitting and the validation rows, the latter being the
+    newest ``fraction`` of the rows by ``times`` (by row order without).
+    """
+    order = np.arange(n_rows) if times is None else np.argsort(np.asarray(times), kind='stable')
+    n_validation = int(round(n_rows * fraction))
+    return np.sort(order[:n_rows - n_validation]), np.sort(order[n_rows - n_validation:])
+
+def fit_model(model, engine, X_train, y_train, times=None, progress=None):
+    """
+    Fit a ``build_model(engine=engine)`` pipeline. Forests are fitted in
+    stages when ``progress`` is given. Boosted engines first train on all
+    but the newest training weeks, stopping once those stop improving, then
+    refit on every training week with the number of rounds that scored
+    best. ``times`` orders the rows (row order by default).
+    """
+    report = progress or (lambda fraction, message: None)
+    if engine == 'rf':
+        if progress is None:
+            return model.fit(X_train, y_train)
+        return fit_in_stages(model, X_train, y_train, progress)
+
+    booster = model.steps[-1][1]
+    xgboost = engine == 'xgboost'
+    rounds_param = 'n_estimators' if xgboost else 'max_iter'
+    fit_rows, validation_rows = time_split(len(X_train), times)
+
+    if len(validation_rows) >= MIN_VALIDATION_ROWS:
+        report(0.1, "Training model (early stopping on the latest weeks)")
+        preprocessor = model[:-1]
+        X_fit = preprocessor.fit_transform(X_train.iloc[fit_rows])
+        X_val = preprocessor.transform(X_train.iloc[validation_rows])
+        y_fit, y_val = y_train.iloc[fit_rows], y_train.iloc[validation_rows]
+        if xgboost:
+            booster.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+            rounds = booster.best_iteration + 1
+        else:
+            booster.fit(X_fit, y_fit, X_val=X_val, y_val=y_val)
+            # n_iter_ runs EARLY_STOPPING_ROUNDS past the best round
+            scores = booster.validation_score_[1:]
+            rounds = int(np.argmax(scores)) + 1 if len(scores) else booster.n_iter_
+    else:
+        rounds = DEFAULT_BOOSTING_ROUNDS
+
+    report(0.6, f"Refitting on all weeks ({rounds} rounds)")
+    if xgboost:
+        booster.set_params(**{rounds_param: rounds, 'early_stopping_rounds': None})
+    else:
+        booster.set_params(**{rounds_param: rounds, 'early_stopping': False})
+    return model.fit(X_train, y_train)
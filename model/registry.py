@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import threading
+
+import joblib
+
+from model.engines import DEFAULT_ENGINE
+from utils.cache import LRUCache
+from utils.data_store import file_lock
+
+# Bump whenever create_features/build_model change what a cached model means
+FEATURE_SCHEMA_VERSION = 1
+
+REGISTRY_DIR = os.environ.get("SALES_MODEL_CACHE_DIR", "model/cache")
+REGISTRY_MAX_BYTES = int(os.environ.get("SALES_MODEL_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+REGISTRY_MEMORY_ENTRIES = int(os.environ.get("SALES_MODEL_CACHE_ENTRIES", "16"))
+TUNED_PARAMS_PATH = os.environ.get("SALES_TUNED_PARAMS_PATH", "model/tuned_params.json")
+
+
+class ModelRegistry:
+    """
+    Two-tier cache of trained forecast results.
+
+    Entries are keyed by (store_id, product_id, horizon, engine, tuned
+    parameters version, feature-schema version, data version). The memory
+    tier is an LRU of recent entries; the disk tier keeps joblib files
+    under ``directory`` and evicts the least recently used files once their
+    total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, directory=REGISTRY_DIR, max_bytes=REGISTRY_MAX_BYTES,
+                 memory_entries=REGISTRY_MEMORY_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory = LRUCache(maxsize=memory_entries)
+        self.disk_hits = 0
+        self._disk_lock = threading.Lock()
+
+    @staticmethod
+    def key(store_id, product_id, horizon, data_version, engine=DEFAULT_ENGINE, params_version=None):
+        return (store_id, product_id, int(horizon), engine, params_version, FEATURE_SCHEMA_VERSION, data_version)
+
+    def get_or_train(self, key, train):
+        """Return the cached entry for ``key``, calling ``train()`` on a miss."""
+        return self.memory.get_or_compute(key, lambda: self._load_or_train(key, train))
+
+    def path(self, key):
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest()
+        return os.path.join(self.directory, f"{digest}.joblib")
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+    def _load_or_train(self, key, train):
+        path = self.path(key)
+        if os.path.exists(path):
+            try:
+                entry = joblib.load(path)
+                os.utime(path)  # mark as recently used for eviction
+                self.disk_hits += 1
+                return entry
+            except (OSError, EOFError, ValueError) as exc:
+                print(f"Discarding unreadable model cache {path}: {exc}")
+
+        entry = train()
+        self._save(path, entry)
+        return entry
+
+    def _save(self, path, entry):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            joblib.dump(entry, tmp_path)
+            os.replace(tmp_path, path)
+            self._evict()
+        except OSError as exc:
+            print(f"Could not persist model cache {path}: {exc}")
+
+    def _evict(self):
+        with self._disk_lock:
+            files = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".joblib"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, name in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    total -= size
+                except OSError:
+                    pass
+
+
+def series_groups(weekly):
+    """Tuning groups a series' weekly features fall in, most specific first."""
+    categories = weekly['Category'].dropna()
+    groups = [f"category={categories.mode().iloc[0]}"] if len(categories) else []
+    return groups + ["all"]
+
+
+class TunedParams:
+    """
+    Estimator parameters picked by ``python -m model.tuning``, per engine
+    and series group (see ``series_groups``), in one JSON file. The file
+    is re-read when it changes, so every worker picks up a new tuning run
+    without a restart.
+    """
+
+    def __init__(self, path=TUNED_PARAMS_PATH):
+        self.path = path
+        self._mtime = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def entries(self):
+        """``{engine: {group: record}}`` as last written."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            if mtime != self._mtime:
+                self._entries = self._read()
+                self._mtime = mtime
+            return self._entries
+
+    def lookup(self, engine, weekly):
+        """Tuned parameters for one series' ``weekly`` features, or None for the defaults."""
+        tuned = self.entries().get(engine, {})
+        for group in series_groups(weekly):
+            if group in tuned:
+                return tuned[group]["params"]
+        return None
+
+    def version(self, engine):
+        """Digest of ``engine``'s tuned parameters, for cache keys; None while untuned."""
+        tuned = self.entries().get(engine)
+        if not tuned:
+            return None
+        text = json.dumps(tuned, sort_keys=True)
+        return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+    def update(self, engine, group, record):
+        """Store ``record`` (with its ``params``) for ``engine`` and ``group``."""
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with file_lock(f"{self.path}.lock"):
+            entries = self._read()
+            entries.setdefault(engine, {})[group] = record
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(entries, fh, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            print(f"Ignoring unreadable tuned parameters {self.path}: {exc}")
+            return {}
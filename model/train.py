@@ -1,181 +1,63 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import make_pipeline
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-import joblib
-
-from utils.data_loader import load_data
-
-store_sales = pd.read_csv("Database/sales_data.csv")
-store_sales['Date'] = pd.to_datetime(
-    store_sales['Date'], errors='coerce'
-)
-# Drop rows with invalid dates
-invalid_dates = store_sales['Date'].isna().sum()
-if invalid_dates > 0:
-    store_sales = store_sales.dropna(subset=['Date'])
-
-def create_features(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Aggregate daily sales data into weekly features and generate
-    additional engineered features for forecasting.
-    """
-    # Week start marker
-    df['Week_Marker'] = df['Date'] - pd.to_timedelta(
-        df['Date'].dt.dayofweek, unit='D'
-    )
-
-    # Aggregation rules
-    agg_dict = {
-        'Units Sold': 'sum',
-        'Inventory Level': 'mean',
-        'Price': 'mean',
-        'Discount': 'mean',
-        'Promotion': 'mean',
-        'Competitor Pricing': 'mean',
-        'Demand': 'mean',
-        'Units Ordered': 'sum',
-        'Epidemic': 'max',
-        'Store ID': lambda x: x.mode()[0],
-        'Product ID': lambda x: x.mode()[0],
-        'Category': lambda x: x.mode()[0],
-        'Region': lambda x: x.mode()[0],
-        'Date': ['min', 'max', 'count']
-    }
-    weekly = df.groupby('Week_Marker').agg(agg_dict).reset_index()
-
-    # Flatten columns
-    weekly.columns = [
-        'Week_Marker', 'Units_Sold', 'Inventory_Level', 'Price',
-        'Discount', 'Promotion', 'Competitor_Pricing', 'Demand',
-        'Units_Ordered', 'Epidemic', 'Store_ID', 'Product_ID',
-        'Category', 'Region', 'Week_Start', 'Week_End', 'Days_in_Week'
-    ]
-
-    # Drop first and last incomplete weeks
-    weekly = weekly.iloc[1:-1].copy()
-
-    # Temporal features
-    weekly['Week_Num'] = weekly['Week_Start'].dt.isocalendar().week
-    weekly['Month'] = weekly['Week_Start'].dt.month
-    weekly['Quarter'] = weekly['Week_Start'].dt.quarter
-    weekly['Year'] = weekly['Week_Start'].dt.year
-
-    # Advanced features
-    weekly['Price_Change'] = weekly['Price'].pct_change()
-    weekly['Discount_Intensity'] = weekly['Discount'] * weekly['Promotion']
-    weekly['Competitive_Advantage'] = weekly['Competitor_Pricing'] - weekly['Price']
-
-    # Lag features for past 8 weeks
-    lag_weeks = 8
-    for i in range(1, lag_weeks + 1):
-        weekly[f'Sales_Lag_{i}'] = weekly['Units_Sold'].shift(i)
-        weekly[f'Demand_Lag_{i}'] = weekly['Demand'].shift(i)
+"""
+Train the single all-data forecast model and save it.
 
-    # Drop any rows with missing values introduced by lags
-    return weekly.dropna()
+    python -m model.train [--engine hgb]
+    python -m model.train --per-series   # the model model.inference serves
 
-def build_model() -> RandomForestRegressor:
-    """
-    Create and return a scikit-learn pipeline that:
-    - Standardizes numerical features
-    - One-hot encodes categorical features
-    - Fits a RandomForestRegressor
-    """
-    # Categorical and numerical feature lists
-    categorical_features = ['Store_ID', 'Product_ID', 'Category', 'Region']
-    numerical_features = [
-        'Inventory_Level', 'Price', 'Discount', 'Promotion',
-        'Competitor_Pricing', 'Demand', 'Week_Num', 'Month',
-        'Quarter', 'Year', 'Price_Change', 'Discount_Intensity',
-        'Competitive_Advantage'
-    ]
-    # Add lag features
-    for i in range(1, 9):
-        numerical_features.extend([f'Sales_Lag_{i}', f'Demand_Lag_{i}'])
+``--per-series`` fits one pipeline on the weekly feature rows of every
+store/product series instead of on the all-data weekly totals, holding
+out each series' last weeks, so it can score any (store, product, week).
+"""
+import argparse
 
-    preprocessor = ColumnTransformer([
-        ('num', StandardScaler(), numerical_features),
-        ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), categorical_features)
-    ])
-
-    pipeline = make_pipeline(
-        preprocessor,
-        RandomForestRegressor(
-            n_estimators=300,
-            max_depth=10,
-            min_samples_split=5,
-            random_state=42,
-            n_jobs=-1
-        )
-    )
-    return pipeline
-
-def save_model(model, path: str = 'model/sales_rf_model.pkl') -> None:
-    """Save the trained model pipeline to disk using joblib."""
-    joblib.dump(model, path)
-    print(f"Model saved to {path}")
-
-
-def load_model(path: str = 'model/sales_rf_model.pkl'):
-    """Load and return a model pipeline from disk."""
-    return joblib.load(path)
-
-
-def predict_sales(model, input_df: pd.DataFrame) -> np.ndarray:
-    """Given a feature-engineered DataFrame, predict units sold."""
-    return model.predict(input_df)
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
-def get_forecast(store_id, product_id, horizon):
-    # Load & filter
-    df = load_data()
-    df = df[(df["Store ID"]==store_id) & (df["Product ID"]==product_id)]
-    weekly = create_features(df)
-    if len(weekly) < horizon + 1:
-        return None, None, "Insufficient history"
+from model.feature_store import WeeklyFeatureStore
+from model.features import SERIES_KEYS, create_features
+from model.engines import DEFAULT_ENGINE, ENGINE_LABELS
+from model.pipeline import build_model, fit_model, save_model
+from utils.data_loader import DATA_PATH, dataset_digest, read_sales_data
 
-    # Split
-    X = weekly.drop(columns=[
-        'Units_Sold',
-        'Week_Marker',
-        'Week_Start',
-        'Week_End',
-        'Days_in_Week'
-    ])
-    y = weekly["Units_Sold"]
-    X_train, X_test = X.iloc[:-horizon], X.iloc[-horizon:]
-    y_train, y_test = y.iloc[:-horizon], y.iloc[-horizon:]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the all-data forecast model.")
+    parser.add_argument("--engine", choices=list(ENGINE_LABELS), default=DEFAULT_ENGINE)
+    parser.add_argument("--per-series", action="store_true",
+                        help="fit on every series' weekly rows (for model.inference)")
+    args = parser.parse_args()
 
-    # Fit & predict
-    model = build_model()
-    model.fit(X_train, y_train)
-    preds = model.predict(X_test)
+    # Plotting is only needed here, not by the code importing this package
+    import matplotlib.pyplot as plt
 
-    # Return everything needed
-    return weekly, (y_test, preds), None
+    # Typed columnar read (cached next to the CSV), dropping rows with invalid dates
+    store_sales = read_sales_data(memory_map=False).dropna(subset=['Date'])
 
-if __name__ == '__main__':
     # Feature Creation
-    weekly_sales = create_features(store_sales)
+    if args.per_series:
+        features = WeeklyFeatureStore()
+        features.sync(store_sales, dataset_digest(DATA_PATH))
+        weekly_sales = features.features.sort_values(['Week_Marker'] + SERIES_KEYS, kind='stable')
+        weekly_sales = weekly_sales.reset_index(drop=True)
+        model_path = f'model/sales_{args.engine}_series_model.pkl'
+    else:
+        weekly_sales = create_features(store_sales)
+        model_path = f'model/sales_{args.engine}_model.pkl'
     print(f"Weekly data: {len(weekly_sales)} rows from {weekly_sales['Week_Start'].min()} to {weekly_sales['Week_Start'].max()}")
 
-    # Prepare train/test split
+    # Prepare train/test split: the last test_size weeks of every series
     target = 'Units_Sold'
     X = weekly_sales.drop(columns=[target, 'Week_Marker', 'Week_Start', 'Week_End', 'Days_in_Week'])
     y = weekly_sales[target]
     test_size = 8
-    X_train, X_test = X.iloc[:-test_size], X.iloc[-test_size:]
-    y_train, y_test = y.iloc[:-test_size], y.iloc[-test_size:]
+    test = weekly_sales['Week_Marker'] >= np.sort(weekly_sales['Week_Marker'].unique())[-test_size]
+    X_train, X_test = X[~test], X[test]
+    y_train, y_test = y[~test], y[test]
 
     # Train and save model
-    model = build_model()
-    model.fit(X_train, y_train)
-    save_model(model)
+    model = build_model(engine=args.engine)
+    fit_model(model, args.engine, X_train, y_train, weekly_sales['Week_Start'][~test])
+    save_model(model, model_path)
 
     # Evaluate
     y_pred = model.predict(X_test)
@@ -184,11 +66,15 @@ if __name__ == '__main__':
     r2 = r2_score(y_test, y_pred)
     print(f"Evaluation metrics -> RMSE: {rmse:.2f}, MAE: {mae:.2f}, R²: {r2:.4f}")
 
-    # Visualization
+    # Visualization, as weekly totals over the series
+    weeks = weekly_sales['Week_Marker']
+    train_totals = y_train.groupby(weeks[~test]).sum()
+    test_totals = y_test.groupby(weeks[test]).sum()
+    pred_totals = pd.Series(y_pred, index=y_test.index).groupby(weeks[test]).sum()
     plt.figure(figsize=(12, 6))
-    plt.plot(weekly_sales['Week_Start'].iloc[:-test_size], y_train, label='Train')
-    plt.plot(weekly_sales['Week_Start'].iloc[-test_size:], y_test, 'g-', label='Actual')
-    plt.plot(weekly_sales['Week_Start'].iloc[-test_size:], y_pred, 'r--', label='Predicted')
+    plt.plot(train_totals.index, train_totals, label='Train')
+    plt.plot(test_totals.index, test_totals, 'g-', label='Actual')
+    plt.plot(pred_totals.index, pred_totals, 'r--', label='Predicted')
     plt.xlabel('Week Start')
     plt.ylabel('Units Sold')
     plt.title('Sales Forecast vs Actual')
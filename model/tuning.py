@@ -0,0 +1,324 @@
+"""
+Budgeted hyperparameter search for the forecast engines.
+
+    python -m model.tuning --engine rf --group-by category --budget 600 --workers 8
+
+Series are tuned in groups (one per category, or all series together).
+Within a group a successive-halving search runs: every candidate
+configuration, the engine's current defaults included, is backtested
+(rolling origins, as in model.backtest) on a few of the group's series.
+The best 1/``--eta`` of the candidates move on to ``--eta`` times as many
+series, until one candidate is left, every series is used or the group's
+``--budget`` seconds are spent. Candidates are ranked by WAPE (total
+absolute error over total actual units), so large and small series weigh
+by volume rather than by scale.
+
+The weekly features of every series are computed once per data version
+and written as one float matrix under SALES_TUNING_DIR. The process pool
+workers memory-map it, so all candidates in all workers read the same
+pages. Each group's winner goes into the tuned-parameters registry
+(SALES_TUNED_PARAMS_PATH), where get_forecast picks it up for the group's
+series.
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from model.backtest import MIN_TRAIN_WEEKS, fold_origins
+from model.batch import limit_threads
+from model.engines import DEFAULT_ENGINE, ENGINE_LABELS
+from model.feature_store import WeeklyFeatureStore
+from model.features import SERIES_KEYS
+from model.pipeline import CATEGORICAL_FEATURES, NUMERICAL_FEATURES, build_model, fit_model
+from model.registry import TunedParams, series_groups
+from utils.data_loader import DATA_PATH, dataset_digest, read_sales_data
+from utils.data_store import file_lock
+
+TUNING_DIR = os.environ.get("SALES_TUNING_DIR", "model/cache/tuning")
+
+# Values tried per estimator parameter; candidates are sampled from the grid
+SEARCH_SPACES = {
+    'rf': {
+        'n_estimators': [100, 200, 300, 500],
+        'max_depth': [6, 10, 16, None],
+        'min_samples_split': [2, 5, 10],
+        'max_features': [1.0, 0.5, 'sqrt'],
+    },
+    'hgb': {
+        'learning_rate': [0.03, 0.1, 0.2],
+        'max_leaf_nodes': [7, 15, 31],
+        'min_samples_leaf': [3, 5, 10, 20],
+        'l2_regularization': [0.0, 0.1, 1.0],
+    },
+    'xgboost': {
+        'learning_rate': [0.03, 0.1, 0.2],
+        'max_depth': [3, 4, 6, 8],
+        'min_child_weight': [1, 3, 5],
+        'subsample': [0.7, 1.0],
+        'colsample_bytree': [0.7, 1.0],
+    },
+}
+# Matrix layout: model inputs, then the target and the week (days since the epoch)
+MATRIX_COLUMNS = NUMERICAL_FEATURES + CATEGORICAL_FEATURES + ['Units_Sold', 'Week_Start']
+
+# Per-worker state, filled by _init_worker
+_matrix = None
+_categories = None
+_threads = 1
+
+
+def build_feature_matrix(data_path=DATA_PATH, directory=TUNING_DIR):
+    """
+    Directory holding ``features.npy`` (every series' weekly feature rows,
+    series after series in week order, categoricals as codes),
+    ``categories.json`` and ``index.parquet`` (each series' row range and
+    groups) for the data's current version. Built once per version.
+    """
+    version = dataset_digest(data_path)
+    target = os.path.join(directory, version)
+    if os.path.exists(os.path.join(target, "index.parquet")):
+        return target
+
+    os.makedirs(directory, exist_ok=True)
+    with file_lock(f"{target}.lock"):
+        if os.path.exists(os.path.join(target, "index.parquet")):
+            return target
+        data = read_sales_data(data_path)
+        features = WeeklyFeatureStore()
+        features.sync(data, version)
+        frame = features.features.sort_values(SERIES_KEYS + ['Week_Start'], kind='stable').reset_index(drop=True)
+
+        tmp_dir = f"{target}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        matrix = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, "features.npy"), mode="w+", dtype="float64",
+            shape=(len(frame), len(MATRIX_COLUMNS))
+        )
+        n_numerical = len(NUMERICAL_FEATURES)
+        for j, column in enumerate(NUMERICAL_FEATURES):
+            matrix[:, j] = frame[column].to_numpy(dtype="float64", na_value=np.nan)
+        categories = {}
+        for j, column in enumerate(CATEGORICAL_FEATURES):
+            codes, uniques = pd.factorize(frame[column])
+            matrix[:, n_numerical + j] = codes
+            categories[column] = [str(value) for value in uniques]
+        matrix[:, -2] = frame['Units_Sold'].to_numpy(dtype="float64")
+        matrix[:, -1] = frame['Week_Start'].to_numpy(dtype="datetime64[D]").astype("float64")
+        matrix.flush()
+        del matrix
+
+        rows = []
+        for (store_id, product_id), positions in frame.groupby(SERIES_KEYS, observed=True, sort=True).indices.items():
+            groups = series_groups(frame.iloc[positions])
+            rows.append({
+                "Store ID": store_id, "Product ID": product_id,
+                "Start": int(positions[0]), "Stop": int(positions[-1]) + 1,
+                "category": groups[0] if len(groups) > 1 else None, "all": "all",
+            })
+        pd.DataFrame(rows).to_parquet(os.path.join(tmp_dir, "index.parquet"), index=False)
+        with open(os.path.join(tmp_dir, "categories.json"), "w", encoding="utf-8") as fh:
+            json.dump(categories, fh)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp_dir, target)
+    return target
+
+
+def _init_worker(matrix_dir, threads):
+    global _matrix, _categories, _threads
+    _threads = threads
+    limit_threads(threads)
+    _matrix = np.load(os.path.join(matrix_dir, "features.npy"), mmap_mode="r")
+    with open(os.path.join(matrix_dir, "categories.json"), encoding="utf-8") as fh:
+        _categories = {column: np.array(values + [None], dtype=object) for column, values in json.load(fh).items()}
+
+
+def series_frame(start, stop):
+    """Model inputs, target and weeks of one series, read from the mapped matrix."""
+    block = _matrix[start:stop]
+    n_numerical = len(NUMERICAL_FEATURES)
+    X = pd.DataFrame(np.array(block[:, :n_numerical]), columns=NUMERICAL_FEATURES)
+    for j, column in enumerate(CATEGORICAL_FEATURES):
+        # Code -1 (missing) picks the trailing None
+        X[column] = _categories[column][block[:, n_numerical + j].astype(np.intp)]
+    return X, pd.Series(block[:, -2]), block[:, -1]
+
+
+def evaluate(engine, params, start, stop, folds, step, horizon):
+    """
+    Backtest one candidate on one series. Runs inside a worker; returns the
+    summed absolute errors and actuals over its folds.
+    """
+    X, y, weeks = series_frame(start, stop)
+    errors = actuals = 0.0
+    for origin in fold_origins(len(X), folds, step, horizon):
+        model = build_model(_threads, engine, params)
+        fit_model(model, engine, X.iloc[:origin], y.iloc[:origin], weeks[:origin])
+        actual = y.iloc[origin:origin + horizon].to_numpy()
+        errors += float(np.abs(model.predict(X.iloc[origin:origin + horizon]) - actual).sum())
+        actuals += float(np.abs(actual).sum())
+    return errors, actuals
+
+
+def default_params(engine):
+    """The searched parameters' values in ``build_model`` as it stands."""
+    estimator = build_model(1, engine).steps[-1][1]
+    return {name: estimator.get_params()[name] for name in SEARCH_SPACES[engine]}
+
+
+def sample_candidates(engine, count, rng):
+    """The current defaults plus up to ``count - 1`` distinct grid points."""
+    space = SEARCH_SPACES[engine]
+    grid = list(itertools.product(*space.values()))
+    picks = rng.choice(len(grid), size=min(count, len(grid)), replace=False)
+    candidates = [default_params(engine)]
+    for pick in picks:
+        params = dict(zip(space, grid[pick]))
+        if params not in candidates and len(candidates) < count:
+            candidates.append(params)
+    return candidates
+
+
+def wape(errors, actuals):
+    return errors / actuals if actuals else float("inf")
+
+
+def successive_halving(pool, engine, candidates, series, budget, eta=3, min_series=3,
+                       folds=3, step=4, horizon=8):
+    """
+    Search ``candidates`` over ``series`` ((start, stop) row ranges, in the
+    order they are added) within ``budget`` seconds. Returns the winner's
+    index in ``candidates`` (None if not even one rung finished) and a
+    summary per rung.
+    """
+    started = time.perf_counter()
+    alive = list(range(len(candidates)))
+    n_series = min(min_series, len(series))
+    winner, rungs = None, []
+
+    while True:
+        remaining = budget - (time.perf_counter() - started)
+        if remaining <= 0:
+            break
+        subset = series[:n_series]
+        futures = {
+            pool.submit(evaluate, engine, candidates[candidate], start, stop, folds, step, horizon): candidate
+            for candidate in alive for start, stop in subset
+        }
+        totals = {candidate: [0.0, 0.0, 0] for candidate in alive}
+        pending = set(futures)
+        while pending and remaining > 0:
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                errors, actuals = future.result()
+                total = totals[futures[future]]
+                total[0] += errors
+                total[1] += actuals
+                total[2] += 1
+            remaining = budget - (time.perf_counter() - started)
+        for future in pending:
+            future.cancel()
+
+        # Only candidates scored on every series of the rung are comparable
+        scored = sorted(
+            (wape(errors, actuals), candidate)
+            for candidate, (errors, actuals, count) in totals.items() if count == len(subset)
+        )
+        if not scored:
+            break
+        winner = scored[0][1]
+        rungs.append({"series": len(subset), "candidates": len(scored), "best_wape": scored[0][0],
+                      "default_wape": next((score for score, candidate in scored if candidate == 0), None)})
+        if pending or len(scored) == 1 or n_series >= len(series):
+            break
+        alive = [candidate for _, candidate in scored[:max(1, len(scored) // eta)]]
+        if len(alive) == 1:
+            # Nothing left to compare: another rung would only spend budget
+            break
+        n_series = min(len(series), n_series * eta)
+    return winner, rungs
+
+
+def run_tuning(data_path=DATA_PATH, engine=DEFAULT_ENGINE, group_by="category", budget=600.0, candidates=27,
+               eta=3, min_series=3, folds=3, step=4, horizon=8, workers=None, threads=1, seed=0,
+               registry=None):
+    """Tune every group of series and record each winner; returns {group: record}."""
+    registry = registry or TunedParams()
+    rng = np.random.default_rng(seed)
+    version = dataset_digest(data_path)
+    matrix_dir = build_feature_matrix(data_path)
+    index = pd.read_parquet(os.path.join(matrix_dir, "index.parquet"))
+    # Series long enough for at least one fold
+    index = index[(index["Stop"] - index["Start"]) >= MIN_TRAIN_WEEKS + horizon]
+
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(matrix_dir, threads),
+    ) as pool:
+        for group, members in index.groupby(group_by, sort=True):
+            # Series join rungs in a random order, so each rung is a fair sample
+            series = [tuple(row) for row in members[["Start", "Stop"]].to_numpy()[rng.permutation(len(members))]]
+            configs = sample_candidates(engine, candidates, rng)
+            started = time.perf_counter()
+            winner, rungs = successive_halving(
+                pool, engine, configs, series, budget, eta, min_series, folds, step, horizon
+            )
+            seconds = time.perf_counter() - started
+            if winner is None:
+                print(f"{group}: no rung finished within {budget:.0f}s, defaults kept")
+                continue
+
+            record = {
+                "params": configs[winner],
+                "wape": rungs[-1]["best_wape"],
+                "rungs": rungs,
+                "candidates": len(configs),
+                "series": len(series),
+                "seconds": round(seconds, 1),
+                "data_version": version,
+                "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            registry.update(engine, group, record)
+            results[group] = record
+            # The defaults may not have finished the first rung before the budget ran out
+            default = rungs[0]["default_wape"]
+            default = "n/a" if default is None else f"{default:.3f}"
+            print(f"{group}: {len(configs)} candidates, {len(rungs)} rungs in {seconds:.0f}s; "
+                  f"WAPE {rungs[0]['best_wape']:.3f} vs defaults {default} on {rungs[0]['series']} series; "
+                  f"{'defaults kept' if winner == 0 else configs[winner]}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search per series group.")
+    parser.add_argument("--data", default=DATA_PATH, help="sales CSV (default: %(default)s)")
+    parser.add_argument("--engine", choices=list(ENGINE_LABELS), default=DEFAULT_ENGINE)
+    parser.add_argument("--group-by", choices=["category", "all"], default="category",
+                        help="tune per product category or once for all series")
+    parser.add_argument("--budget", type=float, default=600.0, help="seconds per group")
+    parser.add_argument("--candidates", type=int, default=27, help="configurations in the first rung")
+    parser.add_argument("--eta", type=int, default=3, help="keep 1/eta of the candidates per rung")
+    parser.add_argument("--min-series", type=int, default=3, help="series in the first rung")
+    parser.add_argument("--folds", type=int, default=3, help="backtest origins per series")
+    parser.add_argument("--step", type=int, default=4, help="weeks between origins")
+    parser.add_argument("--horizon", type=int, default=8, help="weeks scored after each origin")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--threads", type=int, default=1, help="threads per worker")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    run_tuning(args.data, args.engine, args.group_by, args.budget, args.candidates, args.eta, args.min_series,
+               args.folds, args.step, args.horizon, args.workers, args.threads, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Production entry point: several dashboard worker processes on one port.
+
+    python serve.py --workers 4 --bind 0.0.0.0:8050
+
+The columnar cache of the sales CSV is brought up to date once before any
+worker starts. Every worker then memory-maps that same file read-only, so
+the dataset's pages live once in the OS page cache instead of once per
+worker. Each worker still watches the CSV, but rebuilding the cache after
+a change is serialized by a file lock: the first worker parses the new CSV
+and the others map its result. Figures, trained models and weekly features
+are cached on disk, where all workers share them (the figure cache
+directory defaults to SHARED_FIGURE_CACHE_DIR here).
+
+Requests need no sticky routing. Forecast jobs keep their state on disk
+(SALES_JOB_DIR), so a job started by one worker can be polled or
+cancelled through any other. Each worker writes its metrics to
+SALES_METRICS_DIR (SHARED_METRICS_DIR here, emptied at startup), and
+/metrics on any worker reports the sum over all of them.
+
+gunicorn is used when installed (gthread workers). Otherwise a built-in
+pre-fork server runs werkzeug in each forked worker on one shared
+listening socket (POSIX only).
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+BIND = os.environ.get("SALES_BIND", "127.0.0.1:8050")
+WORKERS = int(os.environ.get("SALES_WORKERS", str(min(4, os.cpu_count() or 1))))
+WORKER_THREADS = int(os.environ.get("SALES_WORKER_THREADS", "4"))
+WORKER_TIMEOUT = int(os.environ.get("SALES_WORKER_TIMEOUT", "120"))
+SHARED_FIGURE_CACHE_DIR = "model/cache/figures"
+SHARED_METRICS_DIR = "model/cache/metrics"
+
+
+def prepare_dataset():
+    """Build or refresh the columnar cache so workers start by mapping it."""
+    from utils.data_loader import DATA_PATH, read_sales_data
+
+    started = time.perf_counter()
+    read_sales_data(DATA_PATH, columns=['Date'])
+    print(f"Columnar cache for {DATA_PATH} ready in {time.perf_counter() - started:.1f}s")
+
+
+def reset_metrics(directory):
+    """Drop the metrics files of a previous run's workers."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith("metrics-"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def run_gunicorn(bind, workers, threads, timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class DashboardApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", bind)
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", timeout)
+
+        def load(self):
+            from app import server
+            return server
+
+    DashboardApplication().run()
+
+
+def serve_worker(listener, host):
+    from werkzeug.serving import make_server
+
+    from app import server
+
+    port = listener.getsockname()[1]
+    make_server(host, port, server, threaded=True, fd=listener.fileno()).serve_forever()
+
+
+def run_prefork(host, port, workers):
+    """Fork ``workers`` werkzeug servers accepting on one socket; restart any that exit."""
+    listener = socket.create_server((host, port), backlog=128)
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                serve_worker(listener, host)
+            except KeyboardInterrupt:
+                pass
+            except Exception as exc:
+                print(f"Worker {os.getpid()} failed: {exc}")
+                code = 1
+            os._exit(code)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f"Serving on http://{host}:{listener.getsockname()[1]} with {workers} workers")
+
+    while not stopping:
+        time.sleep(1)
+        while children:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                break
+            children.discard(pid)
+            if not stopping:
+                print(f"Worker {pid} exited, starting a replacement")
+                spawn()
+
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in children:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    listener.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard with several worker processes.")
+    parser.add_argument("--bind", default=BIND, help="host:port (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--threads", type=int, default=WORKER_THREADS, help="threads per gunicorn worker")
+    parser.add_argument("--timeout", type=int, default=WORKER_TIMEOUT, help="gunicorn worker timeout (s)")
+    parser.add_argument("--builtin", action="store_true", help="use the built-in pre-fork server even if gunicorn is installed")
+    args = parser.parse_args(argv)
+    host, _, port = args.bind.rpartition(":")
+
+    # Before the app modules read it
+    os.environ.setdefault("SALES_FIGURE_CACHE_DIR", SHARED_FIGURE_CACHE_DIR)
+    os.environ.setdefault("SALES_METRICS_DIR", SHARED_METRICS_DIR)
+    reset_metrics(os.environ["SALES_METRICS_DIR"])
+    prepare_dataset()
+
+    try:
+        import gunicorn
+    except ImportError:
+        gunicorn = None
+
+    if gunicorn is not None and not args.builtin:
+        run_gunicorn(args.bind, args.workers, args.threads, args.timeout)
+    elif hasattr(os, "fork"):
+        run_prefork(host or "127.0.0.1", int(port), args.workers)
+    else:
+        print("No gunicorn and no fork() on this platform: serving from a single process")
+        from app import app
+        app.run(host=host or "127.0.0.1", port=int(port))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
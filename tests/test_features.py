@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.features import FEATURE_COLUMNS, LAG_WEEKS, SERIES_KEYS, create_features, create_weekly_features
+
+
+def daily_rows(rng, store, product, start, days, skip_weeks=()):
+    """Daily sales rows of one series, without the days of ``skip_weeks`` (week numbers from start)."""
+    dates = pd.date_range(start, periods=days, freq="D")
+    keep = ~np.isin((dates - dates[0]).days // 7, list(skip_weeks))
+    dates = dates[keep]
+    n = len(dates)
+    return pd.DataFrame({
+        "Date": dates,
+        "Store ID": store,
+        "Product ID": product,
+        "Category": rng.choice(["Toys", "Groceries"], n),
+        "Region": rng.choice(["North", "South"], n),
+        "Inventory Level": rng.integers(50, 500, n),
+        "Units Sold": rng.integers(0, 200, n),
+        "Units Ordered": rng.integers(0, 200, n),
+        "Demand": rng.integers(0, 250, n),
+        "Price": rng.uniform(10, 100, n).round(2),
+        "Discount": rng.choice([0, 5, 10, 20], n),
+        "Promotion": rng.integers(0, 2, n),
+        "Competitor Pricing": rng.uniform(10, 100, n).round(2),
+        "Epidemic": rng.integers(0, 2, n),
+    })
+
+
+@pytest.fixture(scope="module", params=["object", "category"])
+def sales(request):
+    """Plain-string IDs as read from CSV, or categoricals as the columnar cache loads them."""
+    rng = np.random.default_rng(0)
+    rows = pd.concat([
+        daily_rows(rng, "S001", "P0001", "2022-01-05", 300),
+        daily_rows(rng, "S001", "P0002", "2022-01-03", 250),
+        # Weeks with no rows at all in the middle of the series
+        daily_rows(rng, "S002", "P0001", "2022-01-06", 280, skip_weeks=(12, 13, 20)),
+        # Shorter than the lag window: no week has all its lags
+        daily_rows(rng, "S002", "P0002", "2022-02-01", 7 * (LAG_WEEKS - 2)),
+        # Just long enough for a few complete rows
+        daily_rows(rng, "S003", "P0001", "2022-03-02", 7 * (LAG_WEEKS + 5)),
+    ], ignore_index=True).sort_values("Date", kind="stable", ignore_index=True)
+    if request.param == "category":
+        rows = rows.astype({column: "category" for column in SERIES_KEYS + ["Category", "Region"]})
+    return rows
+
+
+def per_series_features(sales):
+    frames = []
+    for (store, product), series in sales.groupby(SERIES_KEYS, observed=True, sort=True):
+        weekly = create_features(series.copy())[FEATURE_COLUMNS]
+        frames.append(weekly.assign(**{"Store ID": store, "Product ID": product}))
+    expected = pd.concat(frames, ignore_index=True)
+    return expected[SERIES_KEYS + FEATURE_COLUMNS]
+
+
+def test_matches_per_series_create_features(sales):
+    expected = per_series_features(sales)
+    actual = create_weekly_features(sales)
+
+    assert list(actual.columns) == SERIES_KEYS + FEATURE_COLUMNS
+    assert len(actual) == len(expected)
+    # Label columns are compared as values: create_features keeps categorical
+    # input's dtype on them, create_weekly_features always returns objects.
+    # Every other column must match exactly, dtype included.
+    labels = {column: object for column in SERIES_KEYS + ["Store_ID", "Product_ID", "Category", "Region"]}
+    pd.testing.assert_frame_equal(actual.astype(labels), expected.astype(labels))
+
+
+def test_short_series_has_no_rows_and_gaps_keep_their_rows(sales):
+    actual = create_weekly_features(sales)
+    counts = actual.groupby(SERIES_KEYS, observed=True).size()
+
+    assert ("S002", "P0002") not in counts.index
+    assert counts[("S003", "P0001")] > 0
+    # Lags run over the weeks present, as create_features shifts by row
+    gap = actual[(actual["Store ID"] == "S002") & (actual["Product ID"] == "P0001")]
+    assert gap["Week_Marker"].diff().dt.days.max() > 7
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from model.jobs import JobManager
+from utils.cache import LRUCache
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def finished(manager, job_id):
+    status = manager.status(job_id)
+    return status is not None and status["state"] not in ("queued", "running")
+
+
+def test_resubmit_after_cancel_is_not_cancelled_by_the_shared_computation(tmp_path):
+    # Both jobs compute through one coalescing cache, like the model registry
+    cache = LRUCache()
+    release = threading.Event()
+    started = threading.Event()
+
+    def run(key, progress=None):
+        def compute():
+            progress(0.1, "Fitting")
+            started.set()
+            release.wait()
+            progress(0.9, "Scoring")
+            return key * 2
+        return cache.get_or_compute(key, compute)
+
+    manager = JobManager(run, directory=str(tmp_path))
+    first = manager.submit(21)
+    assert started.wait(5)
+
+    assert manager.cancel(first)
+    second = manager.submit(21)
+    assert second != first
+    # The new job waits on the cancelled job's computation
+    wait_for(lambda: cache.coalesced == 1)
+    release.set()
+
+    wait_for(lambda: finished(manager, first) and finished(manager, second))
+    assert manager.status(first)["state"] == "cancelled"
+    status = manager.status(second)
+    assert status["state"] == "done"
+    assert status["result"] == 42
+
+
+def test_cancel_frees_the_key_of_a_running_job(tmp_path):
+    release = threading.Event()
+
+    def run(key, progress=None):
+        progress(0.1, "Working")
+        release.wait()
+        return key
+
+    manager = JobManager(run, directory=str(tmp_path))
+    first = manager.submit(1)
+    wait_for(lambda: manager.status(first)["state"] == "running")
+    assert manager.cancel(first)
+    second = manager.submit(1)
+    assert second != first
+    release.set()
+
+    wait_for(lambda: finished(manager, first) and finished(manager, second))
+    assert manager.status(first)["state"] == "cancelled"
+    assert manager.status(second)["state"] == "done"
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Pending:
+    """Placeholder for a value another thread is currently computing."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LRUCache:
+    """
+    Thread-safe, bounded least-recently-used cache.
+
+    ``get_or_compute`` coalesces concurrent requests for the same key: the
+    first caller computes the value, the others wait for it instead of
+    repeating the work. Hit/miss/eviction counters are kept for monitoring.
+
+    Optionally entries expire ``ttl`` seconds after being stored, and the
+    cache is also bounded by the total ``sizeof(value)`` of its entries
+    (``max_bytes``; ``sizeof`` defaults to ``len``, for strings and bytes).
+    """
+
+    def __init__(self, maxsize=128, ttl=None, max_bytes=None, sizeof=len):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._live(key)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if self._live(key):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if self._live(key):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _Pending()
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = compute()
+        except BaseException as exc:
+            pending.error = exc
+            raise
+        finally:
+            with self._lock:
+                if pending.error is None:
+                    self._store(key, pending.value)
+                del self._pending[key]
+            pending.done.set()
+        return pending.value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "coalesced": self.coalesced,
+            }
+
+    def _live(self, key):
+        """Whether ``key`` is cached and unexpired; drops it if expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return False
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return False
+        return True
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self.bytes -= size
+
+    def _store(self, key, value):
+        if key in self._data:
+            self._remove(key)
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires_at, size)
+        self.bytes += size
+        while len(self._data) > self.maxsize or (
+            self.max_bytes is not None and self.bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
@@ -1,12 +1,33 @@
-from dash import Output, Input, State
-from utils.data_loader import compute_kpis, load_filtered_data, make_forecast_kpis
+from dash import ClientsideFunction, Output, Input, State, ctx, no_update
+from utils.data_loader import make_forecast_kpis
 from components.cards import initialize_cards, initialize_fc_card
 from components.layout import historical_layout, forecast_layout
 from utils.data_loader import load_data
+from utils.cube import load_filtered_cube
+from utils.demand_grid import load_demand_grid
+from utils.client_cube import CLIENTSIDE, CLIENT_CHARTS, INVENTORY_THRESHOLD
+from utils.discount_grid import load_discount_grid
+from utils.figure_cache import chart_figure
+from utils.figure_patch import figure_update, rendered_id
+from utils.kpis import load_kpis
+from utils import metrics
 from utils.charts import *
-from model.train import get_forecast
+from model.engines import SAVED_MODEL
+from model.jobs import JobManager
 from dash import html 
 
+def run_forecast_job(store_id, product_id, horizon, engine, progress=None):
+    """Job body; the training stack is imported on the first forecast, not at startup."""
+    if engine == SAVED_MODEL:
+        from model.inference import inference_service
+        return inference_service.forecast(store_id, product_id, horizon)
+    from model.forecast import get_forecast
+    return get_forecast(store_id, product_id, horizon, progress, engine)
+
+# Forecast trainings run here, off the request threads; job state is on
+# disk, so every worker process sees every job
+forecast_jobs = JobManager(run_forecast_job)
+
 def register_callbacks(app):
     @app.callback(
         Output('cards-container', 'children'),  # Update the container's children
@@ -16,141 +37,211 @@ def register_callbacks(app):
         Input('date-range', 'end_date'), 
         Input('price-slider', 'value')
     )
+    @metrics.timed_callback
     def update_KPI(store, category, start_date, end_date, price):
-        df = load_filtered_data(store, category, start_date, end_date, price)
-        kpi_values = compute_kpis(df)
-        return initialize_cards(kpi_values)
-    
-    @app.callback(
-        Output('graph-id', 'figure'),
-        Input('store-dropdown', 'value'),
-        Input('category-dropdown', 'value'),
-        Input('date-range', 'start_date'),
-        Input('date-range', 'end_date'), 
-        Input('price-slider', 'value')
-    )
-    def update_sales_chart(store, category, start_date, end_date, price):
-        df = load_filtered_data(store, category, start_date, end_date, price)
-        
-        if df.empty:
-            return generate_empty_graph()
-
-        return generate_monthly_chart(df)
+        with metrics.phase("filter"):
+            kpi_values = load_kpis(store, category, start_date, end_date, price)
+        with metrics.phase("figure"):
+            return initialize_cards(kpi_values)
     
-    @app.callback(
-            Output('inventory-sales-chart', 'figure'),
+    if CLIENTSIDE:
+        # Re-aggregated in the browser from the shipped cube (assets/clientside_cube.js)
+        for chart_id, (function, _, _) in CLIENT_CHARTS.items():
+            app.clientside_callback(
+                ClientsideFunction(namespace='salesCube', function_name=function),
+                Output(chart_id, 'figure'),
+                Input('store-dropdown', 'value'),
+                Input('category-dropdown', 'value'),
+                Input('date-range', 'start_date'),
+                Input('date-range', 'end_date'),
+                Input('price-slider', 'value'),
+                State('sales-cube', 'data'),
+                prevent_initial_call=True
+            )
+    else:
+        @app.callback(
+            Output('graph-id', 'figure'),
+            Output(rendered_id('graph-id'), 'data'),
             Input('store-dropdown', 'value'),
             Input('category-dropdown', 'value'),
             Input('date-range', 'start_date'),
             Input('date-range', 'end_date'), 
-            Input('price-slider', 'value')
+            Input('price-slider', 'value'),
+            State(rendered_id('graph-id'), 'data')
         )
-    def update_inventory_chart(store, category, start_date, end_date, price):
-        df = load_filtered_data(store, category, start_date, end_date, price)
-        if df.empty:
-            return generate_empty_graph()
-
-        return generate_inventory_sales_chart(df, 10)
+        @metrics.timed_callback
+        def update_sales_chart(store, category, start_date, end_date, price, rendered):
+            filters = (store, category, start_date, end_date, price)
+            figure = chart_figure('graph-id', filters, load_filtered_cube, generate_monthly_chart)
+            return figure_update('graph-id', figure, rendered)
     
-    @app.callback(
-            Output('category-region-treemap', 'figure'),
-            Input('store-dropdown', 'value'),
-            Input('category-dropdown', 'value'),
-            Input('date-range', 'start_date'),
-            Input('date-range', 'end_date'), 
-            Input('price-slider', 'value')
-        )
-    def update_category_treemap(store, category, start_date, end_date, price):
-        df = load_filtered_data(store, category, start_date, end_date, price)
-        if df.empty:
-            return generate_empty_graph()
-
-        return generate_category_treemap(df)
+        @app.callback(
+                Output('inventory-sales-chart', 'figure'),
+                Output(rendered_id('inventory-sales-chart'), 'data'),
+                Input('store-dropdown', 'value'),
+                Input('category-dropdown', 'value'),
+                Input('date-range', 'start_date'),
+                Input('date-range', 'end_date'), 
+                Input('price-slider', 'value'),
+                State(rendered_id('inventory-sales-chart'), 'data')
+            )
+        @metrics.timed_callback
+        def update_inventory_chart(store, category, start_date, end_date, price, rendered):
+            filters = (store, category, start_date, end_date, price)
+            figure = chart_figure('inventory-sales-chart', filters, load_filtered_cube, generate_inventory_sales_chart, INVENTORY_THRESHOLD)
+            return figure_update('inventory-sales-chart', figure, rendered)
     
-    @app.callback(
-            Output('promo-impact-delta-chart', 'figure'),
-            Input('store-dropdown', 'value'),
-            Input('category-dropdown', 'value'),
-            Input('date-range', 'start_date'),
-            Input('date-range', 'end_date'), 
-            Input('price-slider', 'value')
-        )
-    def update_promo_impact(store, category, start_date, end_date, price):
-        df = load_filtered_data(store, category, start_date, end_date, price)
-        if df.empty:
-            return generate_empty_graph()
-
-        return generate_promo_impact(df)
+        @app.callback(
+                Output('category-region-treemap', 'figure'),
+                Output(rendered_id('category-region-treemap'), 'data'),
+                Input('store-dropdown', 'value'),
+                Input('category-dropdown', 'value'),
+                Input('date-range', 'start_date'),
+                Input('date-range', 'end_date'), 
+                Input('price-slider', 'value'),
+                State(rendered_id('category-region-treemap'), 'data')
+            )
+        @metrics.timed_callback
+        def update_category_treemap(store, category, start_date, end_date, price, rendered):
+            filters = (store, category, start_date, end_date, price)
+            figure = chart_figure('category-region-treemap', filters, load_filtered_cube, generate_category_treemap)
+            return figure_update('category-region-treemap', figure, rendered)
+    
+        @app.callback(
+                Output('promo-impact-delta-chart', 'figure'),
+                Output(rendered_id('promo-impact-delta-chart'), 'data'),
+                Input('store-dropdown', 'value'),
+                Input('category-dropdown', 'value'),
+                Input('date-range', 'start_date'),
+                Input('date-range', 'end_date'), 
+                Input('price-slider', 'value'),
+                State(rendered_id('promo-impact-delta-chart'), 'data')
+            )
+        @metrics.timed_callback
+        def update_promo_impact(store, category, start_date, end_date, price, rendered):
+            filters = (store, category, start_date, end_date, price)
+            figure = chart_figure('promo-impact-delta-chart', filters, load_filtered_cube, generate_promo_impact)
+            return figure_update('promo-impact-delta-chart', figure, rendered)
     
     @app.callback(
             Output('discount-vs-sales-chart', 'figure'),
+            Output(rendered_id('discount-vs-sales-chart'), 'data'),
             Input('store-dropdown', 'value'),
             Input('category-dropdown', 'value'),
             Input('date-range', 'start_date'),
             Input('date-range', 'end_date'), 
-            Input('price-slider', 'value')
+            Input('price-slider', 'value'),
+            State(rendered_id('discount-vs-sales-chart'), 'data')
         )
-    def update_discount_distribution(store, category, start_date, end_date, price):
-        df = load_filtered_data(store, category, start_date, end_date, price)
-        if df.empty:
-            return generate_empty_graph()
-
-        return generate_discount_distribution(df)
+    @metrics.timed_callback
+    def update_discount_distribution(store, category, start_date, end_date, price, rendered):
+        filters = (store, category, start_date, end_date, price)
+        figure = chart_figure('discount-vs-sales-chart', filters, load_discount_grid, generate_discount_distribution)
+        return figure_update('discount-vs-sales-chart', figure, rendered)
     
     @app.callback(
             Output('price-demand-heatmap', 'figure'),
+            Output(rendered_id('price-demand-heatmap'), 'data'),
             Input('store-dropdown', 'value'),
             Input('category-dropdown', 'value'),
             Input('date-range', 'start_date'),
             Input('date-range', 'end_date'), 
-            Input('price-slider', 'value')
+            Input('price-slider', 'value'),
+            State(rendered_id('price-demand-heatmap'), 'data')
         )
-    def update_avg_demand(store, category, start_date, end_date, price):
-        df = load_filtered_data(store, category, start_date, end_date, price)
-        if df.empty:
-            return generate_empty_graph()
-
-        return generate_avg_demand(df)
+    @metrics.timed_callback
+    def update_avg_demand(store, category, start_date, end_date, price, rendered):
+        filters = (store, category, start_date, end_date, price)
+        figure = chart_figure('price-demand-heatmap', filters, load_demand_grid, generate_avg_demand)
+        return figure_update('price-demand-heatmap', figure, rendered)
     
     @app.callback(
         Output("tabs-content", "children"),
         Input("main-tabs", "value")
     )
+    @metrics.timed_callback
     def render_tab(tab):
-        data = load_data()  # You can cache this if expensive
-        if tab == "historical":
-            return historical_layout(data)
-        else:
-            return forecast_layout()
+        data = load_data()  # resident frame, no disk read
+        with metrics.phase("figure"):
+            if tab == "historical":
+                return historical_layout(data)
+            else:
+                return forecast_layout()
         
     @app.callback(
         Output("fc-forecast-graph", "figure"),
         Output("fc-kpi-row", "children"), 
+        Output("fc-job", "data"),
+        Output("fc-poll", "disabled"),
+        Output("fc-status", "children"),
         Input("fc-button", "n_clicks"),
+        Input("fc-cancel", "n_clicks"),
+        Input("fc-poll", "n_intervals"),
         State("fc-store", "value"),
         State("fc-product", "value"),
-        State("fc-horizon", "value")
+        State("fc-horizon", "value"),
+        State("fc-engine", "value"),
+        State("fc-job", "data")
     )
-    def run_forecast(n_clicks, store_id, product_id, horizon):
-        if n_clicks == 0:
-            return generate_empty_graph(), [
-                initialize_fc_card("MAE", "-"),
-                initialize_fc_card("RMSE", "-"),
-                initialize_fc_card("R²", "-")
-            ]
-        
-        weekly, (y_test, preds), err = get_forecast(store_id, product_id, horizon)
-        
-        if err:
-            return generate_empty_graph(), [
-                initialize_fc_card("Error", err, is_error=True)
-            ]
-        
-        fig = make_forecast_chart(weekly, y_test, preds, horizon, store_id, product_id)
-        kpis = make_forecast_kpis(y_test, preds)
-        
-        return fig, [
-            initialize_fc_card("MAE", kpis["MAE"]),
-            initialize_fc_card("RMSE", kpis['RMSE']),
-            initialize_fc_card("R²", kpis['R²'])
-        ]
\ No newline at end of file
+    @metrics.timed_callback
+    def run_forecast(n_clicks, n_cancel, n_intervals, store_id, product_id, horizon, engine, job):
+        default_cards = [
+            initialize_fc_card("MAE", "-"),
+            initialize_fc_card("RMSE", "-"),
+            initialize_fc_card("R²", "-")
+        ]
+        trigger = ctx.triggered_id
+
+        if trigger == "fc-button" and n_clicks:
+            # Train in the background; identical requests share one job
+            job = {
+                "id": forecast_jobs.submit(store_id, product_id, horizon, engine),
+                "store": store_id, "product": product_id, "horizon": horizon, "engine": engine
+            }
+            return no_update, no_update, job, False, forecast_progress(0, "Queued")
+
+        if trigger == "fc-cancel" and job:
+            forecast_jobs.cancel(job["id"])
+            return generate_empty_graph(), default_cards, None, True, "Forecast cancelled"
+
+        if trigger == "fc-poll" and job:
+            status = forecast_jobs.status(job["id"])
+            if status is None:
+                # Job lost with the worker process running it (or expired):
+                # resubmit; the model registry makes this cheap if it finished
+                job = dict(job, id=forecast_jobs.submit(job["store"], job["product"], job["horizon"], job["engine"]))
+                return no_update, no_update, job, False, no_update
+            if status["state"] in ("queued", "running"):
+                return no_update, no_update, no_update, False, forecast_progress(status["progress"], status["message"])
+            if status["state"] == "cancelled":
+                return generate_empty_graph(), default_cards, None, True, "Forecast cancelled"
+            if status["state"] == "failed":
+                return generate_empty_graph(), [
+                    initialize_fc_card("Error", status["error"], is_error=True)
+                ], None, True, ""
+
+            weekly, scores, err = status["result"]
+            if err:
+                return generate_empty_graph(), [
+                    initialize_fc_card("Error", err, is_error=True)
+                ], None, True, ""
+
+            y_test, preds = scores
+            horizon = job["horizon"]
+            with metrics.phase("figure"):
+                fig = make_forecast_chart(weekly, y_test, preds, horizon, job["store"], job["product"])
+            kpis = make_forecast_kpis(y_test, preds)
+
+            return fig, [
+                initialize_fc_card("MAE", kpis["MAE"]),
+                initialize_fc_card("RMSE", kpis['RMSE']),
+                initialize_fc_card("R²", kpis['R²'])
+            ], None, True, ""
+
+        return generate_empty_graph(), default_cards, None, True, ""
+
+def forecast_progress(fraction, message):
+    return [
+        html.Progress(value=f"{fraction * 100:.0f}", max="100"),
+        html.Span(message)
+    ]
@@ -3,6 +3,9 @@ import plotly.express as px
 import pandas as pd
 import plotly.graph_objects as go
 
+from utils.demand_grid import average_demand, demand_cells
+from utils.discount_grid import discount_cells
+
 muted_blues = [
     "#8DA9C4", "#A3BCD6", "#C0D6DF", "#E5EFF5", "#B4C5D4", "#6C8AA3", "#345B73"
 ]
@@ -15,10 +18,25 @@ common_layout = dict(
     margin=dict(t=60, b=40)
 )
 
-def generate_monthly_chart(df):
+def with_month(df):
+    """Add the Month column to raw rows; rollup cube frames already have it."""
+    if 'Month' in df.columns:
+        return df
     df = df.copy()
     df['Date'] = pd.to_datetime(df['Date'])
     df['Month'] = df['Date'].dt.to_period('M').dt.to_timestamp()
+    return df
+
+def mean_units_sold(df, by):
+    """Mean Units Sold per group, from raw rows or from cube sums and counts."""
+    if 'Units Sold Count' not in df.columns:
+        return df.groupby(by, observed=True)['Units Sold'].mean().reset_index()
+    sums = df.groupby(by, observed=True)[['Units Sold', 'Units Sold Count']].sum()
+    sums = sums[sums['Units Sold Count'] > 0]
+    return (sums['Units Sold'] / sums['Units Sold Count']).rename('Units Sold').reset_index()
+
+def generate_monthly_chart(df):
+    df = with_month(df)
 
     # Filter to the last 12 available months
     max_month = df['Month'].max()
@@ -47,9 +65,7 @@ def generate_monthly_chart(df):
     return fig 
 
 def generate_inventory_sales_chart(df, threshold):
-    df = df.copy()
-    df['Date'] = pd.to_datetime(df['Date'])
-    df['Month'] = df['Date'].dt.to_period('M').dt.to_timestamp()
+    df = with_month(df)
 
     agg_df = df.groupby('Month').agg({
         'Units Sold': 'sum',
@@ -103,7 +119,8 @@ def generate_inventory_sales_chart(df, threshold):
     return fig
     
 def generate_category_treemap(df):
-    agg = df.groupby(['Region', 'Category'])['Units Sold'].sum().reset_index()
+    agg = df.groupby(['Region', 'Category'], observed=True)['Units Sold'].sum().reset_index()
+    agg = agg.astype({'Region': str, 'Category': str})
     fig = px.treemap(
         agg,
         path=['Region', 'Category'],
@@ -117,7 +134,8 @@ def generate_category_treemap(df):
     return fig 
 
 def generate_promo_impact(df):
-    agg = df.groupby(['Category', 'Promotion'])['Units Sold'].mean().reset_index()
+    agg = mean_units_sold(df, ['Category', 'Promotion'])
+    agg = agg.astype({'Category': str})
     agg['Promotion'] = agg['Promotion'].map({0: 'No Promo', 1: 'Promo'})
 
     fig = px.bar(
@@ -133,37 +151,91 @@ def generate_promo_impact(df):
     fig.update_layout(**common_layout)
     return fig
 
+# Outlier points drawn per discount level, the most extreme first
+BOX_OUTLIERS_PER_LEVEL = 50
+
+def weighted_quantile(values, cumulative, p):
+    """
+    Quantile of the sorted distinct ``values`` repeated by their counts
+    (``cumulative`` holds the running counts), interpolated the way
+    plotly.js does for quartilemethod='linear'.
+    """
+    total = cumulative[-1]
+    position = min(max(p * total - 0.5, 0), total - 1)
+    lower = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+    upper = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+    frac = position % 1
+    return frac * upper + (1 - frac) * lower
+
+def discount_box_stats(cells):
+    """
+    Box plot statistics of Units Sold per rounded discount level from
+    discount grid cells (promo rows only): quartiles, the 1.5 IQR whiskers
+    plotly would draw and the points beyond them. Returns (stats, outliers)
+    frames keyed by 'Rounded Discount'.
+    """
+    counts = cells.groupby(['Rounded Discount', 'Units Sold'])['Discount Rows'].sum()
+
+    stats, outliers = [], []
+    for level, level_counts in counts.groupby(level=0):
+        values = level_counts.index.get_level_values(1).to_numpy(dtype='float64')
+        cumulative = np.cumsum(level_counts.to_numpy())
+        q1, median, q3 = (weighted_quantile(values, cumulative, p) for p in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        lowerfence = min(q1, inside.min()) if len(inside) else q1
+        upperfence = max(q3, inside.max()) if len(inside) else q3
+        stats.append((level, q1, median, q3, lowerfence, upperfence, cumulative[-1]))
+
+        beyond = values[(values < lowerfence) | (values > upperfence)]
+        beyond = beyond[np.argsort(-np.abs(beyond - median), kind='stable')][:BOX_OUTLIERS_PER_LEVEL]
+        outliers.extend((level, value) for value in beyond)
+
+    stats = pd.DataFrame(stats, columns=[
+        'Rounded Discount', 'q1', 'median', 'q3', 'lowerfence', 'upperfence', 'count'
+    ])
+    outliers = pd.DataFrame(outliers, columns=['Rounded Discount', 'Units Sold'])
+    return stats, outliers
+
 def generate_discount_distribution(df):
-    df = df[df['Promotion'] == 1].copy()
-    df['Rounded Discount'] = (df['Discount'] * 2).round() / 2
+    # Discount grid cells (load_discount_grid) or raw rows
+    cells = df if 'Discount Rows' in df.columns else discount_cells(df)
+    stats, outliers = discount_box_stats(cells)
 
-    fig = px.box(
-        df,
-        x='Rounded Discount',
-        y='Units Sold',
+    fig = go.Figure()
+    fig.add_trace(go.Box(
+        x=stats['Rounded Discount'],
+        q1=stats['q1'],
+        median=stats['median'],
+        q3=stats['q3'],
+        lowerfence=stats['lowerfence'],
+        upperfence=stats['upperfence'],
+        boxpoints=False,
+        marker_color=muted_blues[0],
+        name='Units Sold',
+        showlegend=False,
+    ))
+    fig.add_trace(go.Scatter(
+        x=outliers['Rounded Discount'],
+        y=outliers['Units Sold'],
+        mode='markers',
+        marker=dict(color=muted_blues[0], size=6),
+        name='Outliers',
+        showlegend=False,
+        hovertemplate='Discount (%)=%{x}<br>Units Sold=%{y}<extra></extra>',
+    ))
+    fig.update_layout(
         title='Distribution of Units Sold at Each Discount Level (Promos Only)',
-        labels={'Rounded Discount': 'Discount (%)'},
-        color_discrete_sequence=muted_blues
+        xaxis_title='Discount (%)',
+        yaxis_title='Units Sold',
+        **common_layout
     )
-    fig.update_layout(**common_layout)
     return fig
 
 def generate_avg_demand(df): 
-    df = df[['Price', 'Discount', 'Demand']].copy()
-    df = df[
-        (df['Price'] <= df['Price'].quantile(0.99)) &
-        (df['Discount'] <= df['Discount'].quantile(0.99)) &
-        (df['Demand'] <= df['Demand'].quantile(0.99))
-    ]
-
-    # Bin price and discount
-    df['Price Bin'] = pd.cut(df['Price'], bins=10)
-    discount_bins = np.arange(0, df['Discount'].max() + 5, 5)
-    df['Discount Bin'] = pd.cut(df['Discount'], bins=discount_bins)
-
-    # Group by bins and calculate mean demand
-    grouped = df.groupby(['Price Bin', 'Discount Bin'], observed=False)['Demand'].mean().reset_index()
-
+    # Demand grid cells (load_demand_grid) or raw rows
+    cells = df if 'Demand Rows' in df.columns else demand_cells(df)
+    grouped = average_demand(cells)
 
     # Convert bins to string for better axis labels
     grouped['Price Bin Label'] = grouped['Price Bin'].astype(str)
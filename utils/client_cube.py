@@ -0,0 +1,93 @@
+"""
+Client-side filtering of the cube-backed charts (SALES_CLIENTSIDE=1).
+
+The monthly cube, reduced to the measures those charts use, goes to the
+browser once per page load in the ``sales-cube`` dcc.Store together with
+the unfiltered figures as styling templates. The clientside callbacks in
+assets/clientside_cube.js then filter and re-aggregate it, so the store,
+category, date and price filters make no server round trip for these
+charts. Date ranges apply per whole month there: a month counts when the
+range covers any day of it. Store, category and price are exact, as the
+price slider only takes values the cube is bucketed on.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.charts import (
+    generate_category_treemap, generate_empty_graph, generate_inventory_sales_chart,
+    generate_monthly_chart, generate_promo_impact,
+)
+from utils.cube import load_filtered_cube
+from utils.data_loader import dataset, filter_cache
+from utils.figure_cache import figure_cache
+
+CLIENTSIDE = os.environ.get("SALES_CLIENTSIDE", "0") == "1"
+INVENTORY_THRESHOLD = 10
+
+# chart id -> (clientside function in assets/clientside_cube.js, generator, extra args)
+CLIENT_CHARTS = {
+    'graph-id': ('monthly', generate_monthly_chart, ()),
+    'inventory-sales-chart': ('inventory', generate_inventory_sales_chart, (INVENTORY_THRESHOLD,)),
+    'category-region-treemap': ('treemap', generate_category_treemap, ()),
+    'promo-impact-delta-chart': ('promo', generate_promo_impact, ()),
+}
+DIMENSIONS = {'store': 'Store ID', 'category': 'Category', 'region': 'Region'}
+MEASURES = {'units': 'Units Sold', 'units_count': 'Units Sold Count', 'inventory': 'Inventory Level'}
+
+
+def compact(values):
+    """List of numbers, as ints when they all are whole."""
+    values = np.asarray(values, dtype='float64')
+    if np.array_equal(values, np.round(values)):
+        return values.astype('int64').tolist()
+    return values.tolist()
+
+
+def client_cube(cells, templates):
+    """JSON-ready cube: dictionary-coded dimensions plus the charts' measures."""
+    months = pd.Categorical(pd.DatetimeIndex(cells['Month']).strftime('%Y-%m'))
+    dimensions = {'month': months.categories.tolist()}
+    columns = {'month': months.codes.tolist()}
+    for key, column in DIMENSIONS.items():
+        codes = pd.Categorical(cells[column].astype(str))
+        dimensions[key] = codes.categories.tolist()
+        columns[key] = codes.codes.tolist()
+    columns['promotion'] = cells['Promotion'].astype('int64').tolist()
+
+    # Cells above the top slider value or without a price only count with the filter off
+    buckets = cells['Price Bucket'].to_numpy(dtype='float64')
+    finite = np.isfinite(buckets)
+    prices = compact(buckets[finite])
+    columns['price'] = [None] * len(buckets)
+    for position, value in zip(np.flatnonzero(finite).tolist(), prices):
+        columns['price'][position] = value
+    for key, column in MEASURES.items():
+        columns[key] = compact(cells[column])
+
+    return {
+        'version': dataset.version,
+        'threshold': INVENTORY_THRESHOLD,
+        'dimensions': dimensions,
+        'cells': columns,
+        'templates': templates,
+    }
+
+
+def load_client_cube():
+    """The ``sales-cube`` store contents for the current dataset version. Shared."""
+    snapshot = dataset.snapshot()
+
+    def compute():
+        cells = load_filtered_cube(None, None, None, None, None)
+        filters = (None, None, None, None, None)
+        templates = {'empty': figure_cache.figure('empty', filters, generate_empty_graph)}
+        for chart_id, (_, generate, args) in CLIENT_CHARTS.items():
+            templates[chart_id] = figure_cache.figure(
+                chart_id, filters,
+                lambda generate=generate, args=args: generate(cells, *args) if len(cells) else generate_empty_graph()
+            )
+        return client_cube(cells, templates)
+
+    return filter_cache.get_or_compute(("client_cube", snapshot.version), compute)
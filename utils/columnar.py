@@ -0,0 +1,149 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.data_store import file_digest, file_signature
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # the cache is an optimization, CSV still works without it
+    pa = None
+
+CATEGORY_COLUMNS = ['Store ID', 'Product ID', 'Category', 'Region']
+
+SIGNATURE_KEY = b"sales.source_signature"
+DIGEST_KEY = b"sales.source_digest"
+
+
+def available():
+    return pa is not None
+
+
+def cache_path(source_path):
+    """Location of the columnar cache for a CSV: same name, .arrow suffix."""
+    return os.path.splitext(source_path)[0] + ".arrow"
+
+
+def lock_path(source_path):
+    """Lock file serializing cache rebuilds between processes."""
+    return cache_path(source_path) + ".lock"
+
+
+def optimize_dtypes(df):
+    """
+    Return a compactly typed copy of a freshly parsed sales frame:
+    - ID/label columns become categoricals
+    - integer-valued numerics are downcast to the smallest integer type
+    - remaining floats become float32
+    """
+    df = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy()
+            if not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+                df[col] = pd.to_numeric(series.astype('int64'), downcast='integer')
+            else:
+                df[col] = series.astype('float32')
+    return df
+
+
+def source_metadata(source_path):
+    """Read the (signature, digest) of the CSV a cache file was built from."""
+    path = cache_path(source_path)
+    if pa is None or not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if SIGNATURE_KEY not in metadata or DIGEST_KEY not in metadata:
+        return None
+    mtime, size = metadata[SIGNATURE_KEY].decode().split(":")
+    return (int(mtime), int(size)), metadata[DIGEST_KEY].decode()
+
+
+def is_fresh(source_path):
+    """True when the cache was built from the CSV as it is on disk now."""
+    metadata = source_metadata(source_path)
+    if metadata is None:
+        return False
+    signature, digest = metadata
+    if signature == file_signature(source_path):
+        return True
+    # mtime/size moved (copy, touch): fall back to comparing content
+    return digest == file_digest(source_path)
+
+
+def source_digest(source_path):
+    """Content hash of the CSV, taken from a fresh cache when possible."""
+    metadata = source_metadata(source_path)
+    if metadata is not None and metadata[0] == file_signature(source_path):
+        return metadata[1]
+    return file_digest(source_path)
+
+
+def write_cache(df, source_path):
+    """
+    Write ``df`` as an uncompressed Arrow IPC (Feather v2) file next to the
+    CSV. Uncompressed so reads can be memory-mapped without decoding.
+    """
+    path = cache_path(source_path)
+    signature = file_signature(source_path)
+    digest = file_digest(source_path)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[SIGNATURE_KEY] = f"{signature[0]}:{signature[1]}".encode()
+    metadata[DIGEST_KEY] = digest.encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Write beside the target and rename so readers never see a partial file.
+    # One record batch keeps every column contiguous, so it can be mapped
+    # without copying.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(
+        table, tmp_path, compression='uncompressed', chunksize=max(table.num_rows, 1)
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def mapped_column(column):
+    """
+    Column as a read-only view of the mapped file when its values can be
+    used as they are (one chunk, no nulls, plain numeric or timestamp);
+    a regular conversion otherwise.
+    """
+    if column.num_chunks == 1 and column.null_count == 0 and (
+        pa.types.is_integer(column.type) or pa.types.is_floating(column.type)
+        or (pa.types.is_timestamp(column.type) and column.type.tz is None)
+    ):
+        return pd.Series(column.chunk(0).to_numpy(zero_copy_only=True), copy=False)
+    return column.to_pandas()
+
+
+def read_cache(source_path, columns=None, memory_map=True):
+    """
+    Load the cached frame. ``columns`` limits the read to those columns;
+    with ``memory_map`` the buffers stay backed by the page cache
+    (read-only, shared by every process mapping the file) instead of
+    private copies.
+    """
+    table = feather.read_table(
+        cache_path(source_path), columns=columns, memory_map=memory_map
+    )
+    if not memory_map:
+        return table.to_pandas(split_blocks=True)
+    return pd.DataFrame(
+        {name: mapped_column(table.column(name)) for name in table.column_names}, copy=False
+    )
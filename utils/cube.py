@@ -0,0 +1,174 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import dataset, filter_cache, normalize_filters, select_rows
+
+CUBE_DIMENSIONS = ['Month', 'Store ID', 'Category', 'Region', 'Promotion', 'Price Bucket']
+CUBE_MEASURES = ['Units Sold', 'Inventory Level', 'Demand']
+
+# frame: one row per dimension combination; for each measure M it holds
+#   M (sum), "M Sq" (sum of squares) and "M Count" (non-null rows)
+SalesCube = namedtuple("SalesCube", ["frame", "price_edges", "daily"])
+
+
+def price_slider_values(prices):
+    """
+    The values the dashboard's price slider can take, mirroring
+    compute_filter_args: rounded min to rounded max in ten steps.
+    """
+    low, high = float(np.round(prices.min())), float(np.round(prices.max()))
+    step = (high - low) // 10
+    if step <= 0:
+        return np.array([low, high]) if high > low else np.array([low])
+    return np.unique(np.append(np.arange(low, high + step / 2, step), high))
+
+
+def price_buckets(prices, edges):
+    """
+    Map each price to the smallest slider value at or above it, so that
+    ``Price <= value`` holds exactly when ``bucket <= value``. Prices above
+    the top value get +inf and only count when the price filter is off.
+    """
+    positions = np.searchsorted(edges, prices, side='left')
+    padded = np.append(edges, np.inf)
+    buckets = padded[positions]
+    buckets[np.isnan(prices)] = np.nan
+    return buckets
+
+
+def month_start(dates):
+    return dates.to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
+
+
+def aggregate_rows(df, price_edges):
+    """Roll raw sales rows up to the cube's dimensions."""
+    prices = df['Price'].to_numpy(dtype='float64')
+    frame = pd.DataFrame({
+        'Month': month_start(df['Date']),
+        'Store ID': df['Store ID'].values,
+        'Category': df['Category'].values,
+        'Region': df['Region'].values,
+        'Promotion': df['Promotion'].values,
+        'Price Bucket': price_buckets(prices, price_edges),
+    })
+    for measure in CUBE_MEASURES:
+        values = df[measure].to_numpy(dtype='float64')
+        frame[measure] = values
+        frame[f'{measure} Sq'] = values ** 2
+        frame[f'{measure} Count'] = ~np.isnan(values)
+
+    grouped = frame.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False)
+    return grouped.sum().reset_index()
+
+
+def merge_rows(frames):
+    """Combine aggregate_rows results of disjoint row chunks."""
+    frame = pd.concat(frames, ignore_index=True)
+    grouped = frame.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False)
+    return grouped.sum().reset_index()
+
+
+def is_daily(dates):
+    """Whether every (non-missing) date is a whole day."""
+    dates = dates.dropna()
+    return bool((dates == dates.dt.normalize()).all())
+
+
+def build_cube(df):
+    price_edges = price_slider_values(df['Price'])
+    return SalesCube(
+        frame=aggregate_rows(df, price_edges),
+        price_edges=price_edges,
+        # With whole-day dates a month is covered once the end date
+        # reaches its last day; otherwise it must pass the month's end
+        daily=is_daily(df['Date']),
+    )
+
+
+def covered_months(cube, start_date, end_date):
+    """
+    Split [start_date, end_date] into the whole months the cube can answer
+    and the partial months at the edges that need raw rows.
+    Returns (first_month, last_month) or None when no month is fully covered.
+    """
+    first = start_date.to_period('M').to_timestamp()
+    if first < start_date:
+        first = first + pd.DateOffset(months=1)
+
+    after_end = end_date.to_period('M').to_timestamp() + pd.DateOffset(months=1)
+    last_instant = after_end - (pd.Timedelta(days=1) if cube.daily else pd.Timedelta(1))
+    last = after_end - pd.DateOffset(months=1)
+    if last_instant > end_date:
+        last = last - pd.DateOffset(months=1)
+
+    if first > last:
+        return None
+    return first, last
+
+
+def load_filtered_cube(store, category, start_date, end_date, price):
+    """
+    Rollup rows matching the dashboard filters.
+
+    Whole months come straight from the precomputed cube; raw rows are only
+    read for the partially selected months at the date-range edges, or when
+    the price cap is not one of the slider values the cube is bucketed on.
+    The result has the same layout as the cube frame and is shared.
+    """
+    filters = normalize_filters(store, category, start_date, end_date, price)
+    snapshot = dataset.snapshot()
+    return filter_cache.get_or_compute(
+        ("cube",) + filters + (snapshot.version,),
+        lambda: _filter_cube(snapshot, *filters)
+    )
+
+
+def _filter_cube(snapshot, store, category, start_date, end_date, price):
+    cube = dataset.derived("cube", build_cube, snapshot)
+    return filter_rollup(snapshot, cube, aggregate_rows, store, category, start_date, end_date, price)
+
+
+def filter_rollup(snapshot, cube, aggregate, store, category, start_date, end_date, price):
+    """
+    Cells of a month/store/category/price-bucket rollup matching normalized
+    filters. ``aggregate(rows, price_edges)`` rolls raw rows up the same
+    way, for edge months and off-grid price caps.
+    """
+    if price is not None and price not in cube.price_edges:
+        rows = select_rows(snapshot, store, category, start_date, end_date, price)
+        return aggregate(rows, cube.price_edges)
+
+    cells = cube.frame
+    mask = np.ones(len(cells), dtype=bool)
+    if store is not None:
+        mask &= (cells['Store ID'] == store).to_numpy()
+    if category is not None:
+        mask &= (cells['Category'] == category).to_numpy()
+    if price is not None:
+        mask &= (cells['Price Bucket'] <= price).to_numpy()
+
+    if start_date is None:
+        return cells[mask]
+
+    months = covered_months(cube, start_date, end_date)
+    if months is None:
+        rows = select_rows(snapshot, store, category, start_date, end_date, price)
+        return aggregate(rows, cube.price_edges)
+
+    first, last = months
+    mask &= ((cells['Month'] >= first) & (cells['Month'] <= last)).to_numpy()
+    parts = [cells[mask]]
+
+    edges = []
+    if start_date < first:
+        edges.append((start_date, first - pd.Timedelta(1)))
+    after_last = last + pd.DateOffset(months=1)
+    if after_last <= end_date:
+        edges.append((after_last, end_date))
+    for edge_start, edge_end in edges:
+        rows = select_rows(snapshot, store, category, edge_start, edge_end, price)
+        parts.append(aggregate(rows, cube.price_edges))
+
+    return pd.concat(parts, ignore_index=True)
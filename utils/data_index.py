@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+class ColumnIndex:
+    """Row positions per distinct value of one column (positions ascending)."""
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        self.codes = codes.astype(np.int32)
+        self.lookup = {value: code for code, value in enumerate(uniques)}
+
+        order = np.argsort(self.codes, kind='stable')
+        counts = np.bincount(self.codes[self.codes >= 0], minlength=len(uniques))
+        # Missing values (code -1) sort first; skip past them
+        offsets = np.concatenate([[0], np.cumsum(counts)]) + (self.codes < 0).sum()
+        self.positions = [
+            order[offsets[code]:offsets[code + 1]] for code in range(len(uniques))
+        ]
+
+    def code(self, value):
+        return self.lookup.get(value)
+
+
+class SalesIndex:
+    """
+    Date-sorted view of the sales frame with per-store and per-category
+    position lists.
+
+    Dates are kept sorted so a date window is two ``np.searchsorted`` calls.
+    Store and category filters pick the matching positions inside that
+    window and are intersected starting from the smallest set, so a narrow
+    query costs time proportional to the rows it matches rather than to
+    the whole table.
+    """
+
+    def __init__(self, df):
+        dates = df['Date'].to_numpy()
+        order = np.argsort(dates, kind='stable')
+        if np.array_equal(order, np.arange(len(order))):
+            order = None  # already sorted (the columnar cache is written that way)
+        self.order = order
+        self.dates = dates if order is None else dates[order]
+        self.prices = self._sorted(df['Price'].to_numpy())
+        self.columns = {
+            'Store ID': ColumnIndex(self._sorted(df['Store ID'].array)),
+            'Category': ColumnIndex(self._sorted(df['Category'].array)),
+        }
+
+    def __len__(self):
+        return len(self.dates)
+
+    def date_range(self, start_date, end_date):
+        """Half-open range of sorted positions with start <= Date <= end."""
+        if start_date is None or end_date is None:
+            return 0, len(self.dates)
+        lo = np.searchsorted(self.dates, pd.Timestamp(start_date).to_datetime64(), side='left')
+        hi = np.searchsorted(self.dates, pd.Timestamp(end_date).to_datetime64(), side='right')
+        return lo, max(lo, hi)
+
+    def positions(self, store, category, start_date, end_date, price):
+        """Row positions of the frame matching the filters, in date order."""
+        lo, hi = self.date_range(start_date, end_date)
+
+        wanted = []
+        for column, value in (('Store ID', store), ('Category', category)):
+            if value is None:
+                continue
+            index = self.columns[column]
+            code = index.code(value)
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            candidates = index.positions[code]
+            a, b = np.searchsorted(candidates, [lo, hi])
+            wanted.append((b - a, column, code, candidates[a:b]))
+
+        if wanted:
+            wanted.sort(key=lambda item: item[0])
+            positions = wanted[0][3]
+            for _, column, code, _ in wanted[1:]:
+                positions = positions[self.columns[column].codes[positions] == code]
+        else:
+            positions = np.arange(lo, hi)
+
+        if price is not None:
+            positions = positions[self.prices[positions] <= price]
+
+        return positions if self.order is None else self.order[positions]
+
+    def _sorted(self, values):
+        return values if self.order is None else values[self.order]
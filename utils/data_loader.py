@@ -1,53 +1,152 @@
+import os
+
 import pandas as pd
 import numpy as np
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
-def load_data():
-    df = pd.read_csv("Database/sales_data.csv")
-    
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+from utils import columnar, metrics
+from utils.cache import LRUCache
+from utils.data_index import SalesIndex
+from utils.data_store import DatasetStore, file_digest, file_lock
+
+DATA_PATH = os.environ.get("SALES_DATA_PATH", "Database/sales_data.csv")
+RELOAD_CHECK_INTERVAL = float(os.environ.get("SALES_RELOAD_INTERVAL", "5"))
+FILTER_CACHE_SIZE = int(os.environ.get("SALES_FILTER_CACHE_SIZE", "32"))
+
+# Rows missing any of these are dropped on load
+REQUIRED_COLUMNS = ['Units Sold', 'Inventory Level', 'Store ID', 'Category']
+
+def read_sales_csv(path=DATA_PATH, columns=None):
+    return clean_sales_rows(pd.read_csv(path, usecols=columns))
+
+def clean_sales_rows(df):
+    """Date coercion and missing-value rules applied to raw CSV rows."""
+    if 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
 
     # Drop row with missing values 
-    df = df.dropna(subset=['Units Sold', 'Inventory Level', 'Store ID', 'Category'])
+    df = df.dropna(subset=[col for col in REQUIRED_COLUMNS if col in df.columns])
 
     return df
 
-def load_filtered_data(store, category, start_date, end_date, price):
-    df = load_data()
-    df['Date'] = pd.to_datetime(df['Date'])
-
-    # Apply filters
-    if store:
-        df = df[df['Store ID'] == store]
-    if category:
-        df = df[df['Category'] == category]
+def sort_by_date(df):
+    return df.sort_values('Date', kind='stable', ignore_index=True)
+
+def build_columnar_cache(path=DATA_PATH):
+    """
+    Parse the CSV once and write the typed columnar cache next to it,
+    sorted by Date so the resident frame needs no re-sorting for the index.
+    """
+    df = sort_by_date(columnar.optimize_dtypes(read_sales_csv(path)))
+    columnar.write_cache(df, path)
+    return df
+
+def read_sales_data(path=DATA_PATH, columns=None, memory_map=True):
+    """
+    Read the sales dataset, preferring the columnar cache when it matches
+    the CSV on disk and (re)building it otherwise. Processes sharing the
+    CSV rebuild one at a time and map the same cache file. Without pyarrow
+    this is a plain CSV parse.
+    """
+    if not columnar.available():
+        df = read_sales_csv(path, columns)
+        return sort_by_date(df) if 'Date' in df.columns else df
+
+    if not columnar.is_fresh(path):
+        # One process rebuilds; the others wait and then map its result
+        with file_lock(columnar.lock_path(path)):
+            if not columnar.is_fresh(path):
+                try:
+                    df = build_columnar_cache(path)
+                except OSError as exc:
+                    print(f"Could not write columnar cache for {path}: {exc}")
+                    df = sort_by_date(columnar.optimize_dtypes(read_sales_csv(path)))
+                    return df if columns is None else df[columns]
+                if not memory_map:
+                    return df if columns is None else df[columns]
+
+    return columnar.read_cache(path, columns=columns, memory_map=memory_map)
+
+def dataset_digest(path=DATA_PATH):
+    if columnar.available():
+        return columnar.source_digest(path)
+    return file_digest(path)
+
+# Single resident copy of the dataset shared by every callback
+dataset = DatasetStore(
+    DATA_PATH, read_sales_data,
+    check_interval=RELOAD_CHECK_INTERVAL, digest=dataset_digest
+)
+
+def load_data(columns=None):
+    """
+    Return the shared, read-only sales frame (do not mutate it).
+    Only the columns a caller touches are paged in from the mapped cache.
+    """
+    df = dataset.get()
+    return df if columns is None else df[columns]
+
+# Filtered frames shared by the dashboard callbacks, keyed by filters + dataset version
+filter_cache = LRUCache(maxsize=FILTER_CACHE_SIZE)
+metrics.register_cache("filter", filter_cache.stats)
+
+def normalize_filters(store, category, start_date, end_date, price):
+    """Canonical, hashable form of the dashboard filter values."""
     if start_date and end_date:
-        df = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-    if price:
-        df = df[df['Price'] <= price]
+        start_date, end_date = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    else:
+        start_date = end_date = None
+    return (
+        store or None,
+        category or None,
+        start_date,
+        end_date,
+        float(price) if price else None,
+    )
 
-    return df 
+def load_filtered_data(store, category, start_date, end_date, price):
+    """
+    Return the dataset rows matching the dashboard filters.
+
+    Results are cached, so the callbacks reacting to one filter change share
+    a single filter pass. The returned frame is shared: do not mutate it.
+    """
+    filters = normalize_filters(store, category, start_date, end_date, price)
+    snapshot = dataset.snapshot()
+    return filter_cache.get_or_compute(
+        filters + (snapshot.version,),
+        lambda: select_rows(snapshot, *filters)
+    )
+
+def load_index(snapshot=None):
+    """Date/store/category index over the resident frame, built once per version."""
+    return dataset.derived("index", SalesIndex, snapshot)
+
+def select_rows(snapshot, store, category, start_date, end_date, price):
+    """Filter the resident frame through its index (normalized filter values)."""
+    positions = load_index(snapshot).positions(store, category, start_date, end_date, price)
+    return snapshot.frame.take(positions)
 
 def compute_kpis(df):
-    df['Date'] = pd.to_datetime(df['Date'])
-
-    latest_date = df['Date'].max()
+    """KPI card values for a frame of raw rows (latest day vs the day before)."""
+    dates = df['Date']
+    latest_date = dates.max()
     previous_date = latest_date - pd.Timedelta(days=1)
 
-    today_data = df[df['Date'] == latest_date].copy()
-    yesterday_data = df[df['Date'] == previous_date].copy()
+    today = (dates == latest_date).to_numpy()
+    yesterday = (dates == previous_date).to_numpy()
+
+    units = df['Units Sold'].to_numpy(dtype='float64')
+    sales = units * df['Price'].to_numpy(dtype='float64')
 
-    today_data['Sales'] = today_data['Units Sold'] * today_data['Price']
-    yesterday_data['Sales'] = yesterday_data['Units Sold'] * yesterday_data['Price']
-    
-    today_sales = today_data['Sales'].sum()
-    yesterday_sales = yesterday_data['Sales'].sum()
+    return format_kpis(
+        sales[today].sum(), sales[yesterday].sum(),
+        units[today].sum(), units[yesterday].sum()
+    )
 
+def format_kpis(today_sales, yesterday_sales, total_units, yesterday_units):
     delta_sales = today_sales - yesterday_sales
     delta_sales_pct = (delta_sales / yesterday_sales * 100) if yesterday_sales != 0 else 0
 
-    total_units = today_data['Units Sold'].sum()
-    yesterday_units = yesterday_data['Units Sold'].sum()
     delta_units = total_units - yesterday_units
     delta_units_pct = (delta_units / yesterday_units * 100) if yesterday_units != 0 else 0
 
@@ -59,6 +158,9 @@ def compute_kpis(df):
     }
 
 def make_forecast_kpis(y_test, preds):
+    # Only forecasting needs sklearn; keep it out of the dashboard's startup
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
     mae  = mean_absolute_error(y_test, preds)
     rmse = np.sqrt(mean_squared_error(y_test, preds))
     r2   = r2_score(y_test, preds)
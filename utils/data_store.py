@@ -0,0 +1,185 @@
+import hashlib
+import os
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from utils import metrics
+
+try:
+    import fcntl
+except ImportError:  # no cross-process locks (Windows): each process works alone
+    fcntl = None
+
+Snapshot = namedtuple("Snapshot", ["frame", "version", "signature"])
+
+
+def file_signature(path):
+    """Cheap change marker for a file: modification time and size."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Content hash of a file, used to tell real edits from a bare touch."""
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Exclusive lock on ``path`` (created if missing) held across processes,
+    so workers sharing a cache take turns rebuilding it. Does not lock
+    where fcntl is unavailable or the lock file cannot be created (e.g.
+    its directory does not exist).
+    """
+    handle = None
+    if fcntl is not None:
+        try:
+            handle = open(path, "a")
+        except OSError:
+            handle = None
+    try:
+        if handle is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+    finally:
+        if handle is not None:
+            handle.close()  # closing releases the lock
+
+
+def pid_alive(pid):
+    """Whether a process ``pid`` is running on this machine."""
+    if pid == os.getpid() or os.name == "nt":
+        return True  # os.kill(pid, 0) would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # exists but owned by someone else, or unknowable here
+    return True
+
+
+class DatasetStore:
+    """
+    Process-wide, read-only holder for one dataset.
+
+    The frame is loaded once and shared by every caller. A daemon thread
+    polls the source file's mtime/size every ``check_interval`` seconds;
+    when they change and the content hash differs, the dataset is reloaded
+    in the background and swapped in with a single reference assignment,
+    so readers never block on disk and never see a half-built frame.
+
+    Frames handed out by ``get()`` are shared: callers must not mutate them.
+    """
+
+    def __init__(self, path, loader, check_interval=5.0, digest=file_digest):
+        self.path = path
+        self._loader = loader
+        self._digest = digest
+        self._check_interval = check_interval
+        self._snapshot = None
+        self._derived = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def get(self):
+        """Return the resident frame, loading it on first use."""
+        return self.snapshot().frame
+
+    @property
+    def version(self):
+        """Content version of the resident frame (changes on every reload)."""
+        return self.snapshot().version
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                    self._start_watcher()
+            snapshot = self._snapshot
+        return snapshot
+
+    def derived(self, name, builder, snapshot=None):
+        """
+        Return ``builder(frame)`` computed once per dataset version.
+
+        Used for indexes and aggregates that live alongside the resident
+        frame and must be rebuilt whenever it is reloaded.
+        """
+        snapshot = snapshot or self.snapshot()
+        key = (name, snapshot.version)
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._derived:
+                with metrics.phase("aggregate"):
+                    self._derived[key] = builder(snapshot.frame)
+            return self._derived[key]
+
+    def refresh(self, force=False):
+        """
+        Reload the dataset if the source changed. Returns True on reload.
+        """
+        current = self._snapshot
+        if current is None:
+            self.snapshot()
+            return True
+
+        try:
+            signature = file_signature(self.path)
+        except OSError:
+            # Source temporarily missing (e.g. mid-replace): keep serving
+            return False
+        if not force and signature == current.signature:
+            return False
+
+        digest = self._digest(self.path)
+        if not force and digest == current.version:
+            # Touched but unchanged: remember the new signature only
+            self._snapshot = current._replace(signature=signature)
+            return False
+
+        fresh = self._load()
+        with self._lock:
+            self._snapshot = fresh
+            self._derived = {
+                key: value for key, value in self._derived.items()
+                if key[1] == fresh.version
+            }
+        return True
+
+    def close(self):
+        self._stop.set()
+
+    def _load(self):
+        signature = file_signature(self.path)
+        with metrics.phase("load"):
+            frame = self._loader(self.path)
+        version = self._digest(self.path)
+        return Snapshot(frame, version, signature)
+
+    def _start_watcher(self):
+        if self._watcher is not None or self._check_interval <= 0:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, name="dataset-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.wait(self._check_interval):
+            try:
+                self.refresh()
+            except Exception as exc:  # keep serving the last good frame
+                print(f"Dataset reload failed for {self.path}: {exc}")
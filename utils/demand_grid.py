@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from utils.cube import SalesCube, filter_rollup, is_daily, month_start, price_buckets, price_slider_values
+from utils.data_loader import dataset, filter_cache, normalize_filters
+from utils.sketch import bucket_values, sketch_quantile
+
+# Width of the heatmap's discount ranges: (0, 5], (5, 10], ...
+DISCOUNT_BIN_WIDTH = 5
+PRICE_BINS = 10
+OUTLIER_QUANTILE = 0.99
+
+KEY_COLUMNS = ['Price Key', 'Discount Key', 'Discount Bin', 'Demand Key']
+DEMAND_GRID_DIMENSIONS = ['Month', 'Store ID', 'Category', 'Price Bucket'] + KEY_COLUMNS
+
+# frame: one row per dimension combination with "Demand" (sum of non-null
+# demand) and "Demand Rows" (row count). The *Key columns are sketch
+# buckets (utils.sketch) of Price, Discount and Demand, so every subset of
+# cells is also a mergeable quantile sketch of those columns;
+# "Discount Bin" is the exact heatmap discount range index.
+
+
+def demand_frame(df, dimensions):
+    prices = df['Price'].to_numpy(dtype='float64')
+    discounts = df['Discount'].to_numpy(dtype='float64')
+    demand = df['Demand'].to_numpy(dtype='float64')
+    frame = pd.DataFrame(dimensions)
+    frame['Price Key'] = bucket_values(prices)
+    frame['Discount Key'] = bucket_values(discounts)
+    frame['Discount Bin'] = np.ceil(discounts / DISCOUNT_BIN_WIDTH)
+    frame['Demand Key'] = bucket_values(demand)
+    frame['Demand'] = demand
+    frame['Demand Rows'] = 1
+    grouped = frame.groupby(list(frame.columns[:-2]), observed=True, dropna=False, sort=False)
+    return grouped.sum().reset_index()
+
+
+def demand_cells(df):
+    """Price/discount/demand grid cells of raw rows, without the filter dimensions."""
+    return demand_frame(df, {})
+
+
+def aggregate_demand(df, price_edges):
+    """Roll raw sales rows up to the demand grid's dimensions."""
+    return demand_frame(df, {
+        'Month': month_start(df['Date']),
+        'Store ID': df['Store ID'].values,
+        'Category': df['Category'].values,
+        'Price Bucket': price_buckets(df['Price'].to_numpy(dtype='float64'), price_edges),
+    })
+
+
+def build_demand_grid(df):
+    price_edges = price_slider_values(df['Price'])
+    return SalesCube(
+        frame=aggregate_demand(df, price_edges),
+        price_edges=price_edges,
+        daily=is_daily(df['Date']),
+    )
+
+
+def load_demand_grid(store, category, start_date, end_date, price):
+    """
+    Demand grid cells matching the dashboard filters, merged from the
+    precomputed per month/store/category/price-bucket grid like the cube
+    (raw rows only for edge months and off-grid price caps). Shared.
+    """
+    filters = normalize_filters(store, category, start_date, end_date, price)
+    snapshot = dataset.snapshot()
+
+    def compute():
+        grid = dataset.derived("demand_grid", build_demand_grid, snapshot)
+        return filter_rollup(snapshot, grid, aggregate_demand, *filters)
+
+    return filter_cache.get_or_compute(("demand",) + filters + (snapshot.version,), compute)
+
+
+def average_demand(cells):
+    """
+    Mean Demand per price range and discount range, leaving out rows above
+    the 99th percentile of price, discount or demand.
+
+    The percentiles come from the cells' sketches and each row's price is
+    its sketch bucket value, both within SALES_SKETCH_ERROR (relative) of
+    the exact figures; so the cutoffs and the ten price ranges can differ
+    from an exact computation only for rows that close to a cutoff or
+    range edge. Discount ranges and the demand sums are exact.
+    """
+    counts = cells['Demand Rows'].to_numpy()
+    cutoffs = {
+        key: sketch_quantile(cells[key].to_numpy(), counts, OUTLIER_QUANTILE)
+        for key in ('Price Key', 'Discount Key', 'Demand Key')
+    }
+    kept = cells[
+        (cells['Price Key'] <= cutoffs['Price Key']) &
+        (cells['Discount Key'] <= cutoffs['Discount Key']) &
+        (cells['Demand Key'] <= cutoffs['Demand Key'])
+    ]
+
+    if kept['Price Key'].isna().all() or kept['Discount Bin'].isna().all():
+        # Nothing left to bin (e.g. a narrow filter): an empty grid
+        return pd.DataFrame({'Price Bin': [], 'Discount Bin': [], 'Demand': []})
+
+    price_bin = pd.cut(kept['Price Key'], bins=PRICE_BINS)
+    top = int(kept['Discount Bin'].max())
+    breaks = np.arange(0, (top + 1) * DISCOUNT_BIN_WIDTH, DISCOUNT_BIN_WIDTH)
+    codes = kept['Discount Bin'].fillna(0).astype('int64').to_numpy() - 1
+    discount_bin = pd.Categorical.from_codes(
+        np.where(codes >= 0, codes, -1), categories=pd.IntervalIndex.from_breaks(breaks)
+    )
+
+    sums = kept.groupby(
+        [price_bin.rename('Price Bin'), pd.Series(discount_bin, index=kept.index, name='Discount Bin')],
+        observed=False
+    )[['Demand', 'Demand Rows']].sum()
+    demand = (sums['Demand'] / sums['Demand Rows']).where(sums['Demand Rows'] > 0)
+    return demand.rename('Demand').reset_index()
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from utils.cube import SalesCube, filter_rollup, is_daily, month_start, price_buckets, price_slider_values
+from utils.data_loader import dataset, filter_cache, normalize_filters
+
+DISCOUNT_GRID_DIMENSIONS = ['Month', 'Store ID', 'Category', 'Price Bucket', 'Rounded Discount', 'Units Sold']
+
+# frame: promo rows only, one row per dimension combination with
+# "Discount Rows" (row count). 'Rounded Discount' is the discount rounded
+# to the nearest 0.5, the box plot's x axis; the counts of each Units Sold
+# value are all the box statistics need, so any subset of cells gives the
+# exact quartiles of the rows it covers.
+
+
+def discount_frame(df, dimensions):
+    frame = pd.DataFrame(dimensions)
+    frame['Rounded Discount'] = (df['Discount'] * 2).round().to_numpy() / 2
+    frame['Units Sold'] = df['Units Sold'].to_numpy()
+    keep = (df['Promotion'] == 1).to_numpy() & frame[['Rounded Discount', 'Units Sold']].notna().all(axis=1).to_numpy()
+    grouped = frame[keep].groupby(list(frame.columns), observed=True, dropna=False, sort=False)
+    return grouped.size().rename('Discount Rows').reset_index()
+
+
+def discount_cells(df):
+    """Discount level/Units Sold counts of raw rows, without the filter dimensions."""
+    return discount_frame(df, {})
+
+
+def aggregate_discounts(df, price_edges):
+    """Roll raw sales rows up to the discount grid's dimensions."""
+    return discount_frame(df, {
+        'Month': month_start(df['Date']),
+        'Store ID': df['Store ID'].values,
+        'Category': df['Category'].values,
+        'Price Bucket': price_buckets(df['Price'].to_numpy(dtype='float64'), price_edges),
+    })
+
+
+def build_discount_grid(df):
+    price_edges = price_slider_values(df['Price'])
+    return SalesCube(
+        frame=aggregate_discounts(df, price_edges),
+        price_edges=price_edges,
+        daily=is_daily(df['Date']),
+    )
+
+
+def load_discount_grid(store, category, start_date, end_date, price):
+    """
+    Discount grid cells matching the dashboard filters, merged from the
+    precomputed per month/store/category/price-bucket grid like the cube
+    (raw rows only for edge months and off-grid price caps). Shared.
+    """
+    filters = normalize_filters(store, category, start_date, end_date, price)
+    snapshot = dataset.snapshot()
+
+    def compute():
+        grid = dataset.derived("discount_grid", build_discount_grid, snapshot)
+        return filter_rollup(snapshot, grid, aggregate_discounts, *filters)
+
+    return filter_cache.get_or_compute(("discount",) + filters + (snapshot.version,), compute)
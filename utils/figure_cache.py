@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from plotly.io.json import to_json_plotly
+
+from utils import metrics
+from utils.cache import LRUCache
+from utils.charts import generate_empty_graph
+from utils.data_loader import dataset, normalize_filters
+
+FIGURE_CACHE_TTL = float(os.environ.get("SALES_FIGURE_CACHE_TTL", "900"))
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get("SALES_FIGURE_CACHE_MAX_BYTES", str(64 * 1024 ** 2)))
+FIGURE_CACHE_ENTRIES = int(os.environ.get("SALES_FIGURE_CACHE_ENTRIES", "512"))
+# Empty disables the disk tier
+FIGURE_CACHE_DIR = os.environ.get("SALES_FIGURE_CACHE_DIR", "")
+FIGURE_CACHE_DISK_MAX_BYTES = int(
+    os.environ.get("SALES_FIGURE_CACHE_DISK_MAX_BYTES", str(256 * 1024 ** 2))
+)
+
+
+class FigureCache:
+    """
+    Serialized Plotly figures keyed by (chart id, normalized filters,
+    dataset version).
+
+    Figures are stored as their final JSON text: a memory LRU bounded by
+    entry count, total bytes and a TTL, plus an optional directory of JSON
+    files shared by every worker process (same TTL, oldest files evicted
+    once the directory outgrows ``disk_max_bytes``). A hit hands back the
+    decoded JSON, so neither pandas nor Plotly run for it.
+    """
+
+    def __init__(self, ttl=FIGURE_CACHE_TTL, max_bytes=FIGURE_CACHE_MAX_BYTES,
+                 entries=FIGURE_CACHE_ENTRIES, directory=FIGURE_CACHE_DIR,
+                 disk_max_bytes=FIGURE_CACHE_DISK_MAX_BYTES):
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize=entries, ttl=ttl, max_bytes=max_bytes)
+        self.directory = directory or None
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_hits = 0
+        self._disk_lock = threading.Lock()
+
+    def figure(self, chart_id, filters, build):
+        """
+        The figure for ``chart_id`` under the dashboard ``filters`` (store,
+        category, start, end, price), calling ``build()`` on a miss.
+        """
+        key = (chart_id,) + normalize_filters(*filters) + (dataset.version,)
+        text = self.memory.get_or_compute(key, lambda: self._load_or_build(key, build))
+        return json.loads(text)
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+    def path(self, key):
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _load_or_build(self, key, build):
+        if self.directory:
+            path = self.path(key)
+            try:
+                if time.time() - os.stat(path).st_mtime < self.ttl:
+                    with open(path, encoding="utf-8") as fh:
+                        text = fh.read()
+                    self.disk_hits += 1
+                    return text
+            except OSError:
+                pass
+
+        figure = build()
+        with metrics.phase("serialize"):
+            text = to_json_plotly(figure)
+        if self.directory:
+            self._save(self.path(key), text)
+        return text
+
+    def _save(self, path, text):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(text)
+            os.replace(tmp_path, path)
+            self._evict()
+        except OSError as exc:
+            print(f"Could not persist figure cache {path}: {exc}")
+
+    def _evict(self):
+        with self._disk_lock:
+            now = time.time()
+            files = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime >= self.ttl:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.disk_max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+
+# Figures shared by every dashboard callback in this process
+figure_cache = FigureCache()
+metrics.register_cache("figure", figure_cache.stats)
+
+
+def chart_figure(chart_id, filters, load, generate, *args):
+    """
+    Figure for one dashboard chart, served from the figure cache; the rows
+    are only loaded and the figure only built when it is not cached.
+    """
+    def build():
+        with metrics.phase("filter"):
+            df = load(*filters)
+        with metrics.phase("figure"):
+            if df.empty:
+                return generate_empty_graph()
+            return generate(df, *args)
+    return figure_cache.figure(chart_id, filters, build)
@@ -0,0 +1,76 @@
+"""
+Partial figure updates for the server-side dashboard charts.
+
+Each patched chart has a ``<chart id>-rendered`` dcc.Store next to it
+holding a digest of what the browser currently shows: one for the layout
+and one per trace property. The first render after the tab is built
+sends the whole figure. After that, while the layout and the trace types
+stay the same, only the trace properties whose digest changed go out as a
+Dash ``Patch``. Usually that is the x/y (or values) arrays, so the
+template, layout and styling are neither resent nor re-laid out by
+plotly.js. Anything else, such as switching to or from the empty graph,
+sends the full figure again.
+"""
+import hashlib
+import json
+
+from dash import Patch, dcc
+from plotly.io.json import to_json_plotly
+
+from utils import metrics
+
+
+def rendered_id(chart_id):
+    return f"{chart_id}-rendered"
+
+
+def rendered_store(chart_id):
+    """Store tracking what ``chart_id`` shows; empty until its first update."""
+    return dcc.Store(id=rendered_id(chart_id))
+
+
+def digest(value):
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def rendered_state(figure):
+    """Digests of a figure's layout and of every trace property."""
+    return {
+        "layout": digest(figure.get("layout", {})),
+        "traces": [
+            {key: digest(value) for key, value in trace.items()}
+            for trace in figure.get("data", [])
+        ],
+    }
+
+
+def figure_update(chart_id, figure, rendered):
+    """
+    ``(output, state)`` for a chart showing ``rendered``: a Patch of the
+    changed trace properties when the figure keeps its layout and trace
+    types, the whole ``figure`` otherwise. ``state`` goes to its store.
+    Records the size of whichever of the two is sent.
+    """
+    state = rendered_state(figure)
+    traces = figure.get("data", [])
+    if (
+        not rendered
+        or rendered.get("layout") != state["layout"]
+        or len(rendered.get("traces", [])) != len(traces)
+        or any(old.get("type") != new.get("type") for old, new in zip(rendered["traces"], state["traces"]))
+    ):
+        metrics.figure_updates.inc(chart_id, "full")
+        metrics.payload_bytes.observe(len(to_json_plotly(figure)), chart_id)
+        return figure, state
+
+    patch = Patch()
+    for index, (old, new) in enumerate(zip(rendered["traces"], state["traces"])):
+        for key, value in new.items():
+            if old.get(key) != value:
+                patch["data"][index][key] = traces[index][key]
+        for key in old.keys() - new.keys():
+            del patch["data"][index][key]
+    metrics.figure_updates.inc(chart_id, "patch")
+    metrics.payload_bytes.observe(len(to_json_plotly(patch.to_plotly_json())), chart_id)
+    return patch, state
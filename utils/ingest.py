@@ -0,0 +1,177 @@
+"""
+Streaming ingestion of the sales CSV for datasets larger than memory.
+
+The file is read in bounded chunks, each cleaned with the same date
+coercion and missing-value rules as a full load, and folded into mergeable
+aggregates: the monthly cube, the per-day KPI totals and the weekly
+per-series aggregates behind the forecast features. Raw rows never stay
+resident; only the aggregates do.
+
+    python -m utils.ingest --memory-mb 256
+"""
+import argparse
+import os
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from model.features import finish_weeks, merge_partial_weeks, partial_weeks
+from utils.columnar import CATEGORY_COLUMNS
+from utils.cube import SalesCube, aggregate_rows, is_daily, merge_rows, price_slider_values
+from utils.data_loader import DATA_PATH, REQUIRED_COLUMNS, clean_sales_rows
+from utils.kpis import DailyTotals, daily_table, merge_daily_tables
+
+INGEST_MEMORY_MB = int(os.environ.get("SALES_INGEST_MEMORY_MB", "512"))
+SAMPLE_ROWS = 10_000
+# A chunk is held several times over while it is cleaned and aggregated
+CHUNK_COPIES = 4
+
+SalesAggregates = namedtuple(
+    "SalesAggregates", ["cube", "daily_totals", "weeks", "rows", "watermark"]
+)
+
+
+def frame_bytes(value):
+    """Memory held by a frame, series, or nested tuple/dict of them."""
+    if isinstance(value, (tuple, list)):
+        return sum(frame_bytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(frame_bytes(item) for item in value.values())
+    usage = value.memory_usage(deep=True)
+    return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+
+
+def chunk_rows(path, memory_bytes, columns=None):
+    """Rows per chunk so a chunk and its working copies fit ``memory_bytes``."""
+    sample = pd.read_csv(path, usecols=columns, nrows=SAMPLE_ROWS)
+    row_bytes = frame_bytes(sample) / max(len(sample), 1)
+    return max(1_000, int(memory_bytes / (max(row_bytes, 1) * CHUNK_COPIES)))
+
+
+def iter_sales_chunks(path=DATA_PATH, columns=None, memory_bytes=INGEST_MEMORY_MB * 1024 ** 2):
+    """Cleaned row chunks of the sales CSV, each within ``memory_bytes``."""
+    rows = chunk_rows(path, memory_bytes, columns)
+    with pd.read_csv(path, usecols=columns, chunksize=rows) as reader:
+        for chunk in reader:
+            yield clean_sales_rows(chunk)
+
+
+def as_categories(frame):
+    """Store repeated ID/label strings as categoricals, as the columnar load does."""
+    columns = [column for column in CATEGORY_COLUMNS if frame.get(column) is not None
+               and frame[column].dtype == object]
+    return frame.astype({column: 'category' for column in columns})
+
+
+class PartialAggregate:
+    """
+    Running merge of per-chunk partial aggregates. Partials are buffered
+    and merged whenever they outgrow ``budget`` bytes; if even the merged
+    aggregate does not fit, the memory ceiling is too low for the data.
+    """
+
+    def __init__(self, name, merge, budget):
+        self.name = name
+        self._merge = merge
+        self._budget = budget
+        self._parts = []
+        self._bytes = 0
+
+    def add(self, partial):
+        self._parts.append(partial)
+        self._bytes += frame_bytes(partial)
+        if self._bytes > self._budget:
+            self._compact()
+            if self._bytes > self._budget:
+                raise MemoryError(
+                    f"{self.name} aggregates need {self._bytes / 1024 ** 2:.0f} MB, "
+                    f"over their {self._budget / 1024 ** 2:.0f} MB share of the "
+                    f"ingest memory limit (SALES_INGEST_MEMORY_MB)"
+                )
+
+    def result(self):
+        self._compact()
+        return self._parts[0] if self._parts else None
+
+    def _compact(self):
+        if len(self._parts) > 1:
+            self._parts = [self._merge(self._parts)]
+            self._bytes = frame_bytes(self._parts[0])
+
+
+def ingest_sales(path=DATA_PATH, memory_mb=INGEST_MEMORY_MB):
+    """
+    Build the dashboard and forecasting aggregates from the CSV in chunks.
+
+    Half of ``memory_mb`` goes to the chunk being processed, the rest is
+    split between the three running aggregates. A first, narrow pass reads
+    only the prices needed for the cube's price buckets.
+    """
+    memory = memory_mb * 1024 ** 2
+    chunk_budget, aggregate_budget = memory // 2, memory // 6
+
+    low = high = None
+    price_columns = REQUIRED_COLUMNS + ['Price']
+    for chunk in iter_sales_chunks(path, price_columns, chunk_budget):
+        prices = chunk['Price']
+        low = prices.min() if low is None else min(low, prices.min())
+        high = prices.max() if high is None else max(high, prices.max())
+    if low is None:
+        raise ValueError(f"No usable rows in {path}")
+    price_edges = price_slider_values(pd.Series([low, high]))
+
+    cube = PartialAggregate("cube", lambda parts: as_categories(merge_rows(parts)), aggregate_budget)
+    daily = PartialAggregate(
+        "daily totals", lambda parts: as_categories(merge_daily_tables(parts)), aggregate_budget
+    )
+    weeks = PartialAggregate("weekly", merge_partial_weeks, aggregate_budget)
+    whole_days = True
+    rows = 0
+    watermark = pd.NaT
+    for chunk in iter_sales_chunks(path, None, chunk_budget):
+        cube.add(aggregate_rows(chunk, price_edges))
+        daily.add(daily_table(chunk))
+        weeks.add(partial_weeks(chunk))
+        whole_days = whole_days and is_daily(chunk['Date'])
+        rows += int(chunk['Date'].notna().sum())
+        latest = chunk['Date'].max()
+        if pd.notna(latest) and (pd.isna(watermark) or latest > watermark):
+            watermark = latest
+
+    return SalesAggregates(
+        cube=SalesCube(frame=cube.result(), price_edges=price_edges, daily=whole_days),
+        daily_totals=DailyTotals(daily.result()),
+        weeks=finish_weeks(weeks.result()),
+        rows=rows,
+        watermark=watermark,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream the sales CSV into aggregates.")
+    parser.add_argument("--data", default=DATA_PATH, help="sales CSV (default: %(default)s)")
+    parser.add_argument("--memory-mb", type=int, default=INGEST_MEMORY_MB,
+                        help="memory ceiling in MB (default: %(default)s)")
+    parser.add_argument("--features", action="store_true",
+                        help="also rebuild the weekly feature store from the aggregates")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    aggregates = ingest_sales(args.data, args.memory_mb)
+    print(f"Ingested {aggregates.rows} rows up to {aggregates.watermark:%Y-%m-%d} "
+          f"in {time.perf_counter() - started:.1f}s: {len(aggregates.cube.frame)} cube cells, "
+          f"{len(aggregates.weeks)} series-weeks")
+
+    if args.features:
+        from model.feature_store import WeeklyFeatureStore
+        from utils.data_loader import dataset_digest
+
+        store = WeeklyFeatureStore()
+        store.load_weeks(aggregates.weeks, dataset_digest(args.data),
+                         aggregates.watermark, aggregates.rows)
+        print(f"Feature store holds {len(store.features)} feature rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import dataset, format_kpis, load_index, normalize_filters
+
+ONE_DAY = np.timedelta64(1, 'D')
+
+
+class DailyTotals:
+    """
+    Revenue and units per day, pre-summed for every store/category filter
+    combination (``None`` standing for "all"), so the KPI cards are two
+    lookups on a sorted date array instead of a scan of the raw rows.
+    """
+
+    def __init__(self, table):
+        """``table``: per store, category and day sums, as from daily_table."""
+        self.series = {}
+        for by_store, by_category in product([True, False], repeat=2):
+            keys = [col for col, used in (('Store ID', by_store), ('Category', by_category)) if used]
+            if keys:
+                grouped = table.groupby(keys + ['Date'], observed=True)[['Revenue', 'Units']].sum()
+                level = keys if len(keys) > 1 else keys[0]
+                for key, days in grouped.groupby(level=level, observed=True):
+                    key = key if isinstance(key, tuple) else (key,)
+                    store = key[0] if by_store else None
+                    category = key[-1] if by_category else None
+                    self.series[(store, category)] = self._arrays(days.droplevel(keys))
+            else:
+                days = table.groupby('Date')[['Revenue', 'Units']].sum()
+                self.series[(None, None)] = self._arrays(days)
+
+    @staticmethod
+    def _arrays(days):
+        days = days.sort_index()
+        return days.index.to_numpy(), days['Revenue'].to_numpy(), days['Units'].to_numpy()
+
+    def lookup(self, store, category, start_date, end_date):
+        """Sorted (dates, revenue, units) arrays for the filters."""
+        dates, revenue, units = self.series.get(
+            (store, category), (np.array([], dtype='datetime64[ns]'), np.array([]), np.array([]))
+        )
+        if start_date is not None and end_date is not None:
+            lo = np.searchsorted(dates, start_date.to_datetime64(), side='left')
+            hi = np.searchsorted(dates, end_date.to_datetime64(), side='right')
+            dates, revenue, units = dates[lo:hi], revenue[lo:hi], units[lo:hi]
+        return dates, revenue, units
+
+
+def daily_table(df):
+    """
+    Revenue and units per store, category and day. Tables of disjoint row
+    chunks combine with merge_daily_tables.
+    """
+    table = pd.DataFrame({
+        'Store ID': df['Store ID'].values,
+        'Category': df['Category'].values,
+        'Date': df['Date'].values,
+        'Revenue': df['Units Sold'].to_numpy(dtype='float64') * df['Price'].to_numpy(dtype='float64'),
+        'Units': df['Units Sold'].to_numpy(dtype='float64'),
+    })
+    table = table.dropna(subset=['Date'])
+    return table.groupby(['Store ID', 'Category', 'Date'], observed=True).sum().reset_index()
+
+
+def merge_daily_tables(tables):
+    table = pd.concat(tables, ignore_index=True)
+    return table.groupby(['Store ID', 'Category', 'Date'], observed=True).sum().reset_index()
+
+
+def build_daily_totals(df):
+    return DailyTotals(daily_table(df))
+
+
+def load_kpis(store, category, start_date, end_date, price):
+    """
+    KPI card values for the dashboard filters.
+
+    Without a price cap the latest day and the day before come straight
+    from the daily totals. With a cap only those days' rows are re-summed,
+    walking back from the end of the window to the last day that still
+    has rows under the cap.
+    """
+    store, category, start_date, end_date, price = normalize_filters(
+        store, category, start_date, end_date, price
+    )
+    snapshot = dataset.snapshot()
+    totals = dataset.derived("daily_totals", build_daily_totals, snapshot)
+    dates, revenue, units = totals.lookup(store, category, start_date, end_date)
+
+    index = load_index(snapshot)
+    frame = snapshot.frame
+
+    def day_totals(day):
+        """(revenue, units, has_rows) for one day under the filters."""
+        if price is None:
+            position = np.searchsorted(dates, day)
+            if position < len(dates) and dates[position] == day:
+                return revenue[position], units[position], True
+            return 0.0, 0.0, False
+        if start_date is not None and day < start_date.to_datetime64():
+            return 0.0, 0.0, False
+        rows = index.positions(store, category, day, day, price)
+        sold = frame['Units Sold'].to_numpy()[rows].astype('float64')
+        prices = frame['Price'].to_numpy()[rows].astype('float64')
+        return (sold * prices).sum(), sold.sum(), len(rows) > 0
+
+    for latest in dates[::-1]:
+        today_sales, today_units, found = day_totals(latest)
+        if found:
+            break
+    else:
+        return format_kpis(0.0, 0.0, 0.0, 0.0)
+
+    yesterday_sales, yesterday_units, _ = day_totals(latest - ONE_DAY)
+    return format_kpis(today_sales, yesterday_sales, today_units, yesterday_units)
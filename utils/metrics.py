@@ -0,0 +1,433 @@
+"""
+Latency, payload and cache metrics for the dashboard process.
+
+Callbacks wrapped in ``timed_callback`` record their duration and, through
+``phase()``, where that time went (self time per phase, so the phases of
+one call add up to its duration):
+
+    load       reading the dataset from disk
+    aggregate  building indexes and rollups over the resident frame
+    filter     selecting rows or cells for the dashboard filters
+    figure     building Plotly figures and Dash components
+    serialize  encoding figures to JSON
+    other      everything else in the callback
+
+``install(server)`` serves it all, with figure payload sizes, full versus
+patched chart updates, forecast training durations and the hit/miss
+counters of every registered cache, as Prometheus text on ``/metrics``.
+
+With SALES_METRICS_DIR set (serve.py sets it), every worker process also
+writes its metrics there every SALES_METRICS_FLUSH_INTERVAL seconds, and
+``/metrics`` on any worker answers with the sum over all of them, so one
+scrape sees the whole server. Counters and histograms of exited workers
+stay in the sum; cache stats only count live workers.
+
+With SALES_PROFILE_THRESHOLD_MS set, each request's thread is also
+sampled every SALES_PROFILE_INTERVAL_MS, and requests slower than the
+threshold leave a folded-stack profile (flamegraph.pl / speedscope
+format) in SALES_PROFILE_DIR.
+"""
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_THRESHOLD_MS = float(os.environ.get("SALES_PROFILE_THRESHOLD_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("SALES_PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.environ.get("SALES_PROFILE_DIR", "profiles")
+METRICS_DIR = os.environ.get("SALES_METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("SALES_METRICS_FLUSH_INTERVAL", "2"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PAYLOAD_BUCKETS = tuple(1024 * 4 ** power for power in range(8))  # 1 KB .. 16 MB
+TRAINING_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Counter-like cache stats; the other numeric stats are exported as gauges
+CACHE_COUNTERS = {"hits", "misses", "evictions", "expirations", "coalesced", "disk_hits"}
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with a fixed label set."""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def state(self):
+        """The series as JSON-able [labels, counts] pairs."""
+        with self._lock:
+            return [[list(labels), list(series)] for labels, series in self._series.items()]
+
+    def render(self, states=None):
+        """Text lines for this process, or the sum of several processes' ``state()``."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        merged = {}
+        for state in [self.state()] if states is None else states:
+            for labels, series in state:
+                labels = tuple(labels)
+                total = merged.get(labels)
+                merged[labels] = series if total is None else [a + b for a, b in zip(total, series)]
+        items = sorted(merged.items())
+        names = self.labels + ("le",)
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{label_text(names, labels + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{label_text(names, labels + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{label_text(self.labels, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{label_text(self.labels, labels)} {series[-1]}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *labels):
+        with self._lock:
+            self._values[labels] += 1
+
+    def state(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def render(self, states=None):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        merged = Counter()
+        for state in [self.state()] if states is None else states:
+            for labels, value in state:
+                merged[tuple(labels)] += value
+        items = sorted(merged.items())
+        lines.extend(f"{self.name}{label_text(self.labels, labels)} {value}" for labels, value in items)
+        return lines
+
+
+callback_seconds = Histogram(
+    "sales_callback_duration_seconds", "Dash callback wall time.", ["callback"]
+)
+phase_seconds = Histogram(
+    "sales_callback_phase_seconds", "Self time per phase of a Dash callback.", ["callback", "phase"]
+)
+callback_errors = CounterMetric(
+    "sales_callback_exceptions_total", "Exceptions raised out of Dash callbacks.", ["callback", "exception"]
+)
+payload_bytes = Histogram(
+    "sales_figure_payload_bytes", "Serialized chart update size per response: the whole figure or its patch.", ["chart"], PAYLOAD_BUCKETS
+)
+figure_updates = CounterMetric(
+    "sales_figure_updates_total", "Chart updates sent as a whole figure or as a patch.", ["chart", "kind"]
+)
+forecast_seconds = Histogram(
+    "sales_forecast_training_seconds", "Forecast training time, feature update included.",
+    buckets=TRAINING_BUCKETS
+)
+
+METRICS = (callback_seconds, phase_seconds, callback_errors, payload_bytes, figure_updates, forecast_seconds)
+
+_caches = {}
+_local = threading.local()
+
+
+def register_cache(name, stats):
+    """Export ``stats()`` (an LRUCache-style stats dict) under cache=``name``."""
+    _caches[name] = stats
+
+
+def _frames():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def timed_callback(func):
+    """Record a callback's duration, phases and exceptions under its function name."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stack = _frames()
+        outer = getattr(_local, "callback", None)
+        _local.callback = name
+        stack.append(0.0)
+        begin = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as exc:
+            callback_errors.inc(name, type(exc).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - begin
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            _local.callback = outer
+            callback_seconds.observe(elapsed, name)
+            phase_seconds.observe(elapsed - children, name, "other")
+
+    return wrapper
+
+
+@contextmanager
+def phase(name):
+    """Attribute the enclosed work to ``name`` in the current callback."""
+    stack = _frames()
+    stack.append(0.0)
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - begin
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        callback = getattr(_local, "callback", None) or "background"
+        phase_seconds.observe(elapsed - children, callback, name)
+
+
+def cache_stats():
+    """Numeric stats of every registered cache."""
+    return {
+        cache: {key: value for key, value in stats().items()
+                if isinstance(value, (int, float)) and not isinstance(value, bool)}
+        for cache, stats in _caches.items()
+    }
+
+
+def cache_lines(states=None):
+    """Cache stats of this process, or summed over several ``cache_stats()``."""
+    merged = {}
+    for state in [cache_stats()] if states is None else states:
+        for cache, values in state.items():
+            total = merged.setdefault(cache, Counter())
+            total.update(values)
+
+    lines = []
+    samples = {}
+    for cache, values in sorted(merged.items()):
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                samples.setdefault(key, []).append((cache, value))
+        lookups = values.get("hits", 0) + values.get("misses", 0)
+        if lookups:
+            samples.setdefault("hit_ratio", []).append((cache, values.get("hits", 0) / lookups))
+
+    for key, values in sorted(samples.items()):
+        counter = key in CACHE_COUNTERS
+        name = f"sales_cache_{key}" + ("_total" if counter else "")
+        lines.append(f"# TYPE {name} {'counter' if counter else 'gauge'}")
+        lines.extend(f'{name}{{cache="{escape(cache)}"}} {value}' for cache, value in values)
+    return lines
+
+
+def state():
+    """This process's metrics as JSON-able data."""
+    return {
+        "pid": os.getpid(),
+        "metrics": {metric.name: metric.state() for metric in METRICS},
+        "caches": cache_stats(),
+    }
+
+
+def state_path(directory):
+    return os.path.join(directory, f"metrics-{os.getpid()}.json")
+
+
+def write_state(directory=METRICS_DIR):
+    """Save this process's metrics where the other workers read them."""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = state_path(directory)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(state(), fh)
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        print(f"Could not write metrics to {directory}: {exc}")
+
+
+def worker_states(directory=METRICS_DIR):
+    """Metrics of every worker that wrote to ``directory``, this one up to date."""
+    from utils.data_store import pid_alive
+
+    states = [state()]
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        names = []
+    own = os.path.basename(state_path(directory))
+    for name in names:
+        if not (name.startswith("metrics-") and name.endswith(".json")) or name == own:
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                worker = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if not pid_alive(worker["pid"]):
+            worker["caches"] = {}  # sizes and ratios of a gone process mean nothing now
+        states.append(worker)
+    return states
+
+
+def render(states=None):
+    """All metrics in the Prometheus text exposition format, summed over ``states`` if given."""
+    if states is None and METRICS_DIR:
+        states = worker_states()
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render(None if states is None else
+                                   [worker["metrics"].get(metric.name, []) for worker in states]))
+    lines.extend(cache_lines(None if states is None else [worker["caches"] for worker in states]))
+    return "\n".join(lines) + "\n"
+
+
+def start_flusher(directory=METRICS_DIR, interval=METRICS_FLUSH_INTERVAL):
+    """Write this process's metrics to ``directory`` every ``interval`` seconds."""
+    def flush():
+        while True:
+            write_state(directory)
+            time.sleep(interval)
+
+    threading.Thread(target=flush, name="metrics-flusher", daemon=True).start()
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of threads serving requests every ``interval``
+    seconds from one background thread and keeps, per thread, a count of
+    each collapsed stack seen.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL_MS / 1000, directory=PROFILE_DIR):
+        self.interval = interval
+        self.directory = directory
+        self._samples = {}  # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._busy = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._samples[thread_id] = Counter()
+            self._busy.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        with self._lock:
+            samples = self._samples.pop(thread_id, Counter())
+            if not self._samples:
+                self._busy.clear()
+        return samples
+
+    def dump(self, label, elapsed, samples):
+        """Write ``samples`` as a folded-stack file; returns its path."""
+        os.makedirs(self.directory, exist_ok=True)
+        label = re.sub(r"[^\w.-]+", "_", label).strip("_")[:80] or "request"
+        path = os.path.join(
+            self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{elapsed * 1000:.0f}ms.folded"
+        )
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in samples.most_common():
+                fh.write(f"{stack} {count}\n")
+        return path
+
+    def _run(self):
+        while True:
+            self._busy.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[fold(frame)] += 1
+
+
+def fold(frame):
+    """Root-first ``file:function:line;...`` stack of a frame."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def request_label(request):
+    """Dash callback output for callback requests, the path otherwise."""
+    payload = request.get_json(silent=True) if request.is_json else None
+    if isinstance(payload, dict) and payload.get("output"):
+        return str(payload["output"])
+    return request.path
+
+
+def install(server, threshold_ms=PROFILE_THRESHOLD_MS):
+    """Serve ``/metrics`` from the Flask ``server`` and, if set, profile slow requests."""
+    from flask import Response, g, request
+
+    server.add_url_rule(
+        "/metrics", "metrics",
+        lambda: Response(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    )
+    if METRICS_DIR:
+        start_flusher()
+    if threshold_ms <= 0:
+        return
+
+    profiler = SamplingProfiler()
+
+    @server.before_request
+    def start_profile():
+        g.profile_started = time.perf_counter()
+        profiler.start(threading.get_ident())
+
+    @server.teardown_request
+    def finish_profile(exc=None):
+        samples = profiler.stop(threading.get_ident())
+        started = g.pop("profile_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed * 1000 >= threshold_ms and samples:
+            try:
+                path = profiler.dump(request_label(request), elapsed, samples)
+                print(f"Slow request ({elapsed * 1000:.0f} ms) profiled to {path}")
+            except OSError as exc:
+                print(f"Could not write request profile: {exc}")
@@ -0,0 +1,88 @@
+"""
+Startup timing for the dashboard process.
+
+With SALES_STARTUP_REPORT=1 every module import on the main thread is
+timed and, once the first request arrives, a report of the startup phases,
+the time to first request and the slowest imports is printed. Phases are
+always timed (it is two clock reads), so ``startup.phases`` can be
+inspected without the report.
+"""
+import builtins
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+STARTUP_REPORT = os.environ.get("SALES_STARTUP_REPORT", "0") == "1"
+REPORT_TOP_IMPORTS = int(os.environ.get("SALES_STARTUP_TOP_IMPORTS", "15"))
+
+started = time.perf_counter()
+phases = []
+imports = {}  # module -> (cumulative seconds, self seconds)
+
+_original_import = builtins.__import__
+_main_thread = None
+_stack = []
+_first_request = None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules or threading.get_ident() != _main_thread:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    _stack.append(0.0)
+    begin = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - begin
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        imports.setdefault(name, (elapsed, elapsed - children))
+
+
+def enable():
+    """Start timing imports when SALES_STARTUP_REPORT=1. Call first thing."""
+    global _main_thread
+    if STARTUP_REPORT and builtins.__import__ is _original_import:
+        _main_thread = threading.get_ident()
+        builtins.__import__ = _timed_import
+
+
+@contextmanager
+def phase(name):
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases.append((name, time.perf_counter() - begin))
+
+
+def watch_first_request(server):
+    """Print the report when ``server`` (a Flask app) gets its first request."""
+    if not STARTUP_REPORT:
+        return
+
+    @server.before_request
+    def _first_request_seen():
+        global _first_request
+        if _first_request is None:
+            _first_request = time.perf_counter() - started
+            builtins.__import__ = _original_import
+            print(report(), file=sys.stderr)
+
+
+def report():
+    lines = ["Startup timing"]
+    for name, seconds in phases:
+        lines.append(f"  {name:<36} {seconds * 1000:9.1f} ms")
+    if _first_request is not None:
+        lines.append(f"  {'first request after':<36} {_first_request * 1000:9.1f} ms")
+    if imports:
+        lines.append(f"Slowest imports (cumulative / self, {len(imports)} modules)")
+        slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (total, own) in slowest[:REPORT_TOP_IMPORTS]:
+            lines.append(f"  {name:<36} {total * 1000:9.1f} ms {own * 1000:9.1f} ms")
+    return "\n".join(lines)